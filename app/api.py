@@ -0,0 +1,332 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Final
+from urllib.parse import parse_qsl, urlsplit
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+
+from app.columns import SCOPES, WEEKDAY_NAMES
+from app.db import ENGINE
+from app.db.changes import CHANGES
+from app.db.models import Area, Club, Event, Location, Reservation
+from app.db.occupancy import OCCUPANCY
+from app.db.occurrences import CLUB_OCCURRENCES
+from app.db.queries import sort_expression
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE: Final[int] = 256
+
+Params = dict[str, str]
+Route = Callable[[Session, Params], Any]
+
+
+def now() -> datetime:
+    """Returns the current time rounded down to an occupancy slot, the resolution of the cached responses."""
+    current = datetime.now()
+    return current - (current - datetime.combine(current.date(), time())) % OCCUPANCY.slot
+
+
+def _datetime(params: Params, name: str, default: datetime) -> datetime:
+    value = params.get(name)
+    return default if value is None else datetime.fromisoformat(value)
+
+
+def _date(params: Params, name: str, default: date) -> date:
+    value = params.get(name)
+    return default if value is None else date.fromisoformat(value)
+
+
+def _period(params: Params, days: int = 1) -> tuple[datetime, datetime]:
+    start = _datetime(params, "from", datetime.combine(now().date(), time()))
+    end = _datetime(params, "to", start + timedelta(days=days))
+    if start >= end:
+        raise ValueError("'from' must be earlier than 'to'")
+    return start, end
+
+
+def _names(session: Session, model, ids) -> dict[int, str]:
+    return dict(session.exec(select(model.id, model.name).where(model.id.in_(ids))).all())
+
+
+def events(session: Session, params: Params) -> list[dict]:
+    day = _date(params, "date", now().date())
+    midnight = datetime.combine(day, time())
+    items = session.exec(
+        select(Event)
+        .where(Event.start_at >= midnight, Event.start_at < midnight + timedelta(days=1))
+        .order_by(Event.start_at, Event.id)
+        .options(selectinload(Event.type), selectinload(Event.reservations).selectinload(Reservation.location))
+    ).all()
+    return [
+        {
+            "id": event.id,
+            "title": event.title,
+            "description": event.description,
+            "scope": SCOPES.get(event.scope),
+            "type": event.type.name if event.type else None,
+            "start_at": event.start_at,
+            "locations": [r.location.name for r in event.reservations if r.location],
+        }
+        for event in items
+    ]
+
+
+def reservations(session: Session, params: Params) -> list[dict]:
+    start, end = _period(params, 7)
+    items = session.exec(
+        select(Reservation)
+        .where(Reservation.start_at < end, Reservation.end_at > start)
+        .order_by(Reservation.start_at, Reservation.id)
+        .options(
+            selectinload(Reservation.location), selectinload(Reservation.areas), selectinload(Reservation.event)
+        )
+    ).all()
+    return [
+        {
+            "id": reservation.id,
+            "start_at": reservation.start_at,
+            "end_at": reservation.end_at,
+            "location": reservation.location.name if reservation.location else None,
+            "areas": [area.name for area in reservation.areas],
+            "event": reservation.event.title if reservation.event else None,
+            "comment": reservation.comment,
+        }
+        for reservation in items
+    ]
+
+
+def clubs(session: Session, params: Params) -> list[dict]:
+    items = session.exec(
+        select(Club)
+        .order_by(sort_expression(Club.title), Club.id)
+        .options(
+            selectinload(Club.days), selectinload(Club.location), selectinload(Club.teacher), selectinload(Club.type)
+        )
+    ).all()
+    return [
+        {
+            "id": club.id,
+            "title": club.title,
+            "type": club.type.name if club.type else None,
+            "teacher": club.teacher.name if club.teacher else None,
+            "location": club.location.name if club.location else None,
+            "start_at": club.start_at,
+            "days": [
+                {"weekday": WEEKDAY_NAMES[day.weekday], "start_at": day.start_at, "end_at": day.end_at}
+                for day in sorted(club.days, key=lambda day: day.weekday.value)
+            ],
+        }
+        for club in items
+    ]
+
+
+def schedule(session: Session, params: Params) -> list[dict]:
+    start, end = _period(params, 7)
+    occurrences = sorted(CLUB_OCCURRENCES.occurrences(start, end), key=lambda o: (o.start_at, o.club_id))
+    titles = dict(session.exec(select(Club.id, Club.title).where(Club.id.in_({o.club_id for o in occurrences}))).all())
+    locations = _names(session, Location, {o.location_id for o in occurrences})
+    return [
+        {
+            "club": titles.get(occurrence.club_id),
+            "location": locations.get(occurrence.location_id),
+            "start_at": occurrence.start_at,
+            "end_at": occurrence.end_at,
+        }
+        for occurrence in occurrences
+    ]
+
+
+def availability(session: Session, params: Params) -> list[dict]:
+    start = _datetime(params, "start", now())
+    end = _datetime(params, "end", start + timedelta(hours=1))
+    if start >= end:
+        raise ValueError("'start' must be earlier than 'end'")
+
+    free = OCCUPANCY.free_locations(start, end)
+    locations = session.exec(
+        select(Location.id, Location.name).where(Location.id.in_(free)).order_by(sort_expression(Location.name))
+    ).all()
+    free_areas = {location_id: OCCUPANCY.free_areas(location_id, start, end) for location_id in free}
+    areas = _names(session, Area, {area_id for area_ids in free_areas.values() for area_id in area_ids})
+    return [
+        {
+            "id": location_id,
+            "name": name,
+            "areas": sorted(areas[area_id] for area_id in free_areas[location_id]),
+        }
+        for location_id, name in locations
+    ]
+
+
+def slots(session: Session, params: Params) -> list[dict]:
+    duration = timedelta(minutes=int(params.get("duration", 60)))
+    start, end = _period(params, 7)
+    candidates = OCCUPANCY.find_slots(
+        duration,
+        max(start, now()),
+        end,
+        areas=int(params.get("areas", 1)),
+        order="best" if params.get("order") == "best" else "earliest",
+        limit=min(100, int(params.get("limit", 10))),
+    )
+    locations = _names(session, Location, {c.location_id for c in candidates})
+    areas = _names(session, Area, {area_id for c in candidates for area_id in c.area_ids})
+    return [
+        {
+            "location": locations.get(candidate.location_id),
+            "areas": [areas.get(area_id) for area_id in candidate.area_ids],
+            "start_at": candidate.start_at,
+            "end_at": candidate.end_at,
+        }
+        for candidate in candidates
+    ]
+
+
+ROUTES: Final[dict[str, Route]] = {
+    "/events": events,
+    "/reservations": reservations,
+    "/clubs": clubs,
+    "/schedule": schedule,
+    "/availability": availability,
+    "/slots": slots,
+}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ResponseCache:
+    """Caches rendered responses until the database changes.
+
+    The database version combines `PRAGMA data_version` of a dedicated
+    connection, which changes whenever any other connection (including
+    other processes) commits, with the commits seen by `CHANGES`.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE) -> None:
+        self.size = size
+        self._responses: OrderedDict[tuple, bytes] = OrderedDict()
+        self._connection = None
+        self._data_version: int | None = None
+        self._version: str | None = None
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        with self._lock:
+            if self._connection is None:
+                self._connection = ENGINE.raw_connection()
+            (data_version,), = self._connection.execute("PRAGMA data_version").fetchall()
+
+            if data_version != self._data_version:
+                if self._data_version is not None:
+                    # Another process may have changed the data without notifying this one.
+                    OCCUPANCY.invalidate()
+                    CLUB_OCCURRENCES.invalidate()
+                self._data_version = data_version
+
+            version = f"{data_version}.{CHANGES.version}"
+            if version != self._version:
+                self._version = version
+                self._responses.clear()
+            return version
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._responses.get(key)
+            if body is not None:
+                self._responses.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, version: str, body: bytes) -> None:
+        with self._lock:
+            if version != self._version:
+                return
+            self._responses[key] = body
+            if len(self._responses) > self.size:
+                self._responses.popitem(last=False)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: "ApiServer"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "not found", "routes": list(ROUTES)})
+            return
+
+        cache = self.server.cache
+        clock = now()
+        version = cache.version()
+        etag = f'"{version}-{clock:%Y%m%d%H%M}"'
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        params = dict(parse_qsl(url.query))
+        key = (url.path, tuple(sorted(params.items())), clock)
+        body = cache.get(key)
+        if body is None:
+            try:
+                with Session(ENGINE) as session:
+                    data = route(session, params)
+                body = json.dumps(data, ensure_ascii=False, default=_default).encode()
+            except ValueError as error:
+                self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+                return
+            except Exception:
+                logger.exception("Failed to serve %s", self.path)
+                self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal server error"})
+                return
+            cache.put(key, version, body)
+
+        self.send_body(HTTPStatus.OK, body, etag)
+
+    def send_json(self, status: HTTPStatus, data: Any) -> None:
+        self.send_body(status, json.dumps(data, ensure_ascii=False).encode())
+
+    def send_body(self, status: HTTPStatus, body: bytes, etag: str | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """A read-only HTTP server answering the `ROUTES` with JSON."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int]) -> None:
+        super().__init__(address, RequestHandler)
+        self.cache = ResponseCache()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.cache.close()
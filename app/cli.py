@@ -0,0 +1,165 @@
+import argparse
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import Session
+
+from app import reports
+from app.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, API_HOST, API_PORT, BACKUP_DIR, BACKUP_KEEP, DEBUG
+from app.db import ENGINE
+from app.db import archive as archiving
+from app.db import maintenance
+from app.db import backup as backups
+from app.db.schema import migrate
+from app.db.seed import seed
+
+logger = logging.getLogger(__name__)
+
+
+def export(args: argparse.Namespace) -> int:
+    names = list(reports.TABLES) if args.table == "all" else [args.table]
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    with Session(ENGINE) as session:
+        for name in names:
+            path = args.output / f"{name}.csv"
+            with open(path, "w", encoding="UTF-8", newline="") as file:
+                count = reports.export_table(session, name, file, args.include_archive)
+            logger.info("Exported %d rows to '%s'", count, path)
+    return 0
+
+
+def archive(args: argparse.Namespace) -> int:
+    before = datetime.now() - timedelta(days=args.days)
+    counts = archiving.archive(before, args.batch_size)
+    logger.info(
+        "Archived %d events, %d reservations and %d assignments older than %s",
+        counts["events"], counts["reservations"], counts["assignments"], before,
+    )
+    return 0
+
+
+def schedule(args: argparse.Namespace) -> int:
+    with Session(ENGINE) as session, open(args.output, "w", encoding="UTF-8", newline="") as file:
+        count = reports.export_schedule(session, file)
+    logger.info("Exported the schedule of %d clubs to '%s'", count, args.output)
+    return 0
+
+
+def fill(args: argparse.Namespace) -> int:
+    with Session(ENGINE) as session:
+        try:
+            seed(session, args.events, args.locations, args.random_seed)
+        except ValueError as error:
+            logger.error("%s", error)
+            return 1
+        session.commit()
+    logger.info("Seeded %d events in %d locations", args.events, args.locations)
+    return 0
+
+
+def backup(args: argparse.Namespace) -> int:
+    if args.list:
+        for path in backups.snapshots(args.output):
+            print(path)
+        return 0
+    try:
+        path = backups.backup(args.output, args.keep)
+    except backups.BackupError as error:
+        logger.error("%s", error)
+        return 1
+    print(path)
+    return 0
+
+
+def restore(args: argparse.Namespace) -> int:
+    try:
+        previous = backups.restore(args.snapshot, args.output)
+    except backups.BackupError as error:
+        logger.error("%s", error)
+        return 1
+    # The snapshot may predate the current schema
+    migrate(ENGINE)
+    logger.info("Restored '%s'; the replaced data was backed up to '%s'", args.snapshot, previous)
+    return 0
+
+
+def maintain(args: argparse.Namespace) -> int:
+    for report in maintenance.maintain(args.full, args.budget):
+        print(report)
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    from app.api import ApiServer
+
+    with ApiServer((args.host, args.port)) as server:
+        logger.info("Serving the API on http://%s:%d", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Runs batch operations without the user interface.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export tables to CSV files")
+    export_parser.add_argument("table", choices=["all", *reports.TABLES], help="the table to export")
+    export_parser.add_argument("-o", "--output", type=Path, default=Path("."), help="the output directory")
+    export_parser.add_argument("--include-archive", action="store_true", help="export the archived rows as well")
+    export_parser.set_defaults(handler=export)
+
+    archive_parser = subparsers.add_parser("archive", help="move old events, reservations and assignments to the archive")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive the rows older than this")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="the rows moved per transaction")
+    archive_parser.set_defaults(handler=archive)
+
+    schedule_parser = subparsers.add_parser("schedule", help="export the weekly schedule of clubs to a CSV file")
+    schedule_parser.add_argument("-o", "--output", type=Path, default=Path("schedule.csv"), help="the output file")
+    schedule_parser.set_defaults(handler=schedule)
+
+    seed_parser = subparsers.add_parser("seed", help="fill an empty database with demo data")
+    seed_parser.add_argument("--events", type=int, default=50, help="the number of events")
+    seed_parser.add_argument("--locations", type=int, default=5, help="the number of locations")
+    seed_parser.add_argument("--random-seed", type=int, default=None, help="the seed of the random generator")
+    seed_parser.set_defaults(handler=fill)
+
+    backup_parser = subparsers.add_parser("backup", help="back up the database while it is in use")
+    backup_parser.add_argument("-o", "--output", type=Path, default=BACKUP_DIR, help="the directory of the backups")
+    backup_parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="the number of the newest backups to keep")
+    backup_parser.add_argument("--list", action="store_true", help="list the backups instead, the newest first")
+    backup_parser.set_defaults(handler=backup)
+
+    restore_parser = subparsers.add_parser("restore", help="verify a backup and restore the database from it")
+    restore_parser.add_argument("snapshot", type=Path, help="the backup file")
+    restore_parser.add_argument("-o", "--output", type=Path, default=BACKUP_DIR, help="where to back up the replaced data")
+    restore_parser.set_defaults(handler=restore)
+
+    maintain_parser = subparsers.add_parser("maintain", help="refresh the planner statistics and reclaim free space")
+    maintain_parser.add_argument("--full", action="store_true", help="analyze every table and enable incremental vacuum")
+    maintain_parser.add_argument("--budget", type=float, default=None, help="stop vacuuming after this many seconds")
+    maintain_parser.set_defaults(handler=maintain)
+
+    serve_parser = subparsers.add_parser("serve", help="serve a read-only JSON API over HTTP")
+    serve_parser.add_argument("--host", default=API_HOST, help="the address to listen on")
+    serve_parser.add_argument("--port", type=int, default=API_PORT, help="the port to listen on")
+    serve_parser.set_defaults(handler=serve)
+
+    return parser
+
+
+def run(argv: list[str] | None = None) -> int:
+    """
+    Runs a command given on the command line.
+
+    Returns:
+        int: The exit status code.
+    """
+    args = parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
+    migrate(ENGINE)
+    return args.handler(args)
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from sqlalchemy import ScalarSelect, func
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlmodel import select
+
+from app.db.models import (
+    Area,
+    AreaReservationLink,
+    Assignment,
+    AssignmentType,
+    Club,
+    ClubType,
+    DaySchedule,
+    Event,
+    EventType,
+    Location,
+    Reservation,
+    Scope,
+    Teacher,
+    UniqueNamedModel,
+    Weekday,
+)
+
+DATE_FORMAT = "%d.%m.%Y %H:%M"
+TIME_FORMAT = "%H:%M"
+# Characters of a deferred column loaded with the rows; the rest is fetched on demand
+PREVIEW_LENGTH = 80
+
+SCOPES = {
+    Scope.ENTERTAINMENT: "Развлечение",
+    Scope.ENLIGHTENMENT: "Просвещение",
+}
+
+STATES = {
+    Assignment.State.DRAFT: "Черновик",
+    Assignment.State.ACTIVE: "Активно",
+    Assignment.State.COMPLETED: "Выполнено"
+}
+
+WEEKDAY_NAMES = {
+    Weekday.MONDAY: "Понедельник",
+    Weekday.TUESDAY: "Вторник",
+    Weekday.WEDNESDAY: "Среда",
+    Weekday.THURSDAY: "Четверг",
+    Weekday.FRIDAY: "Пятница",
+    Weekday.SATURDAY: "Суббота",
+    Weekday.SUNDAY: "Воскресенье",
+}
+
+@dataclass(frozen=True, slots=True)
+class Column:
+    """A column of a table: the SQL expression selected for it and how its value is displayed.
+
+    Only the first `PREVIEW_LENGTH` characters of a `deferred` column are
+    selected; `expression` must then be a model attribute to fetch the rest by.
+    """
+
+    expression: Any
+    format: Callable[[Any], Any] = lambda value: value
+    deferred: bool = False
+
+    @property
+    def projection(self) -> Any:
+        """The expression selected for the rows of a table."""
+        if self.deferred:
+            # One more character tells whether the text was cut
+            return func.substr(self.expression, 1, PREVIEW_LENGTH + 1)
+        return self.expression
+
+
+Columns = Dict[str, Column]
+
+
+def name_of(model: type[UniqueNamedModel], foreign_key: InstrumentedAttribute) -> ScalarSelect:
+    """Returns the name of the `model` row referenced by `foreign_key` as a correlated subquery.
+
+    Unlike a join, the subquery does not interfere with the joins the filters and sorting add.
+    """
+    return select(model.name).where(model.id == foreign_key).correlate_except(model).scalar_subquery()
+
+
+def _datetime(value: datetime) -> str:
+    return value.strftime(DATE_FORMAT)
+
+
+_event_locations = (
+    select(func.group_concat(Location.name, ", "))
+    .join_from(Reservation, Location, Reservation.location_id == Location.id)
+    .where(Reservation.event_id == Event.id)
+    .correlate_except(Reservation, Location)
+    .scalar_subquery()
+)
+
+_reservation_areas = (
+    select(func.group_concat(Area.name, ", "))
+    .join_from(AreaReservationLink, Area, AreaReservationLink.area_id == Area.id)
+    .where(AreaReservationLink.reservation_id == Reservation.id)
+    .correlate_except(AreaReservationLink, Area)
+    .scalar_subquery()
+)
+
+_club_days = select(func.count()).where(DaySchedule.club_id == Club.id).correlate_except(DaySchedule).scalar_subquery()
+
+EVENT_COLUMNS: Columns = {
+    "Заголовок": Column(Event.title),
+    "Пространство": Column(Event.scope, SCOPES.get),
+    "Разновидность": Column(name_of(EventType, Event.type_id)),
+    "Помещение": Column(_event_locations),
+    "Дата начала": Column(Event.start_at, _datetime),
+    "Дата создания": Column(Event.created_at, _datetime),
+    "Описание": Column(Event.description, deferred=True),
+}
+
+ASSIGNMENT_COLUMNS: Columns = {
+    "Помещение": Column(name_of(Location, Assignment.location_id)),
+    "Разновидность": Column(name_of(AssignmentType, Assignment.type_id)),
+    "Мероприятие": Column(select(Event.title).where(Event.id == Assignment.event_id).correlate_except(Event).scalar_subquery()),
+    "Статус": Column(Assignment.state, STATES.get),
+    "Дедлайн": Column(Assignment.deadline, _datetime),
+    "Дата создания": Column(Assignment.created_at, _datetime),
+    "Описание": Column(Assignment.description, deferred=True),
+}
+
+RESERVATION_COLUMNS: Columns = {
+    "Помещение": Column(name_of(Location, Reservation.location_id)),
+    "Зоны": Column(_reservation_areas),
+    "Мероприятие": Column(select(Event.title).where(Event.id == Reservation.event_id).correlate_except(Event).scalar_subquery()),
+    "Дата начала": Column(Reservation.start_at, _datetime),
+    "Дата конца": Column(Reservation.end_at, _datetime),
+    "Комментарий": Column(Reservation.comment, deferred=True),
+    "Дата создания": Column(Reservation.created_at, _datetime),
+}
+
+CLUB_COLUMNS: Columns = {
+    "Заголовок": Column(Club.title),
+    "Помещение": Column(name_of(Location, Club.location_id)),
+    "Преподаватель": Column(name_of(Teacher, Club.teacher_id)),
+    "Вид": Column(name_of(ClubType, Club.type_id)),
+    "Старт": Column(Club.start_at, _datetime),
+    "Расписание": Column(_club_days, lambda count: f"{count} раз(а) в неделю"),
+    "Дата создания": Column(Club.created_at, _datetime),
+}
+
+
+def schedule_cell(club: Club, weekday: Weekday) -> str | None:
+    """Returns the schedule of the club on the weekday as shown in the schedule table."""
+    schedule_day = next((d for d in club.days if d.weekday == weekday), None)
+    if not schedule_day:
+        return None
+    return f"{schedule_day.start_at.strftime(TIME_FORMAT)} - {schedule_day.end_at.strftime(TIME_FORMAT)} - {club.location.name if club.location else None} - {club.teacher.name if club.teacher else None}"
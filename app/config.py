@@ -1,6 +1,53 @@
+from pathlib import Path
 from typing import Final
 
 from decouple import config
 
 DEBUG: Final[bool] = config("DEBUG", default=False, cast=bool)
 DATABASE_URL: Final[str] = config("DATABASE_URL", default="sqlite:///db.sqlite3")
+# The database the old rows are moved to, attached to every connection; by default next to the database file
+ARCHIVE_PATH: Final[str] = config("ARCHIVE_PATH", default="")
+DATABASE_BUSY_TIMEOUT: Final[int] = config("DATABASE_BUSY_TIMEOUT", default=5000, cast=int)
+DATABASE_BUSY_RETRIES: Final[int] = config("DATABASE_BUSY_RETRIES", default=3, cast=int)
+# Writes give up waiting for the write lock after this many milliseconds in total
+DATABASE_WRITE_TIMEOUT: Final[int] = config("DATABASE_WRITE_TIMEOUT", default=2000, cast=int)
+
+PROFILING: Final[bool] = config("PROFILING", default=DEBUG, cast=bool)
+SLOW_QUERY_THRESHOLD: Final[float] = config("SLOW_QUERY_THRESHOLD", default=0.1, cast=float)
+N_PLUS_ONE_THRESHOLD: Final[int] = config("N_PLUS_ONE_THRESHOLD", default=5, cast=int)
+INSTRUMENTATION: Final[bool] = config("INSTRUMENTATION", default=PROFILING, cast=bool)
+
+OCCUPANCY_SLOT_MINUTES: Final[int] = config("OCCUPANCY_SLOT_MINUTES", default=15, cast=int)
+OCCUPANCY_HORIZON_DAYS: Final[int] = config("OCCUPANCY_HORIZON_DAYS", default=90, cast=int)
+
+# Tables fetch their rows a page at a time and keep the pages read last
+TABLE_PAGE_SIZE: Final[int] = config("TABLE_PAGE_SIZE", default=256, cast=int)
+TABLE_CACHED_PAGES: Final[int] = config("TABLE_CACHED_PAGES", default=64, cast=int)
+# Live filters search once the input paused for this long; the search still running is interrupted
+FILTER_DEBOUNCE_MS: Final[int] = config("FILTER_DEBOUNCE_MS", default=300, cast=int)
+INTERRUPT_STEPS: Final[int] = config("INTERRUPT_STEPS", default=10000, cast=int)
+
+API_HOST: Final[str] = config("API_HOST", default="127.0.0.1")
+API_PORT: Final[int] = config("API_PORT", default=8765, cast=int)
+
+BACKUP_DIR: Final[Path] = config("BACKUP_DIR", default="backups", cast=Path)
+# Minutes between scheduled backups; 0 disables them
+BACKUP_INTERVAL_MINUTES: Final[int] = config("BACKUP_INTERVAL_MINUTES", default=60, cast=int)
+BACKUP_KEEP: Final[int] = config("BACKUP_KEEP", default=24, cast=int)
+# Pages copied per step of the online backup and the pause between the steps
+BACKUP_PAGES: Final[int] = config("BACKUP_PAGES", default=256, cast=int)
+BACKUP_STEP_DELAY: Final[float] = config("BACKUP_STEP_DELAY", default=0.01, cast=float)
+
+ARCHIVE_AFTER_DAYS: Final[int] = config("ARCHIVE_AFTER_DAYS", default=365, cast=int)
+ARCHIVE_BATCH_SIZE: Final[int] = config("ARCHIVE_BATCH_SIZE", default=500, cast=int)
+
+# Maintenance runs after the user was idle for a while, at most once per interval, and at shutdown
+MAINTENANCE_IDLE_MINUTES: Final[int] = config("MAINTENANCE_IDLE_MINUTES", default=5, cast=int)
+MAINTENANCE_INTERVAL_HOURS: Final[int] = config("MAINTENANCE_INTERVAL_HOURS", default=24, cast=int)
+MAINTENANCE_BUDGET: Final[float] = config("MAINTENANCE_BUDGET", default=2.0, cast=float)
+MAINTENANCE_VACUUM_PAGES: Final[int] = config("MAINTENANCE_VACUUM_PAGES", default=128, cast=int)
+MAINTENANCE_ANALYSIS_LIMIT: Final[int] = config("MAINTENANCE_ANALYSIS_LIMIT", default=1000, cast=int)
+
+# Active assignments are reminded about this long before their deadlines; the nearest ones are kept in memory
+REMINDER_LEAD_MINUTES: Final[int] = config("REMINDER_LEAD_MINUTES", default=60, cast=int)
+REMINDER_QUEUE_SIZE: Final[int] = config("REMINDER_QUEUE_SIZE", default=32, cast=int)
@@ -1,8 +1,67 @@
+from pathlib import Path
 from typing import Final
 
 from sqlmodel import create_engine
+from sqlalchemy import event
 from sqlalchemy.future.engine import Engine
 
-from app.config import DEBUG, DATABASE_URL
+from app.config import ARCHIVE_PATH, DEBUG, DATABASE_BUSY_TIMEOUT, DATABASE_URL, PROFILING
+from app.db.changes import CHANGES
+from app.db.interrupts import INTERRUPTS
+from app.db.profiling import PROFILER
+from app.db.queries import install_functions
 
 ENGINE: Final[Engine] = create_engine(DATABASE_URL, echo=DEBUG)
+ARCHIVE_SCHEMA: Final[str] = "archive"
+
+
+def _archive_path() -> str:
+    if ARCHIVE_PATH:
+        return ARCHIVE_PATH
+    database = ENGINE.url.database
+    if not database or database == ":memory:":
+        return ":memory:"
+    return str(Path(database).with_name("archive.sqlite3"))
+
+
+ARCHIVE_DATABASE: Final[str] = _archive_path()
+
+CHANGES.install(ENGINE)
+INTERRUPTS.install(ENGINE)
+
+if PROFILING:
+    PROFILER.install(ENGINE)
+
+
+@event.listens_for(ENGINE, "connect")
+def _on_connect(dbapi_connection, _) -> None:
+    install_functions(dbapi_connection)
+    # pysqlite begins transactions on its own and only before DML; emit BEGIN ourselves instead.
+    dbapi_connection.isolation_level = None
+    # Wait for other writers instead of failing at once; WAL lets readers proceed while one writes.
+    dbapi_connection.execute(f"PRAGMA busy_timeout = {DATABASE_BUSY_TIMEOUT}")
+    # Only takes effect in new files; see `maintenance.enable_incremental_vacuum` for existing ones.
+    dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    dbapi_connection.execute("PRAGMA journal_mode = WAL")
+    dbapi_connection.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (ARCHIVE_DATABASE,))
+    dbapi_connection.execute(f"PRAGMA {ARCHIVE_SCHEMA}.auto_vacuum = INCREMENTAL")
+    dbapi_connection.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+
+
+@event.listens_for(ENGINE, "begin")
+def _on_begin(connection) -> None:
+    """Begins a transaction in the mode of the `sqlite_begin` execution option (e.g. `IMMEDIATE`).
+
+    The `sqlite_busy_timeout` option overrides how long the `BEGIN` waits for a lock.
+    """
+    options = connection.get_execution_options()
+    timeout = options.get("sqlite_busy_timeout")
+    if timeout is None:
+        connection.exec_driver_sql(f"BEGIN {options.get('sqlite_begin', '')}".strip())
+        return
+
+    connection.exec_driver_sql(f"PRAGMA busy_timeout = {timeout}")
+    try:
+        connection.exec_driver_sql(f"BEGIN {options.get('sqlite_begin', '')}".strip())
+    finally:
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {DATABASE_BUSY_TIMEOUT}")
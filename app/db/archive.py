@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Final
+
+from sqlalchemy import Connection, Index, MetaData, Table, and_, delete, exists, insert, or_, union_all
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.visitors import replacement_traverse
+from sqlmodel import select
+from sqlmodel.sql.expression import Select
+
+from app.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from app.db import ARCHIVE_SCHEMA
+from app.db.models import AreaReservationLink, Assignment, BaseModel, Event, Reservation
+from app.db.transactions import writing
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_METADATA: Final[MetaData] = MetaData()
+
+
+def _copy(table: Table) -> Table:
+    """Returns the archive copy of `table` with its columns and indexes.
+
+    There are no foreign keys: SQLite cannot refer to the tables of another
+    database and archived rows refer to types and locations kept hot.
+    """
+    copy = Table(
+        table.name,
+        ARCHIVE_METADATA,
+        *(Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable) for column in table.columns),
+        schema=ARCHIVE_SCHEMA,
+    )
+    for index in table.indexes:
+        Index(index.name, *(copy.c[column.name] for column in index.columns))
+    return copy
+
+
+# hot table: its copy in the attached archive database
+ARCHIVE_TABLES: Final[dict[Table, Table]] = {
+    model.__table__: _copy(model.__table__) for model in (Event, Reservation, AreaReservationLink, Assignment)
+}
+
+
+def _archived(element):
+    if isinstance(element, Table):
+        return ARCHIVE_TABLES.get(element)
+    if isinstance(element, Column) and element.table in ARCHIVE_TABLES:
+        return ARCHIVE_TABLES[element.table].c[element.key]
+    return None
+
+
+def archived(statement: Select) -> Select:
+    """Returns `statement` reading the archived tables instead of the hot ones.
+
+    Other tables (types, locations, areas) are only kept in the hot database.
+    Joins must have explicit `ON` clauses (see `queries.outerjoin`).
+    """
+    return replacement_traverse(statement, {}, _archived)
+
+
+def with_archive(statement: Select):
+    """Returns the rows of `statement` from the hot and the archived tables together."""
+    return union_all(statement, archived(statement))
+
+
+def _move(connection: Connection, table: Table, condition: ColumnElement) -> int:
+    columns = [column.name for column in table.columns]
+    connection.execute(insert(ARCHIVE_TABLES[table]).from_select(columns, select(*table.columns).where(condition)))
+    return connection.execute(delete(table).where(condition)).rowcount
+
+
+def _move_reservations(connection: Connection, ids: list[int]) -> None:
+    _move(connection, AreaReservationLink.__table__, AreaReservationLink.reservation_id.in_(ids))
+    _move(connection, Reservation.__table__, Reservation.id.in_(ids))
+
+
+def _move_assignments(connection: Connection, ids: list[int]) -> None:
+    _move(connection, Assignment.__table__, Assignment.id.in_(ids))
+
+
+def _move_events(connection: Connection, ids: list[int]) -> None:
+    reservations = connection.execute(select(Reservation.id).where(Reservation.event_id.in_(ids))).scalars().all()
+    _move_reservations(connection, reservations)
+    _move(connection, Assignment.__table__, Assignment.event_id.in_(ids))
+    _move(connection, Event.__table__, Event.id.in_(ids))
+
+
+def _archive(
+    model: type[BaseModel], condition: ColumnElement, move: Callable[[Connection, list[int]], None], batch_size: int
+) -> int:
+    """Moves the rows of `model` matching `condition` in transactions of `batch_size` rows each."""
+    count = 0
+    while True:
+        with writing() as session:
+            connection = session.connection()
+            ids = connection.execute(select(model.id).where(condition).order_by(model.id).limit(batch_size)).scalars().all()
+            if ids:
+                move(connection, ids)
+        if not ids:
+            return count
+        count += len(ids)
+        logger.debug("Archived %d rows of %s", count, model.__name__)
+
+
+def archive(before: datetime | None = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> dict[str, int]:
+    """Moves the rows older than `before` into the archive database.
+
+    An event is moved together with its reservations and assignments once it
+    started, all its reservations ended and all its assignments were completed
+    before `before`. Reservations and completed assignments without an event
+    are moved on their own. The ids of archived rows are never reused: the
+    tables have AUTOINCREMENT keys and `schema.migrate` starts their
+    sequences above the archived ids.
+
+    Returns:
+        dict[str, int]: The number of events, reservations and assignments moved on their own.
+    """
+    if before is None:
+        before = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+    events = and_(
+        Event.start_at < before,
+        ~exists().where(Reservation.event_id == Event.id, Reservation.end_at >= before),
+        ~exists().where(
+            Assignment.event_id == Event.id,
+            or_(Assignment.state != Assignment.State.COMPLETED, Assignment.deadline >= before),
+        ),
+    )
+    reservations = and_(Reservation.event_id.is_(None), Reservation.end_at < before)
+    assignments = and_(
+        Assignment.event_id.is_(None),
+        Assignment.state == Assignment.State.COMPLETED,
+        Assignment.deadline < before,
+    )
+
+    counts = {
+        "events": _archive(Event, events, _move_events, batch_size),
+        "reservations": _archive(Reservation, reservations, _move_reservations, batch_size),
+        "assignments": _archive(Assignment, assignments, _move_assignments, batch_size),
+    }
+    logger.info("Archived the rows before %s: %s", before, counts)
+    return counts
@@ -0,0 +1,285 @@
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Collection, Final
+
+from sqlmodel import SQLModel
+
+from app.config import BACKUP_DIR, BACKUP_INTERVAL_MINUTES, BACKUP_KEEP, BACKUP_PAGES, BACKUP_STEP_DELAY
+from app.db import ARCHIVE_DATABASE, ARCHIVE_SCHEMA, ENGINE
+from app.db.archive import ARCHIVE_METADATA
+from app.db.changes import CHANGES
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT: Final[str] = "%Y%m%d-%H%M%S-%f"
+
+
+class BackupError(Exception):
+    """Raised when a snapshot cannot be made, is damaged or cannot be restored."""
+
+
+def database_path() -> Path:
+    database = ENGINE.url.database
+    if ENGINE.url.get_backend_name() != "sqlite" or not database or database == ":memory:":
+        raise BackupError("Резервное копирование доступно только для файла базы данных SQLite")
+    return Path(database)
+
+
+def archive_path(path: Path) -> Path:
+    """Returns the copy of the archive database kept next to the copy `path` of the database."""
+    return path.with_name(f"{path.name}.archive")
+
+
+def snapshots(directory: Path = BACKUP_DIR) -> list[Path]:
+    """Returns the snapshots of the database in `directory`, the newest first."""
+    return sorted(directory.glob(f"{database_path().stem}-*.sqlite3"), reverse=True)
+
+
+def _copy(source: sqlite3.Connection, targets: dict[str, sqlite3.Connection], pages: int) -> None:
+    """Copies the schemas of `source` into their `targets` `pages` pages at a time.
+
+    A commit by another connection would restart a stepped backup, which
+    never ends on a busy database. The copy therefore reads a snapshot of
+    all the schemas in one read transaction, so rows being archived are
+    copied exactly once; in WAL mode it does not block the writers.
+    """
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        logger.debug("Copied %d of %d pages", total - remaining, total)
+        if remaining and BACKUP_STEP_DELAY:
+            time.sleep(BACKUP_STEP_DELAY)
+
+    source.execute("BEGIN")
+    try:
+        for name in targets:
+            source.execute(f"SELECT count(*) FROM {name}.sqlite_master").fetchall()
+        for name, target in targets.items():
+            source.backup(target, pages=pages, progress=progress, name=name)
+    finally:
+        source.execute("ROLLBACK")
+
+
+def verify(path: Path, expected: Collection[str] | None = None) -> None:
+    """Checks that `path` is an undamaged database with every table of `expected` (by default the models).
+
+    Raises:
+        BackupError: If the check fails.
+    """
+    if not path.is_file():
+        raise BackupError(f"Файл '{path}' не найден")
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = connection.execute("PRAGMA integrity_check").fetchall()
+            tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError as error:
+        raise BackupError(f"Файл '{path}' не является базой данных: {error}") from error
+
+    if result != [("ok",)]:
+        raise BackupError(f"Файл '{path}' повреждён: {result[0][0]}")
+    missing = set(SQLModel.metadata.tables.keys() if expected is None else expected) - tables
+    if missing:
+        raise BackupError(f"В файле '{path}' нет таблиц: {', '.join(sorted(missing))}")
+
+
+def verify_archive(path: Path) -> None:
+    """Checks that `path` is an undamaged copy of the archive database.
+
+    Raises:
+        BackupError: If the check fails.
+    """
+    verify(path, [table.name for table in ARCHIVE_METADATA.tables.values()])
+
+
+def backup(directory: Path = BACKUP_DIR, keep: int | None = BACKUP_KEEP, pages: int = BACKUP_PAGES) -> Path:
+    """Copies the live database into a new snapshot in `directory`.
+
+    The database and its archive (see `archive_path`) are copied with the
+    online backup API `pages` pages at a time, so other connections keep
+    reading and writing meanwhile. The copies are verified before they
+    replace a snapshot; only the newest `keep` snapshots are kept (all of
+    them if `keep` is None).
+
+    Raises:
+        BackupError: If the database cannot be copied or the copy is damaged.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{database_path().stem}-{datetime.now():{SNAPSHOT_FORMAT}}.sqlite3"
+    partial = path.with_suffix(".part")
+    partial_archive = archive_path(partial)
+
+    start = time.perf_counter()
+    source = ENGINE.raw_connection()
+    try:
+        targets = {"main": sqlite3.connect(partial), ARCHIVE_SCHEMA: sqlite3.connect(partial_archive)}
+        try:
+            _copy(source.driver_connection, targets, pages)
+            # A snapshot is a single self-contained file, not a WAL database
+            for target in targets.values():
+                target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            for target in targets.values():
+                target.close()
+        verify(partial)
+        verify_archive(partial_archive)
+        # The archive is in place first, a snapshot is never listed without it
+        partial_archive.replace(archive_path(path))
+        partial.replace(path)
+    except sqlite3.Error as error:
+        raise BackupError(f"Не удалось создать резервную копию: {error}") from error
+    finally:
+        source.close()
+        partial.unlink(missing_ok=True)
+        partial_archive.unlink(missing_ok=True)
+    logger.info("Backed up the database to '%s' in %.2fs", path, time.perf_counter() - start)
+
+    if keep is not None:
+        rotate(directory, keep)
+    return path
+
+
+def _keep_files(directory: Path) -> Path:
+    """Copies the files of the live database and its archive into `directory` as they are, returns the copy.
+
+    The copy is not named like a snapshot, so it is neither rotated nor listed.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    database = database_path()
+    path = directory / f"{database.stem}-{datetime.now():{SNAPSHOT_FORMAT}}.damaged"
+    for source, target in ((database, path), (Path(ARCHIVE_DATABASE), archive_path(path))):
+        for suffix in ("", "-wal"):
+            if source.with_name(source.name + suffix).is_file():
+                shutil.copyfile(source.with_name(source.name + suffix), target.with_name(target.name + suffix))
+    return path
+
+
+def rotate(directory: Path = BACKUP_DIR, keep: int = BACKUP_KEEP) -> list[Path]:
+    """Deletes all but the newest `keep` snapshots and returns the deleted ones."""
+    removed = snapshots(directory)[max(keep, 1):]
+    for path in removed:
+        path.unlink()
+        archive_path(path).unlink(missing_ok=True)
+        logger.info("Removed the old backup '%s'", path)
+    return removed
+
+
+def _load(path: Path, target: sqlite3.Connection) -> None:
+    try:
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+    except sqlite3.Error as error:
+        raise BackupError(f"Не удалось восстановить базу данных: {error}") from error
+
+
+def restore(path: Path, directory: Path = BACKUP_DIR) -> Path:
+    """Replaces the contents of the live database and its archive with the snapshot `path`.
+
+    The snapshot is verified first and the current database is backed up
+    (without rotation) so the restore can be undone. A damaged database
+    cannot be backed up; its files are copied as they are instead. The
+    archive is kept as it is when the snapshot has no copy of it. Other
+    connections see the restored data once it is copied.
+
+    Returns:
+        Path: The backup of the database taken before restoring.
+
+    Raises:
+        BackupError: If the snapshot or the restored database is damaged.
+    """
+    verify(path)
+    archive = archive_path(path)
+    if archive.is_file():
+        verify_archive(archive)
+    else:
+        logger.warning("The snapshot '%s' has no copy of the archive, the archive is kept", path)
+    try:
+        previous = backup(directory, keep=None)
+    except BackupError as error:
+        previous = _keep_files(directory)
+        logger.warning("Could not back up the database before restoring (%s), copied its files to '%s'", error, previous)
+
+    target = ENGINE.raw_connection()
+    try:
+        _load(path, target.driver_connection)
+    finally:
+        target.close()
+    if archive.is_file():
+        target = sqlite3.connect(ARCHIVE_DATABASE)
+        try:
+            _load(archive, target)
+        finally:
+            target.close()
+
+    ENGINE.dispose()
+    verify(database_path())
+    if archive.is_file():
+        verify_archive(Path(ARCHIVE_DATABASE))
+    CHANGES.publish(frozenset(mapper.class_ for mapper in SQLModel._sa_registry.mappers))
+    logger.info("Restored the database from '%s', the previous data is in '%s'", path, previous)
+    return previous
+
+
+class BackupService:
+    """Backs up the database every `interval` in a background thread.
+
+    The first snapshot is taken once the newest existing one is `interval`
+    old. An interval of zero disables the service.
+    """
+
+    def __init__(
+        self,
+        interval: timedelta = timedelta(minutes=BACKUP_INTERVAL_MINUTES),
+        directory: Path = BACKUP_DIR,
+        keep: int = BACKUP_KEEP,
+    ) -> None:
+        self.interval = interval
+        self.directory = directory
+        self.keep = keep
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.interval <= timedelta() or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="BackupService", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stops the service, waiting up to `timeout` seconds for a running backup."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def delay(self) -> float:
+        """Returns the seconds until the next backup is due."""
+        try:
+            latest = snapshots(self.directory)
+        except BackupError:
+            return self.interval.total_seconds()
+        if not latest:
+            return 0
+        age = datetime.now() - datetime.fromtimestamp(latest[0].stat().st_mtime)
+        return max((self.interval - age).total_seconds(), 0)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.delay()):
+            try:
+                backup(self.directory, self.keep)
+            except Exception:
+                logger.exception("Scheduled backup failed")
+                self._stopped.wait(self.interval.total_seconds())
+
+
+BACKUPS: Final[BackupService] = BackupService()
@@ -0,0 +1,96 @@
+import logging
+from typing import Callable, Final
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[frozenset[type]], None]
+
+
+class ChangeBus:
+    """Notifies subscribers about the models changed by each committed transaction.
+
+    Changes are collected from every `INSERT`, `UPDATE` and `DELETE` executed
+    through the engine, so ORM flushes, bulk operations and Core statements are
+    all covered. Subscribers are called once the transaction is committed and
+    its connection is returned to the pool, on the thread that wrote; those
+    touching widgets should defer the work (e.g. with a queued Qt signal).
+
+    A writer keeping its own state up to date may `explain` the models it
+    saw changed; subscribers with `skip_explained` are not told about them.
+
+    Attributes:
+        version (int): The number of commits that changed anything so far.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._subscribers: list[tuple[Subscriber, bool]] = []
+        self._models: dict[str, type] | None = None
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "commit", self._commit)
+        event.listen(engine, "rollback", self._rollback)
+        # The commit event comes before the DBAPI commit, the check-in after it
+        event.listen(engine, "checkin", self._checkin)
+
+    def subscribe(self, callback: Subscriber, skip_explained: bool = False) -> None:
+        self._subscribers.append((callback, skip_explained))
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        self._subscribers = [subscriber for subscriber in self._subscribers if subscriber[0] != callback]
+
+    def explain(self, conn, models: frozenset[type]) -> None:
+        """Marks `models` changed by the transaction just committed on `conn` as handled by the writer itself."""
+        conn.info.setdefault("explained_models", set()).update(models)
+
+    def publish(self, models: frozenset[type], explained: frozenset[type] = frozenset()) -> None:
+        self.version += 1
+        for callback, skip_explained in list(self._subscribers):
+            changed = models - explained if skip_explained else models
+            if not changed:
+                continue
+            try:
+                callback(changed)
+            except Exception:
+                logger.exception("Change subscriber %r failed", callback)
+
+    def _model(self, table_name: str) -> type | None:
+        if self._models is None:
+            self._models = {
+                mapper.local_table.name: mapper.class_ for mapper in SQLModel._sa_registry.mappers
+            }
+        return self._models.get(table_name)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+            return
+
+        table = getattr(context.compiled.statement, "table", None) if context.compiled is not None else None
+        model = self._model(table.name) if table is not None else None
+        if model is not None:
+            conn.info.setdefault("changed_models", set()).add(model)
+
+    def _commit(self, conn) -> None:
+        # Only the transaction committing now can be explained
+        conn.info.pop("explained_models", None)
+        changed = conn.info.pop("changed_models", None)
+        if changed:
+            conn.info.setdefault("committed_models", set()).update(changed)
+
+    def _checkin(self, dbapi_connection, record) -> None:
+        # `Connection.info` is the info of the pool record
+        committed = record.info.pop("committed_models", None)
+        explained = record.info.pop("explained_models", set())
+        if committed:
+            self.publish(frozenset(committed), frozenset(explained & committed))
+
+    def _rollback(self, conn) -> None:
+        conn.info.pop("changed_models", None)
+
+
+CHANGES: Final[ChangeBus] = ChangeBus()
@@ -0,0 +1,107 @@
+from datetime import date
+from typing import Final
+
+from sqlalchemy import func
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+
+from app.db.models import Assignment, DashboardCounter, Event, Location, Reservation
+
+ASSIGNMENTS: Final[str] = "assignment"
+EVENTS: Final[str] = "event"
+RESERVATIONS: Final[str] = "reservation"
+
+# kind, table, day column, columns affecting the counter, condition on the counted `{row}`
+COUNTERS: Final = (
+    (
+        ASSIGNMENTS,
+        Assignment.__tablename__,
+        "deadline",
+        ("deadline", "location_id", "state"),
+        f"{{row}}.state = '{Assignment.State.ACTIVE.name}'",
+    ),
+    (EVENTS, Event.__tablename__, "start_at", ("start_at", "location_id"), "1"),
+    (RESERVATIONS, Reservation.__tablename__, "start_at", ("start_at", "location_id"), "1"),
+)
+
+COUNTER_TABLE: Final[str] = DashboardCounter.__tablename__
+
+
+def _add(kind: str, column: str, condition: str, row: str, delta: int) -> str:
+    return f"""
+        INSERT INTO {COUNTER_TABLE} (kind, day, location_id, value)
+        SELECT '{kind}', date({row}.{column}), COALESCE({row}.location_id, 0), {delta}
+        WHERE {condition.format(row=row)}
+        ON CONFLICT (kind, day, location_id) DO UPDATE SET value = value + excluded.value;
+    """
+
+
+def triggers() -> list[str]:
+    """Returns the DDL of the triggers keeping `DashboardCounter` up to date."""
+    ddl = []
+    for kind, table, column, watched, condition in COUNTERS:
+        ddl += [
+            f'CREATE TRIGGER IF NOT EXISTS dashboard_{kind}_insert AFTER INSERT ON "{table}" '
+            f"BEGIN {_add(kind, column, condition, 'NEW', 1)} END",
+            f'CREATE TRIGGER IF NOT EXISTS dashboard_{kind}_delete AFTER DELETE ON "{table}" '
+            f"BEGIN {_add(kind, column, condition, 'OLD', -1)} END",
+            f'CREATE TRIGGER IF NOT EXISTS dashboard_{kind}_update AFTER UPDATE OF {", ".join(watched)} ON "{table}" '
+            f"BEGIN {_add(kind, column, condition, 'OLD', -1)} {_add(kind, column, condition, 'NEW', 1)} END",
+        ]
+    return ddl
+
+
+def install(connection: Connection, rebuild: bool = False) -> None:
+    """Creates the counter triggers and optionally recounts every counter."""
+    for ddl in triggers():
+        connection.exec_driver_sql(ddl)
+
+    if not rebuild:
+        return
+
+    connection.exec_driver_sql(f"DELETE FROM {COUNTER_TABLE}")
+    for kind, table, column, _, condition in COUNTERS:
+        connection.exec_driver_sql(
+            f"""
+            INSERT INTO {COUNTER_TABLE} (kind, day, location_id, value)
+            SELECT '{kind}', date({column}), COALESCE(location_id, 0), COUNT(*)
+            FROM "{table}" WHERE {condition.format(row=f'"{table}"')}
+            GROUP BY 2, 3
+            """
+        )
+
+
+def _total(session: Session, kind: str, *conditions) -> int:
+    return session.exec(
+        select(func.coalesce(func.sum(DashboardCounter.value), 0)).where(DashboardCounter.kind == kind, *conditions)
+    ).one()
+
+
+def overdue_assignments(session: Session, today: date) -> int:
+    """Returns the number of active assignments with a deadline before `today`."""
+    return _total(session, ASSIGNMENTS, DashboardCounter.day < today)
+
+
+def due_assignments(session: Session, day: date) -> int:
+    return _total(session, ASSIGNMENTS, DashboardCounter.day == day)
+
+
+def events_on(session: Session, day: date) -> int:
+    return _total(session, EVENTS, DashboardCounter.day == day)
+
+
+def reservations_by_location(session: Session, start: date, end: date) -> list[tuple[str, int]]:
+    """Returns the number of reservations per location starting from `start` to `end` inclusive."""
+    total = func.sum(DashboardCounter.value)
+    return session.exec(
+        select(Location.name, total)
+        .join(Location, Location.id == DashboardCounter.location_id)
+        .where(
+            DashboardCounter.kind == RESERVATIONS,
+            DashboardCounter.day >= start,
+            DashboardCounter.day <= end,
+        )
+        .group_by(Location.id)
+        .having(total > 0)
+        .order_by(Location.name)
+    ).all()
@@ -0,0 +1,75 @@
+import threading
+from contextlib import contextmanager
+from typing import Final, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.config import INTERRUPT_STEPS
+
+
+class QueryCancelled(Exception):
+    """Raised when the queries run under a cancelled `CancelToken` were interrupted."""
+
+
+class CancelToken:
+    """Cancels the queries run under it from another thread (see `QueryInterrupts.cancellable`)."""
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+
+class QueryInterrupts:
+    """Interrupts the running statements of cancelled tokens inside SQLite.
+
+    The connections a thread checks out while it runs queries under a token
+    get a progress handler, which SQLite calls every `steps` virtual machine
+    instructions and which aborts the statement once the token is cancelled.
+    Other connections have no handler and pay nothing.
+    """
+
+    def __init__(self, steps: int = INTERRUPT_STEPS) -> None:
+        self.steps = steps
+        self._local = threading.local()
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    @contextmanager
+    def cancellable(self, token: CancelToken) -> Iterator[CancelToken]:
+        """Runs the queries of the block on this thread so that `token.cancel()` interrupts them.
+
+        Raises:
+            QueryCancelled: If a query was interrupted.
+        """
+        self._local.token = token
+        try:
+            yield token
+        except OperationalError as error:
+            if token.cancelled and "interrupted" in str(error.orig):
+                raise QueryCancelled() from error
+            raise
+        finally:
+            self._local.token = None
+
+    def _checkout(self, dbapi_connection, record, proxy) -> None:
+        token: CancelToken | None = getattr(self._local, "token", None)
+        if token is not None:
+            dbapi_connection.set_progress_handler(lambda: token.cancelled, self.steps)
+            record.info["interruptible"] = True
+
+    def _checkin(self, dbapi_connection, record) -> None:
+        if record.info.pop("interruptible", False) and dbapi_connection is not None:
+            dbapi_connection.set_progress_handler(None, 0)
+
+
+INTERRUPTS: Final[QueryInterrupts] = QueryInterrupts()
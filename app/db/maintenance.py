@@ -0,0 +1,140 @@
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Final
+
+from sqlalchemy.engine import Engine
+
+from app.config import MAINTENANCE_ANALYSIS_LIMIT, MAINTENANCE_VACUUM_PAGES
+from app.db import ARCHIVE_SCHEMA, ENGINE
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS: Final[tuple[str, ...]] = ("main", ARCHIVE_SCHEMA)
+NONE: Final[int] = 0
+INCREMENTAL: Final[int] = 2
+
+
+@dataclass(frozen=True, slots=True)
+class FileStats:
+    page_size: int
+    page_count: int
+    freelist_count: int
+
+    @property
+    def size(self) -> int:
+        return self.page_size * self.page_count
+
+    @property
+    def fragmentation(self) -> float:
+        """The share of the file taken by free pages."""
+        return self.freelist_count / self.page_count if self.page_count else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.size / 2**20:.1f} MB, {self.fragmentation:.0%} free"
+
+
+@dataclass(frozen=True, slots=True)
+class MaintenanceReport:
+    schema: str
+    before: FileStats
+    after: FileStats
+    vacuumed: bool
+    duration: float
+
+    def __str__(self) -> str:
+        vacuum = "" if self.vacuumed else " (incremental vacuum is off, run a full maintenance once)"
+        return f"{self.schema}: {self.before} -> {self.after} in {self.duration:.2f}s{vacuum}"
+
+
+def _pragma(connection: sqlite3.Connection, schema: str, name: str) -> int:
+    (value,), = connection.execute(f"PRAGMA {schema}.{name}").fetchall()
+    return value
+
+
+def file_stats(connection: sqlite3.Connection, schema: str = "main") -> FileStats:
+    return FileStats(
+        _pragma(connection, schema, "page_size"),
+        _pragma(connection, schema, "page_count"),
+        _pragma(connection, schema, "freelist_count"),
+    )
+
+
+def _expired(deadline: float | None) -> bool:
+    return deadline is not None and time.perf_counter() >= deadline
+
+
+def _switch_to_incremental(connection: sqlite3.Connection, schema: str) -> None:
+    # Switching an existing file takes a full VACUUM once
+    connection.execute(f"PRAGMA {schema}.auto_vacuum = INCREMENTAL")
+    connection.execute(f"VACUUM {schema}")
+
+
+def _maintain(connection: sqlite3.Connection, schema: str, full: bool, deadline: float | None) -> MaintenanceReport:
+    start = time.perf_counter()
+    before = file_stats(connection, schema)
+
+    # Out of budget the statistics wait for the next run as well
+    if not _expired(deadline):
+        if full and _pragma(connection, schema, "auto_vacuum") != INCREMENTAL:
+            _switch_to_incremental(connection, schema)
+        if full:
+            connection.execute(f"ANALYZE {schema}")
+        else:
+            connection.execute(f"PRAGMA {schema}.optimize")
+
+    vacuumed = _pragma(connection, schema, "auto_vacuum") == INCREMENTAL
+    if vacuumed:
+        # Small steps take the write lock only briefly
+        while _pragma(connection, schema, "freelist_count") and not _expired(deadline):
+            connection.execute(f"PRAGMA {schema}.incremental_vacuum({MAINTENANCE_VACUUM_PAGES})").fetchall()
+
+    return MaintenanceReport(schema, before, file_stats(connection, schema), vacuumed, time.perf_counter() - start)
+
+
+def enable_incremental_vacuum(engine: Engine = ENGINE) -> list[str]:
+    """Switches the files without auto-vacuum to incremental auto-vacuum.
+
+    New files get it on creation (see `app.db`), existing ones are rewritten
+    by a VACUUM once, before the regular runs only vacuum incrementally.
+    Files in FULL mode are left to a `full` maintenance.
+
+    Returns:
+        list[str]: The schemas switched.
+    """
+    connection = engine.raw_connection()
+    try:
+        driver = connection.driver_connection
+        switched = [schema for schema in SCHEMAS if _pragma(driver, schema, "auto_vacuum") == NONE]
+        for schema in switched:
+            _switch_to_incremental(driver, schema)
+    finally:
+        connection.close()
+
+    for schema in switched:
+        logger.info("Switched %s to incremental auto-vacuum", schema)
+    return switched
+
+
+def maintain(full: bool = False, budget: float | None = None) -> list[MaintenanceReport]:
+    """Refreshes the planner statistics and reclaims the free pages of the database and its archive.
+
+    `PRAGMA optimize` analyzes only the tables whose statistics are stale;
+    a `full` run analyzes everything and switches the files to incremental
+    auto-vacuum if needed, which rewrites them once. Free pages are then
+    released `MAINTENANCE_VACUUM_PAGES` at a time until none are left.
+    Once `budget` seconds have passed no further step is started.
+    """
+    deadline = None if budget is None else time.perf_counter() + budget
+    connection = ENGINE.raw_connection()
+    try:
+        driver = connection.driver_connection
+        driver.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+        reports = [_maintain(driver, schema, full, deadline) for schema in SCHEMAS]
+    finally:
+        connection.close()
+
+    for report in reports:
+        logger.info("Maintenance of %s", report)
+    return reports
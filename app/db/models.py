@@ -4,8 +4,9 @@ from datetime import date, time, datetime
 
 from sqlmodel import SQLModel, Field, Relationship
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, String, UniqueConstraint
 from sqlalchemy.orm import declared_attr
+from sqlalchemy.types import TypeDecorator
 
 
 class Scope(Enum):
@@ -36,21 +37,38 @@ class Weekday(Enum):
         return cls(date.isoweekday())
 
 
+class SortKey(TypeDecorator):
+    """The `queries.sort_key` of a text column, stored next to it so that an index can order by it.
+
+    A column `<name>_sort_key` is written from the column `<name>` on every
+    save and compared as is. It is empty until written, as no key is.
+    """
+
+    impl = String
+    cache_ok = True
+
+
 class BaseModel(SQLModel):
     """A base model for database entities.
 
     Attributes:
         id (Optional[int]): The unique identifier for this object.
         created_at (datetime): The identity date and time for this object.
+        version (int): The number of times this object was saved, checked by every update and delete.
     """
 
     id: int = Field(primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     @declared_attr  # type: ignore
     def __tablename__(cls) -> str:
         return cls.__name__
 
+    @declared_attr  # type: ignore
+    def __mapper_args__(cls) -> dict:
+        return {"version_id_col": cls.__table__.c.version}
+
 
 class UniqueNamedModel(BaseModel):
     """A base model for unique named entities.
@@ -74,7 +92,7 @@ class AreaReservationLink(SQLModel, table=True):
         default=None, foreign_key="Area.id", primary_key=True
     )
     reservation_id: Optional[int] = Field(
-        default=None, foreign_key="Reservation.id", primary_key=True
+        default=None, foreign_key="Reservation.id", primary_key=True, index=True
     )
 
 
@@ -142,6 +160,7 @@ class Event(BaseModel, table=True):
 
     Attributes:
         title (str): The title of this event.
+        title_sort_key (str): The title as ordered when sorting.
         description (Optional[str]): The description of this event.
         start_at (datetime): The start date and time of this event.
         scope (Scope): The scope of this event.
@@ -153,9 +172,13 @@ class Event(BaseModel, table=True):
         reservations (List[Reservation]): The list of reservations associated with this event.
     """
 
+    # Ids only grow, so that the ids of archived rows are never reused (see `archive.archive`)
+    __table_args__ = {"sqlite_autoincrement": True}
+
     title: str = Field(max_length=256, index=True)
+    title_sort_key: str = Field(default="", sa_type=SortKey, index=True, sa_column_kwargs={"server_default": ""})
     description: Optional[str] = Field(default=None, max_length=1028)
-    start_at: datetime
+    start_at: datetime = Field(index=True)
     scope: Scope
 
     type_id: Optional[int] = Field(default=None, foreign_key="EventType.id")
@@ -196,6 +219,8 @@ class Assignment(BaseModel, table=True):
         location (Location): The location associated with this assignment.
     """
 
+    __table_args__ = (Index("ix_Assignment_state_deadline", "state", "deadline"), {"sqlite_autoincrement": True})
+
     class State(Enum):
         """Enumeration representing the state of an assignment.
 
@@ -210,7 +235,7 @@ class Assignment(BaseModel, table=True):
         COMPLETED = auto()
 
     state: State = State.DRAFT
-    deadline: datetime
+    deadline: datetime = Field(index=True)
     description: Optional[str] = Field(default=None, max_length=1028)
 
     type_id: Optional[int] = Field(default=None, foreign_key="AssignmentType.id")
@@ -237,8 +262,13 @@ class Reservation(BaseModel, table=True):
         areas (List[Area]): The list of areas associated with this reservation.
     """
 
-    start_at: datetime
-    end_at: datetime
+    __table_args__ = (
+        Index("ix_Reservation_location_id_start_at_end_at", "location_id", "start_at", "end_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+    start_at: datetime = Field(index=True)
+    end_at: datetime = Field(index=True)
     comment: Optional[str] = Field(default=None, max_length=1028)
 
     event_id: Optional[int] = Field(default=None, foreign_key="Event.id")
@@ -296,6 +326,7 @@ class Club(BaseModel, table=True):
 
     Attributes:
         title (str): The title of this club.
+        title_sort_key (str): The title as ordered when sorting.
         start_at (date): The start date of this club.
         type_id (Optional[int]): The unique identifier of the associated club type.
         type (Optional[EventType]): The club type associated with this club.
@@ -305,7 +336,8 @@ class Club(BaseModel, table=True):
     """
 
     title: str = Field(max_length=256, index=True)
-    start_at: date
+    title_sort_key: str = Field(default="", sa_type=SortKey, index=True, sa_column_kwargs={"server_default": ""})
+    start_at: date = Field(index=True)
 
     type_id: Optional[int] = Field(default=None, foreign_key="ClubType.id")
     type: Optional[ClubType] = Relationship(back_populates="clubs")
@@ -320,3 +352,19 @@ class Club(BaseModel, table=True):
         back_populates="club",
         sa_relationship_kwargs={"cascade": "all, delete, delete-orphan"},
     )
+
+
+class DashboardCounter(SQLModel, table=True):
+    """A daily counter maintained by database triggers (see `app.db.dashboard`).
+
+    Attributes:
+        kind (str): What is counted (e.g. active assignments by deadline).
+        day (date): The day the counted rows fall on.
+        location_id (int): The associated location or 0 if there is none.
+        value (int): The number of rows.
+    """
+
+    kind: str = Field(max_length=32, primary_key=True)
+    day: date = Field(primary_key=True)
+    location_id: int = Field(default=0, primary_key=True)
+    value: int = 0
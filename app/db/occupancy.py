@@ -0,0 +1,406 @@
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Final, Iterable, Literal
+
+import numpy as np
+from sqlalchemy import Connection, event
+from sqlalchemy.orm import ORMExecuteState, object_session
+from sqlmodel import Session, select
+
+from app.config import OCCUPANCY_SLOT_MINUTES, OCCUPANCY_HORIZON_DAYS
+from app.db import ENGINE
+from app.db.changes import CHANGES
+from app.db.models import Area, AreaReservationLink, Club, DaySchedule, Location, Reservation
+from app.db.occurrences import CLUB_OCCURRENCES
+
+# location row, area rows, first slot, end slot
+Entry = tuple[int, tuple[int, ...], int, int]
+
+WORKING_HOURS: Final[tuple[time, time]] = (time(8), time(22))
+
+
+@dataclass(frozen=True, slots=True)
+class Candidate:
+    """A free place and time found by `OccupancyIndex.find_slots`.
+
+    Attributes:
+        location_id (int): The unique identifier of the location.
+        area_ids (tuple[int, ...]): The free areas to reserve, empty if the location has none.
+        start_at (datetime): The start date and time.
+        end_at (datetime): The end date and time.
+        preferred (bool): Whether the location is one of the preferred ones.
+        spare_areas (int): The number of further areas free during the whole window.
+    """
+
+    location_id: int
+    area_ids: tuple[int, ...]
+    start_at: datetime
+    end_at: datetime
+    preferred: bool = False
+    spare_areas: int = 0
+
+
+def _window_free(busy: np.ndarray, width: int) -> np.ndarray:
+    """Returns whether each window of `width` slots along the last axis has no busy slot."""
+    counts = np.cumsum(busy, axis=-1, dtype=np.int32)
+    counts = np.concatenate([np.zeros((*busy.shape[:-1], 1), np.int32), counts], axis=-1)
+    return counts[..., width:] == counts[..., :-width]
+
+
+class OccupancyIndex:
+    """Occupancy bitmaps of every location and area at a fixed slot granularity.
+
+    Each row of `locations` and `areas` counts the reservations (and, for
+    locations, club meetings) covering every slot from `origin` on; a slot is
+    busy when its count is non-zero. Counts rather than plain bits let a
+    single reservation be removed in place without rescanning the others.
+
+    A reservation without areas occupies its whole location. A location is
+    free for a window when nothing occupies the location itself and it
+    either has no areas or at least one of them is free.
+
+    Reservations written through the ORM are applied in place once their
+    session commits, and the change bus is told they need no rebuild; any
+    other change marks the bitmaps for a rebuild on the next query.
+    """
+
+    def __init__(
+        self,
+        slot_minutes: int = OCCUPANCY_SLOT_MINUTES,
+        horizon_days: int = OCCUPANCY_HORIZON_DAYS,
+    ) -> None:
+        self.slot = timedelta(minutes=slot_minutes)
+        self.horizon = timedelta(days=horizon_days)
+        self.origin: datetime | None = None
+        self.locations: np.ndarray = np.zeros((0, 0), np.int16)
+        self.areas: np.ndarray = np.zeros((0, 0), np.int16)
+        self.location_ids: list[int] = []
+        self.area_ids: list[int] = []
+        self._location_rows: dict[int, int] = {}
+        self._area_rows: dict[int, int] = {}
+        self._area_locations: np.ndarray = np.zeros(0, np.intp)
+        self._location_has_areas: np.ndarray = np.zeros(0, bool)
+        self._reservations: dict[int, Entry] = {}
+        self._stale = True
+        self._unexplained = False
+        self._lock = threading.RLock()
+
+    @property
+    def end(self) -> datetime | None:
+        if self.origin is None:
+            return None
+        return self.origin + self.slot * self.locations.shape[1]
+
+    def install(self) -> None:
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(Reservation, name, getattr(self, f"_{name}"))
+        event.listen(Session, "do_orm_execute", self._do_orm_execute)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_soft_rollback", self._after_soft_rollback)
+        # The reservations the ORM reported itself are applied by `_after_commit`
+        CHANGES.subscribe(self.invalidate, skip_explained=True)
+
+    def invalidate(self, models: frozenset[type] = frozenset({Location})) -> None:
+        if models & {Area, Location, Club, DaySchedule}:
+            self._stale = True
+        elif models & {Reservation, AreaReservationLink}:
+            self._unexplained = True
+
+    def span(self, start: datetime, end: datetime) -> slice:
+        """Returns the slots covering `[start, end)`, building the bitmaps if needed."""
+        with self._lock:
+            self._ensure(start, end)
+            return slice((start - self.origin) // self.slot, -((self.origin - end) // self.slot))
+
+    def _ensure(self, start: datetime, end: datetime) -> None:
+        if not (self._stale or self._unexplained) and self.origin <= start and end <= self.end:
+            return
+
+        today = datetime.combine(date.today(), time())
+        origin = min(today, datetime.combine(start.date(), time()))
+        until = max(today + self.horizon, datetime.combine(end.date() + timedelta(days=1), time()))
+        self._build(origin, until)
+
+    def _build(self, origin: datetime, until: datetime) -> None:
+        self._stale = self._unexplained = False
+        slots = (until - origin) // self.slot
+        overlaps = (Reservation.end_at > origin, Reservation.start_at < until)
+
+        with Session(ENGINE) as session:
+            locations = session.exec(select(Location.id)).all()
+            areas = session.exec(select(Area.id, Area.location_id)).all()
+            reservations = session.exec(
+                select(Reservation.id, Reservation.location_id, Reservation.start_at, Reservation.end_at).where(*overlaps)
+            ).all()
+            links = session.exec(
+                select(AreaReservationLink.reservation_id, AreaReservationLink.area_id)
+                .join(Reservation, Reservation.id == AreaReservationLink.reservation_id)
+                .where(*overlaps)
+            ).all()
+
+        self.origin = origin
+        self.location_ids = list(locations)
+        self.area_ids = [area_id for area_id, _ in areas]
+        self._location_rows = {location_id: row for row, location_id in enumerate(self.location_ids)}
+        self._area_rows = {area_id: row for row, area_id in enumerate(self.area_ids)}
+        self._area_locations = np.array([self._location_rows.get(location_id, -1) for _, location_id in areas], np.intp)
+        self._location_has_areas = np.zeros(len(self.location_ids), bool)
+        self._location_has_areas[self._area_locations[self._area_locations >= 0]] = True
+
+        reservation_areas: dict[int, tuple[int, ...]] = {}
+        for reservation_id, area_id in links:
+            if area_id in self._area_rows:
+                reservation_areas[reservation_id] = (*reservation_areas.get(reservation_id, ()), self._area_rows[area_id])
+
+        starts, ends = self._slots([row[2] for row in reservations], [row[3] for row in reservations], slots)
+        self._reservations = {
+            reservation_id: (self._location_rows.get(location_id, -1), reservation_areas.get(reservation_id, ()), first, last)
+            for (reservation_id, location_id, *_), first, last in zip(reservations, starts.tolist(), ends.tolist())
+        }
+
+        # Reservations without areas and club meetings occupy whole locations.
+        whole = [entry for entry in self._reservations.values() if not entry[1]]
+        occurrences = list(CLUB_OCCURRENCES.occurrences(origin, until, self.location_ids))
+        club_starts, club_ends = self._slots(
+            [occurrence.start_at for occurrence in occurrences],
+            [occurrence.end_at for occurrence in occurrences],
+            slots,
+        )
+        self.locations = self._counts(
+            len(self.location_ids),
+            slots,
+            np.array([entry[0] for entry in whole] + [self._location_rows[o.location_id] for o in occurrences], np.intp),
+            np.concatenate([np.array([entry[2] for entry in whole], np.intp), club_starts]),
+            np.concatenate([np.array([entry[3] for entry in whole], np.intp), club_ends]),
+        )
+
+        parts = [(area_row, first, last) for _, rows, first, last in self._reservations.values() for area_row in rows]
+        self.areas = self._counts(len(self.area_ids), slots, *np.array(parts, np.intp).reshape(-1, 3).T)
+
+    def _slots(self, starts: list[datetime], ends: list[datetime], slots: int) -> tuple[np.ndarray, np.ndarray]:
+        """Converts datetimes to the first and past-the-end slots covering them (vectorised)."""
+        origin = np.datetime64(self.origin, "us")
+        step = np.timedelta64(self.slot)
+        first = (np.array(starts, "datetime64[us]") - origin) // step
+        last = -((origin - np.array(ends, "datetime64[us]")) // step)
+        return np.clip(first, 0, slots).astype(np.intp), np.clip(last, 0, slots).astype(np.intp)
+
+    @staticmethod
+    def _counts(rows: int, slots: int, row: np.ndarray, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        valid = (row >= 0) & (first < last)
+        delta = np.zeros((rows, slots + 1), np.int16)
+        np.add.at(delta, (row[valid], first[valid]), 1)
+        np.add.at(delta, (row[valid], last[valid]), -1)
+        return np.cumsum(delta, axis=1, dtype=np.int16)[:, :-1]
+
+    def add(self, reservation_id: int, location_id: int, area_ids: Iterable[int], start: datetime, end: datetime) -> None:
+        """Marks a reservation in place."""
+        with self._lock:
+            if self._stale or self.origin is None:
+                return
+            if location_id not in self._location_rows or any(area_id not in self._area_rows for area_id in area_ids):
+                self._stale = True
+                return
+
+            slots = self.locations.shape[1]
+            entry = (
+                self._location_rows[location_id],
+                tuple(self._area_rows[area_id] for area_id in area_ids),
+                min(slots, max(0, (start - self.origin) // self.slot)),
+                min(slots, max(0, -((self.origin - end) // self.slot))),
+            )
+            self._reservations[reservation_id] = entry
+            self._apply(entry, 1)
+
+    def remove(self, reservation_id: int) -> None:
+        """Clears a reservation in place."""
+        with self._lock:
+            entry = self._reservations.pop(reservation_id, None)
+            if entry is not None and not self._stale:
+                self._apply(entry, -1)
+
+    def _apply(self, entry: Entry, delta: int) -> None:
+        location_row, area_rows, first, last = entry
+        if first >= last:
+            return
+        if area_rows:
+            self.areas[list(area_rows), first:last] += delta
+        else:
+            self.locations[location_row, first:last] += delta
+
+    def free_locations(self, start: datetime, end: datetime) -> list[int]:
+        """Returns the locations with room for an event during `[start, end)`."""
+        with self._lock:
+            span = self.span(start, end)
+            location_free = ~self.locations[:, span].any(axis=1)
+            area_free = ~self.areas[:, span].any(axis=1) & (self._area_locations >= 0)
+            any_area_free = np.zeros(len(self.location_ids), bool)
+            any_area_free[self._area_locations[area_free]] = True
+            free = location_free & (~self._location_has_areas | any_area_free)
+            return [self.location_ids[row] for row in np.flatnonzero(free)]
+
+    def free_areas(self, location_id: int, start: datetime, end: datetime) -> set[int]:
+        """Returns the free areas of the location during `[start, end)`."""
+        with self._lock:
+            span = self.span(start, end)
+            location_row = self._location_rows.get(location_id)
+            if location_row is None or self.locations[location_row, span].any():
+                return set()
+            rows = np.flatnonzero(self._area_locations == location_row)
+            return {self.area_ids[row] for row in rows[~self.areas[rows, span].any(axis=1)]}
+
+    def is_free(self, location_id: int, start: datetime, end: datetime, area_ids: Iterable[int] = ()) -> bool:
+        """Returns whether the location, or the given areas of it, are free during `[start, end)`."""
+        area_ids = set(area_ids)
+        if area_ids:
+            return area_ids <= self.free_areas(location_id, start, end)
+        return location_id in self.free_locations(start, end)
+
+    def free_slots(self, location_id: int, start: datetime, end: datetime) -> int:
+        """Returns the number of slots in `[start, end)` the location has room in."""
+        with self._lock:
+            span = self.span(start, end)
+            location_row = self._location_rows.get(location_id)
+            if location_row is None:
+                return 0
+            free = self.locations[location_row, span] == 0
+            rows = np.flatnonzero(self._area_locations == location_row)
+            if len(rows):
+                free &= (self.areas[rows, span] == 0).any(axis=0)
+            return int(np.count_nonzero(free))
+
+    def find_slots(
+        self,
+        duration: timedelta,
+        start: datetime,
+        end: datetime,
+        areas: int = 1,
+        preferred: Iterable[int] = (),
+        only_preferred: bool = False,
+        order: Literal["earliest", "best"] = "earliest",
+        limit: int = 10,
+        step: timedelta = timedelta(minutes=30),
+        hours: tuple[time, time] = WORKING_HOURS,
+    ) -> list[Candidate]:
+        """Searches every location for free windows of `duration` within `[start, end)`.
+
+        Windows start every `step` and lie within the daily `hours`. A location
+        without areas counts as a single area. `earliest` ranks candidates by
+        start, `best` puts preferred locations and tight fits first. Each
+        location contributes non-overlapping windows only.
+        """
+        preferred = set(preferred)
+        with self._lock:
+            span = self.span(start, end)
+            width = -(-duration // self.slot)
+            length = span.stop - span.start - width + 1
+            if width <= 0 or length <= 0:
+                return []
+
+            # Allowed window starts: aligned to `step` and within working hours.
+            offsets = span.start + np.arange(length)
+            minutes = (offsets * (self.slot // timedelta(minutes=1))) % (24 * 60)
+            first, last = (value.hour * 60 + value.minute for value in hours)
+            allowed = (minutes >= first) & (minutes + width * (self.slot // timedelta(minutes=1)) <= last)
+            allowed &= offsets % max(1, step // self.slot) == 0
+            # The span is widened to whole slots, but the windows must lie within `[start, end)`
+            allowed &= (offsets >= -((self.origin - start) // self.slot)) & (offsets <= (end - self.origin - duration) // self.slot)
+
+            location_ok = _window_free(self.locations[:, span] > 0, width) & allowed
+            area_ok = _window_free(self.areas[:, span] > 0, width)
+
+            candidates = []
+            for row, location_id in enumerate(self.location_ids):
+                is_preferred = location_id in preferred
+                if only_preferred and not is_preferred:
+                    continue
+
+                area_rows = np.flatnonzero(self._area_locations == row)
+                if len(area_rows):
+                    free_counts = area_ok[area_rows].sum(axis=0)
+                    ok = location_ok[row] & (free_counts >= areas)
+                elif areas <= 1:
+                    free_counts = None
+                    ok = location_ok[row]
+                else:
+                    continue
+
+                taken, found = -width, 0
+                for index in np.flatnonzero(ok).tolist():
+                    if index < taken + width:
+                        continue
+                    taken, found = index, found + 1
+                    chosen = area_rows[area_ok[area_rows, index]] if free_counts is not None else ()
+                    window_start = self.origin + self.slot * (span.start + index)
+                    candidates.append(
+                        Candidate(
+                            location_id,
+                            tuple(self.area_ids[area_row] for area_row in chosen[:areas]),
+                            window_start,
+                            window_start + duration,
+                            is_preferred,
+                            len(chosen) - areas if free_counts is not None else 0,
+                        )
+                    )
+                    # The earliest `limit` windows overall are among the earliest of each location.
+                    if order == "earliest" and found >= limit:
+                        break
+
+        if order == "best":
+            candidates.sort(key=lambda c: (not c.preferred, c.spare_areas, c.start_at))
+        else:
+            candidates.sort(key=lambda c: (c.start_at, not c.preferred, c.spare_areas))
+        return candidates[:limit]
+
+    def _record(self, connection: Connection, target: Reservation, *ops) -> None:
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("occupancy", []).extend(ops)
+            session.info.setdefault("occupancy_connections", set()).add(connection)
+
+    def _added(self, target: Reservation) -> tuple:
+        areas = target.__dict__.get("areas")
+        return ("add", target.id, target.location_id, None if areas is None else [a.id for a in areas], target.start_at, target.end_at)
+
+    def _after_insert(self, mapper, connection, target: Reservation) -> None:
+        self._record(connection, target, self._added(target))
+
+    def _after_update(self, mapper, connection, target: Reservation) -> None:
+        self._record(connection, target, ("remove", target.id), self._added(target))
+
+    def _after_delete(self, mapper, connection, target: Reservation) -> None:
+        self._record(connection, target, ("remove", target.id))
+
+    def _do_orm_execute(self, state: ORMExecuteState) -> None:
+        if (state.is_update or state.is_delete or state.is_insert) and state.bind_mapper is not None:
+            if state.bind_mapper.class_ in (Reservation, AreaReservationLink):
+                state.session.info["occupancy_unexplained"] = True
+
+    def _after_commit(self, session: Session) -> None:
+        ops = session.info.pop("occupancy", None)
+        connections = session.info.pop("occupancy_connections", set())
+        unexplained = session.info.pop("occupancy_unexplained", False)
+        if not ops:
+            return
+
+        with self._lock:
+            for op, reservation_id, *values in ops:
+                if op == "remove":
+                    self.remove(reservation_id)
+                elif values[1] is None:
+                    self._stale = True
+                else:
+                    self.add(reservation_id, values[0], values[1], *values[2:])
+        if not unexplained:
+            for connection in connections:
+                CHANGES.explain(connection, frozenset({Reservation, AreaReservationLink}))
+
+    def _after_soft_rollback(self, session: Session, _) -> None:
+        session.info.pop("occupancy", None)
+        session.info.pop("occupancy_connections", None)
+        session.info.pop("occupancy_unexplained", None)
+
+
+OCCUPANCY: Final[OccupancyIndex] = OccupancyIndex()
+OCCUPANCY.install()
@@ -0,0 +1,130 @@
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Final, Iterable, Iterator
+
+from sqlmodel import Session, select
+
+from app.db import ENGINE
+from app.db.changes import CHANGES
+from app.db.models import Club, DaySchedule, Location
+
+MINUTE: Final[timedelta] = timedelta(minutes=1)
+MINUTES_PER_DAY: Final[int] = 24 * 60
+
+
+@dataclass(frozen=True, slots=True)
+class Occurrence:
+    """A dated meeting of a club.
+
+    Attributes:
+        club_id (int): The unique identifier of the club.
+        location_id (int): The unique identifier of the location the club meets in.
+        start_at (datetime): The start date and time of the meeting.
+        end_at (datetime): The end date and time of the meeting.
+    """
+
+    club_id: int
+    location_id: int
+    start_at: datetime
+    end_at: datetime
+
+
+# start minute, end minute, first date, club id
+Slot = tuple[int, int, date, int]
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+class ClubOccurrences:
+    """Expands the weekly club schedules into dated occurrences on demand.
+
+    The schedules are cached as sorted `Slot` tuples per location and weekday,
+    so a check only looks at the slots of one location on the days it spans.
+    The cache is dropped whenever clubs, their days or locations change.
+    """
+
+    def __init__(self) -> None:
+        self._slots: dict[int, list[list[Slot]]] | None = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, models: frozenset[type] = frozenset({Club})) -> None:
+        if models & {Club, DaySchedule, Location}:
+            self._slots = None
+
+    @property
+    def slots(self) -> dict[int, list[list[Slot]]]:
+        slots = self._slots
+        if slots is not None:
+            return slots
+
+        with self._lock:
+            if self._slots is None:
+                self._slots = self._load()
+            return self._slots
+
+    def _load(self) -> dict[int, list[list[Slot]]]:
+        with Session(ENGINE) as session:
+            rows = session.exec(
+                select(
+                    Club.location_id,
+                    DaySchedule.weekday,
+                    DaySchedule.start_at,
+                    DaySchedule.end_at,
+                    Club.start_at,
+                    Club.id,
+                )
+                .join(Club, Club.id == DaySchedule.club_id)
+                .where(Club.location_id.is_not(None))
+            ).all()
+
+        slots: dict[int, list[list[Slot]]] = {}
+        for location_id, weekday, start_at, end_at, first_date, club_id in rows:
+            week = slots.setdefault(location_id, [[] for _ in range(7)])
+            week[weekday.value - 1].append((_minutes(start_at), _minutes(end_at), first_date, club_id))
+
+        for week in slots.values():
+            for day in week:
+                day.sort()
+        return slots
+
+    def occurrences(
+        self, start: datetime, end: datetime, location_ids: Iterable[int] | None = None
+    ) -> Iterator[Occurrence]:
+        """Yields the occurrences overlapping `[start, end)`."""
+        slots = self.slots
+        for location_id in slots if location_ids is None else location_ids:
+            week = slots.get(location_id)
+            if week is None:
+                continue
+
+            day = start.date()
+            while datetime.combine(day, time()) < end:
+                midnight = datetime.combine(day, time())
+                begin = max(0, (start - midnight) // MINUTE)
+                finish = min(MINUTES_PER_DAY, -((midnight - end) // MINUTE))
+                day_slots = week[day.weekday()]
+                # Slots are sorted by start, so those starting at or after `finish` are skipped.
+                for slot_start, slot_end, first_date, club_id in day_slots[: bisect_left(day_slots, (finish,))]:
+                    if slot_end > begin and first_date <= day:
+                        yield Occurrence(
+                            club_id,
+                            location_id,
+                            midnight + timedelta(minutes=slot_start),
+                            midnight + timedelta(minutes=slot_end),
+                        )
+                day += timedelta(days=1)
+
+    def conflicts(self, location_id: int, start: datetime, end: datetime) -> bool:
+        """Returns whether a club meets in the location during `[start, end)`."""
+        return next(self.occurrences(start, end, (location_id,)), None) is not None
+
+    def busy_locations(self, start: datetime, end: datetime) -> set[int]:
+        return {location_id for location_id in self.slots if self.conflicts(location_id, start, end)}
+
+
+CLUB_OCCURRENCES: Final[ClubOccurrences] = ClubOccurrences()
+CHANGES.subscribe(CLUB_OCCURRENCES.invalidate)
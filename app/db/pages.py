@@ -0,0 +1,176 @@
+from array import array
+from collections import OrderedDict
+from typing import Any, Final, Sequence
+
+from sqlalchemy import ColumnElement, and_, bindparam, func, or_, type_coerce
+from sqlalchemy.types import NullType
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+from app.config import TABLE_CACHED_PAGES, TABLE_PAGE_SIZE
+from app.db import ENGINE
+from app.db.profiling import PROFILER, ActionStats
+from app.db.queries import sort_expression
+
+SORT_KEY: Final[str] = "sort_key"
+
+
+class Pager:
+    """Selects the rows of a statement page by page.
+
+    The statement must select an `id` column; the rows are ordered by its
+    `sort_key` column, if any, and then by id. The ids of a page are
+    selected first, so the other columns are only computed for the rows of
+    the page.
+
+    If the order is `indexed`, a page following one fetched before is sought
+    from the keys of the last row of that page (keyset pagination), which
+    costs the same anywhere in the table; other pages are selected with
+    `OFFSET`. Otherwise every page would sort all the rows again, so the
+    ordered ids are selected once instead (see `PagedRows`).
+    """
+
+    def __init__(self, statement: Select, descending: bool = False, indexed: bool = True, size: int = TABLE_PAGE_SIZE) -> None:
+        rows = statement.subquery()
+        self.size = size
+        self.width = len(rows.c)
+        self.indexed = indexed
+        id = rows.c.id
+        raw_key = rows.c[SORT_KEY] if SORT_KEY in rows.c else None
+        # The keys are compared as selected, e.g. dates as their text
+        key = type_coerce(sort_expression(raw_key), NullType) if raw_key is not None else None
+
+        if key is None:
+            order = [id.desc() if descending else id]
+            keys = select(id).order_by(*order)
+            seek = {None: self._after(None, None, id, descending)}
+        else:
+            order = [key.desc(), id.desc()] if descending else [key, id]
+            keys = select(id, key).order_by(*order)
+            seek = {null: self._after(key, raw_key, id, descending, null) for null in (False, True)}
+
+        self.count_statement = select(func.count()).select_from(rows)
+        self.order_statement = select(id).order_by(*order)
+        self.offset_statement = keys.limit(size).offset(bindparam("offset"))
+        self.seek_statements = {null: keys.where(condition).limit(size) for null, condition in seek.items()}
+        self.rows_statement = select(*rows.c).where(id.in_(bindparam("ids", expanding=True)))
+        self._sorted = key is not None
+
+    @staticmethod
+    def _after(
+        key: ColumnElement | None, raw_key: ColumnElement | None, id: ColumnElement, descending: bool, null: bool = False
+    ) -> ColumnElement:
+        """Returns the condition selecting the rows after the row with the bound `key` and `id`.
+
+        The key is bounded by a range, so that an index on it is searched.
+        SQLite orders NULL before any other value, so it is compared separately.
+        """
+        after_id = id < bindparam("id") if descending else id > bindparam("id")
+        if key is None:
+            return after_id
+        if null:
+            return and_(raw_key.is_(None), after_id) if descending else or_(raw_key.is_not(None), and_(raw_key.is_(None), after_id))
+        value = bindparam("key")
+        condition = and_(key <= value, or_(key < value, after_id)) if descending else and_(key >= value, or_(key > value, after_id))
+        # Descending, the rows without a key come last
+        return or_(condition, raw_key.is_(None)) if descending and raw_key.nullable else condition
+
+    def fetch(
+        self, session: Session, number: int, parameters: dict[str, Any], anchor: tuple | None = None
+    ) -> tuple[list[tuple], tuple | None]:
+        """Fetches the page `number` of an indexed order, sought from `anchor`, the keys of the last row of the previous page, if known.
+
+        Returns:
+            tuple[list[tuple], tuple | None]: The rows of the page and the keys of its last row.
+        """
+        if anchor is None:
+            statement, keys = self.offset_statement, {"offset": number * self.size}
+        else:
+            key, id = anchor
+            statement, keys = self.seek_statements[key is None if self._sorted else None], {"key": key, "id": id}
+        page = [(row[0], row[1]) if self._sorted else (row, None) for row in session.exec(statement, params={**parameters, **keys})]
+        if not page:
+            return [], None
+        last_id, last_key = page[-1]
+        return self.rows(session, parameters, [id for id, _ in page]), (last_key, last_id)
+
+    def order(self, session: Session, parameters: dict[str, Any]) -> array:
+        """Returns the ids of all the rows in order."""
+        # Read from the cursor as they come rather than buffered as ORM results
+        return array("q", session.connection().execute(self.order_statement, parameters).scalars())
+
+    def rows(self, session: Session, parameters: dict[str, Any], ids: Sequence[int]) -> list[tuple]:
+        """Returns the rows with `ids` in the same order."""
+        rows = {row[0]: tuple(row) for row in session.exec(self.rows_statement, params={**parameters, "ids": list(ids)})}
+        # A row deleted by someone else in between
+        missing = (None,) * self.width
+        return [rows.get(id, missing) for id in ids]
+
+
+class PagedRows(Sequence[tuple]):
+    """The rows of a `Pager` fetched a page at a time as they are read.
+
+    The number of rows is counted once and only the `cached_pages` pages
+    read last are kept. For an indexed order the keys of the last row of
+    every page fetched are remembered, so paging on from any page seen
+    before stays a keyset seek; otherwise the ordered ids, 8 bytes a row,
+    are selected with the first page.
+    """
+
+    stats: ActionStats | None = None
+
+    def __init__(self, pager: Pager, parameters: dict[str, Any], cached_pages: int = TABLE_CACHED_PAGES) -> None:
+        self._pager = pager
+        self._parameters = parameters
+        self._cached_pages = cached_pages
+        self._pages: OrderedDict[int, list[tuple]] = OrderedDict()
+        self._anchors: dict[int, tuple] = {}
+        self._order: array | None = None
+        # A row deleted by someone else since the count was taken
+        self._missing = (None,) * pager.width
+        with Session(ENGINE) as session:
+            self._count = session.exec(pager.count_statement, params=parameters).one()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, row: int) -> tuple:
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        number, offset = divmod(row, self._pager.size)
+        rows = self.page(number)
+        return rows[offset] if offset < len(rows) else self._missing
+
+    def __delitem__(self, row: int) -> None:
+        """Forgets a row deleted from the database; the rows after it are fetched again."""
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        self._count -= 1
+        if self._order is not None and row < len(self._order):
+            del self._order[row]
+        first = row // self._pager.size
+        for number in [number for number in self._pages if number >= first]:
+            del self._pages[number]
+        for number in [number for number in self._anchors if number >= first]:
+            del self._anchors[number]
+
+    def page(self, number: int) -> list[tuple]:
+        rows = self._pages.get(number)
+        if rows is not None:
+            self._pages.move_to_end(number)
+            return rows
+
+        with PROFILER.attach(self.stats), Session(ENGINE) as session:
+            if self._pager.indexed:
+                rows, anchor = self._pager.fetch(session, number, self._parameters, self._anchors.get(number - 1))
+                if anchor is not None:
+                    self._anchors[number] = anchor
+            else:
+                if self._order is None:
+                    self._order = self._pager.order(session, self._parameters)
+                size = self._pager.size
+                rows = self._pager.rows(session, self._parameters, self._order[number * size : (number + 1) * size])
+        self._pages[number] = rows
+        if len(self._pages) > self._cached_pages:
+            self._pages.popitem(last=False)
+        return rows
@@ -0,0 +1,190 @@
+import re
+import json
+import logging
+import threading
+from time import perf_counter
+from datetime import datetime
+from functools import wraps
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Final, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import SLOW_QUERY_THRESHOLD, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+UNATTRIBUTED: Final[str] = "(вне действий)"
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalizes a statement so that repeated executions share one shape.
+
+    Args:
+        statement (str): The SQL text as sent to the DBAPI cursor.
+
+    Returns:
+        str: The statement with collapsed whitespace and `IN` lists.
+    """
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass
+class ActionStats:
+    """Statistics of the statements executed while handling one UI action.
+
+    Attributes:
+        name (str): The name of the action (e.g. `EventTable.refresh`).
+        started_at (datetime): The date and time the action was started.
+        duration (float): The wall time of the action in seconds.
+        statements (int): The number of executed statements.
+        sql_time (float): The total time spent in the database in seconds.
+        shapes (Counter): The number of executions per statement shape.
+        slow (list[tuple[str, float]]): The statements slower than the threshold.
+    """
+
+    name: str
+    started_at: datetime = field(default_factory=datetime.now)
+    duration: float = 0.0
+    statements: int = 0
+    sql_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    slow: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def n_plus_one(self) -> list[tuple[str, int]]:
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration": self.duration,
+            "statements": self.statements,
+            "sql_time": self.sql_time,
+            "shapes": dict(self.shapes),
+            "n_plus_one": self.n_plus_one,
+            "slow": self.slow,
+        }
+
+
+class Profiler:
+    """Attributes executed SQL statements to the UI actions that caused them.
+
+    Statements executed outside of `action` are collected under `UNATTRIBUTED`.
+    """
+
+    def __init__(self, history: int = 200) -> None:
+        self.actions: deque[ActionStats] = deque(maxlen=history)
+        self.unattributed = ActionStats(UNATTRIBUTED)
+        self.installed = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self) -> list[ActionStats]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+        self.installed = True
+
+    @contextmanager
+    def action(self, name: str) -> Iterator[ActionStats | None]:
+        with self.attach(self.track(name)) as stats:
+            yield stats
+
+    def track(self, name: str) -> ActionStats | None:
+        """Registers an action whose statements are attached to it later.
+
+        Used for work spread across many event loop iterations, e.g. the
+        `data()` calls a view makes while painting a freshly loaded model.
+        """
+        if not self.installed:
+            return None
+
+        stats = ActionStats(name)
+        with self._lock:
+            self.actions.append(stats)
+        return stats
+
+    @contextmanager
+    def attach(self, stats: ActionStats | None) -> Iterator[ActionStats | None]:
+        if stats is None:
+            yield None
+            return
+
+        self._stack.append(stats)
+        start = perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.duration += perf_counter() - start
+            self._stack.pop()
+
+    def profiled(self, name: str):
+        """Decorates a function so that its statements are attributed to `name`."""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.action(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def clear(self) -> None:
+        with self._lock:
+            self.actions.clear()
+            self.unattributed = ActionStats(UNATTRIBUTED)
+
+    def dump(self, path: str) -> None:
+        with self._lock:
+            data = [stats.as_dict() for stats in (*self.actions, self.unattributed)]
+        with open(path, "w", encoding="UTF-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("profiling_start", []).append(perf_counter())
+
+    def _handle_error(self, context) -> None:
+        # A failed statement is not timed
+        if context.connection is not None and context.connection.info.get("profiling_start"):
+            context.connection.info["profiling_start"].pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = perf_counter() - conn.info["profiling_start"].pop()
+        stats = self._stack[-1] if self._stack else self.unattributed
+        shape = statement_shape(statement)
+
+        with self._lock:
+            stats.statements += 1
+            stats.sql_time += elapsed
+            stats.shapes[shape] += 1
+            count = stats.shapes[shape]
+            if elapsed >= SLOW_QUERY_THRESHOLD:
+                stats.slow.append((shape, elapsed))
+
+        if count == N_PLUS_ONE_THRESHOLD and stats is not self.unattributed:
+            logger.warning("N+1 in '%s': %s", stats.name, shape)
+        if elapsed >= SLOW_QUERY_THRESHOLD:
+            logger.warning("Slow query in '%s' (%.3f s): %s", stats.name, elapsed, shape)
+
+
+PROFILER: Final[Profiler] = Profiler()
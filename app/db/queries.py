@@ -0,0 +1,128 @@
+from typing import Final, Iterable
+
+from sqlalchemy import ColumnElement, Enum, String, case, event, func, inspect
+from sqlalchemy.orm import RelationshipDirection
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlmodel import select
+from sqlmodel.sql.expression import Select, SelectOfScalar
+
+from app.db.models import BaseModel, SortKey
+
+SORT_KEY_FUNCTION: Final[str] = "sort_key_ru"
+SORT_KEY_SUFFIX: Final[str] = "_sort_key"
+
+
+def collation_key(value: str) -> tuple[str, str]:
+    """Case-insensitive key placing `ё` next to `е` as in the Russian alphabet."""
+    folded = value.casefold()
+    return folded.replace("ё", "е"), folded
+
+
+def sort_key(value: str | None) -> str | None:
+    """Returns `collation_key` as one text ordered the same when compared as is.
+
+    Unlike a collation, which SQLite calls for every comparison, the key is
+    computed once per row. The parts are separated by a character sorting
+    before any other.
+    """
+    return None if value is None else str.join("\x01", collation_key(value))
+
+
+def install_functions(dbapi_connection) -> None:
+    """Registers the SQL functions the queries use on a DBAPI connection.
+
+    The schema never refers to them, so the files stay readable by any SQLite tool.
+    """
+    dbapi_connection.create_function(SORT_KEY_FUNCTION, 1, sort_key, deterministic=True)
+
+
+@event.listens_for(BaseModel, "before_insert", propagate=True)
+@event.listens_for(BaseModel, "before_update", propagate=True)
+def _store_sort_keys(mapper, connection, target) -> None:
+    for column in mapper.columns:
+        if isinstance(column.type, SortKey):
+            setattr(target, column.key, sort_key(getattr(target, column.key.removesuffix(SORT_KEY_SUFFIX))))
+
+
+def sort_column(column: InstrumentedAttribute) -> InstrumentedAttribute:
+    """Returns the column storing the `sort_key` of `column` (see `SortKey`), or `column` itself if there is none."""
+    if isinstance(column, InstrumentedAttribute):
+        return getattr(column.class_, f"{column.key}{SORT_KEY_SUFFIX}", column)
+    return column
+
+
+def related(table: type[BaseModel], model: type[BaseModel]) -> InstrumentedAttribute | type[BaseModel]:
+    """Returns the many-to-one relationship of `table` leading to `model`.
+
+    Joining through the relationship keeps the `ON` clause unambiguous when
+    several joined models have foreign keys to each other. Falls back to the
+    model itself when there is no such relationship.
+    """
+    for relationship in inspect(table).relationships:
+        if relationship.direction is RelationshipDirection.MANYTOONE and relationship.mapper.class_ is model:
+            return getattr(table, relationship.key)
+    return model
+
+
+def semijoin(table: type[BaseModel], model: type[BaseModel], condition: ColumnElement) -> ColumnElement:
+    """Returns `condition` on `model` as an `EXISTS` over the relationship of `table` leading to it.
+
+    Unlike a join, the semi-join never repeats the rows of `table` when
+    several rows of `model` match, and leaves the `FROM` clause untouched.
+    """
+    for relationship in inspect(table).relationships:
+        if relationship.mapper.class_ is model:
+            attribute = getattr(table, relationship.key)
+            return attribute.any(condition) if relationship.uselist else attribute.has(condition)
+    raise ValueError(f"{table.__name__} has no relationship to {model.__name__}")
+
+
+def outerjoin(statement: SelectOfScalar, table: type[BaseModel], models: Iterable[type[BaseModel]]) -> SelectOfScalar:
+    for model in dict.fromkeys(models):
+        if model is table:
+            continue
+        target = related(table, model)
+        if isinstance(target, InstrumentedAttribute):
+            # An explicit ON clause keeps the join valid when the tables are swapped for the archive
+            statement = statement.outerjoin(model, target.property.primaryjoin)
+        else:
+            statement = statement.outerjoin(model)
+    return statement
+
+
+def sort_expression(column: InstrumentedAttribute):
+    """Returns the `ORDER BY` expression for `column`.
+
+    Text is ordered by its Russian `sort_key`, stored if the model has a
+    `SortKey` column for it, and enumerations by declaration rather than by
+    the names they are stored as.
+    """
+    column = sort_column(column)
+    if isinstance(column.type, SortKey):
+        return column
+    if isinstance(column.type, Enum) and column.type.enum_class:
+        return case({member.name: i for i, member in enumerate(column.type.enum_class)}, value=column)
+    if isinstance(column.type, String) or isinstance(getattr(column.type, "impl", None), String):
+        return getattr(func, SORT_KEY_FUNCTION)(column)
+    return column
+
+
+def indexed(table: type[BaseModel], column: InstrumentedAttribute | None) -> bool:
+    """Whether the rows of `table` sorted by `column` (or by id if None) can be read in order from an index."""
+    if column is None:
+        return True
+    if column.class_ is not table:
+        return False
+    (mapped,) = sort_column(column).property.columns
+    return sort_expression(mapped) is mapped and (mapped.primary_key or bool(mapped.index))
+
+
+def count_statement(statement: SelectOfScalar) -> SelectOfScalar:
+    """Returns a statement counting the rows `statement` would return."""
+    return select(func.count()).select_from(statement.order_by(None).subquery())
+
+
+def group_count_statement(statement: SelectOfScalar, column: str) -> Select:
+    """Returns `(value, count)` rows of `statement` grouped by `column`."""
+    rows = statement.order_by(None).subquery()
+    return select(rows.c[column], func.count()).group_by(rows.c[column])
@@ -0,0 +1,88 @@
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Final
+
+from sqlmodel import Session, select
+
+from app.config import REMINDER_LEAD_MINUTES, REMINDER_QUEUE_SIZE
+from app.db.models import Assignment, Location
+
+ACTIVE: Final[Assignment.State] = Assignment.State.ACTIVE
+
+
+@dataclass(frozen=True, slots=True)
+class Reminder:
+    assignment_id: int
+    deadline: datetime
+    description: str | None
+    location: str | None
+
+
+class ReminderQueue:
+    """The deadlines of the active assignments to remind about, nearest first.
+
+    Only the next `size` deadlines still ahead are held in a heap; they are
+    read with a range query over the `(state, deadline)` index, so neither
+    loading nor refilling the queue scans the assignments. An assignment is
+    due `lead` before its deadline and is reminded about once, or again if
+    its deadline is changed. The deadlines already passed are not queued
+    (see `overdue`).
+    """
+
+    def __init__(self, size: int = REMINDER_QUEUE_SIZE, lead: timedelta = timedelta(minutes=REMINDER_LEAD_MINUTES)) -> None:
+        self.size = size
+        self.lead = lead
+        self._heap: list[tuple[datetime, int]] = []
+        # The deadlines still ahead already reminded about by assignment id
+        self._reminded: dict[int, datetime] = {}
+        self._complete = True
+
+    def load(self, session: Session, now: datetime) -> None:
+        """Reads the deadlines after `now` again, e.g. after assignments were changed."""
+        self._reminded = {id: deadline for id, deadline in self._reminded.items() if deadline > now}
+        limit = self.size + len(self._reminded)
+        rows = session.exec(
+            select(Assignment.deadline, Assignment.id)
+            .where(Assignment.state == ACTIVE, Assignment.deadline > now)
+            .order_by(Assignment.deadline, Assignment.id)
+            .limit(limit)
+        ).all()
+        self._heap = [(deadline, id) for deadline, id in rows if self._reminded.get(id) != deadline]
+        heapq.heapify(self._heap)
+        # A full page may be followed by more
+        self._complete = len(rows) < limit
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_at(self) -> datetime | None:
+        """Returns when the nearest assignment is due, or None if there is none."""
+        return self._heap[0][0] - self.lead if self._heap else None
+
+    def due(self, session: Session, now: datetime) -> list[Reminder]:
+        """Takes the assignments due by `now` off the queue, refilling it as it empties."""
+        ids = []
+        while self._heap and self._heap[0][0] - self.lead <= now:
+            deadline, id = heapq.heappop(self._heap)
+            self._reminded[id] = deadline
+            ids.append(id)
+            if not self._heap and not self._complete:
+                self.load(session, now)
+        if not ids:
+            return []
+        return self._reminders(session, Assignment.id.in_(ids))
+
+    def overdue(self, session: Session, now: datetime) -> list[Reminder]:
+        """Returns the active assignments whose deadlines passed by `now`."""
+        return self._reminders(session, Assignment.deadline <= now)
+
+    @staticmethod
+    def _reminders(session: Session, condition) -> list[Reminder]:
+        rows = session.exec(
+            select(Assignment.id, Assignment.deadline, Assignment.description, Location.name)
+            .outerjoin(Location, Assignment.location_id == Location.id)
+            .where(condition, Assignment.state == ACTIVE)
+            .order_by(Assignment.deadline, Assignment.id)
+        ).all()
+        return [Reminder(*row) for row in rows]
@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Final, Iterable, Iterator
+
+from sqlalchemy import exists
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.db.models import Area, AreaReservationLink, Reservation
+from app.db.occurrences import CLUB_OCCURRENCES
+from app.db.transactions import WriteConflictError
+
+CONFLICT_MESSAGE: Final[str] = "reservation conflict"
+
+AREA_TABLE: Final[str] = Area.__tablename__
+LINK_TABLE: Final[str] = AreaReservationLink.__tablename__
+RESERVATION_TABLE: Final[str] = Reservation.__tablename__
+
+# Whether another reservation of the `{areas}` overlaps the reservation `{reservation}`.
+_OVERLAP: Final[str] = f"""
+    EXISTS (
+        SELECT 1 FROM {LINK_TABLE} AS other
+        JOIN "{RESERVATION_TABLE}" AS r ON r.id = other.reservation_id
+        JOIN "{RESERVATION_TABLE}" AS own ON own.id = {{reservation}}
+        WHERE other.area_id {{areas}} AND r.id != own.id AND r.start_at < own.end_at AND own.start_at < r.end_at
+    )
+"""
+
+# Whether another reservation of the location of `NEW` overlaps it while either occupies the whole location,
+# i.e. has no areas; `{whole}` tells whether `NEW` does.
+_LOCATION_OVERLAP: Final[str] = f"""
+    EXISTS (
+        SELECT 1 FROM "{RESERVATION_TABLE}" AS r
+        WHERE r.location_id = NEW.location_id AND r.id IS NOT NEW.id AND r.start_at < NEW.end_at AND NEW.start_at < r.end_at
+            AND ({{whole}} OR NOT EXISTS (SELECT 1 FROM {LINK_TABLE} WHERE reservation_id = r.id))
+    )
+"""
+
+
+class ReservationConflictError(WriteConflictError):
+    """Raised when a reservation overlaps another one of the same location or area."""
+
+    def __init__(self, message: str = "Выбранное помещение уже занято в это время!") -> None:
+        super().__init__(message)
+
+
+def triggers() -> list[str]:
+    """Returns the DDL of the triggers rejecting reservations of busy areas and locations.
+
+    The areas of a new reservation are linked only after its row is
+    inserted, so a new reservation counts as occupying the whole location
+    only if the location has no areas. A new reservation without areas
+    overlapping reservations of areas of the same location is left to
+    `check`.
+    """
+    insert = _OVERLAP.format(reservation="NEW.reservation_id", areas="= NEW.area_id")
+    update = _OVERLAP.format(
+        reservation="NEW.id", areas=f"IN (SELECT area_id FROM {LINK_TABLE} WHERE reservation_id = NEW.id)"
+    )
+    location_insert = _LOCATION_OVERLAP.format(whole=f'NOT EXISTS (SELECT 1 FROM "{AREA_TABLE}" WHERE location_id = NEW.location_id)')
+    location_update = _LOCATION_OVERLAP.format(whole=f"NOT EXISTS (SELECT 1 FROM {LINK_TABLE} WHERE reservation_id = NEW.id)")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS reservation_area_insert BEFORE INSERT ON {LINK_TABLE} "
+        f"WHEN {insert} BEGIN SELECT RAISE(ABORT, '{CONFLICT_MESSAGE}'); END",
+        f'CREATE TRIGGER IF NOT EXISTS reservation_area_update AFTER UPDATE OF start_at, end_at ON "{RESERVATION_TABLE}" '
+        f"WHEN {update} BEGIN SELECT RAISE(ABORT, '{CONFLICT_MESSAGE}'); END",
+        f'CREATE TRIGGER IF NOT EXISTS reservation_location_insert BEFORE INSERT ON "{RESERVATION_TABLE}" '
+        f"WHEN {location_insert} BEGIN SELECT RAISE(ABORT, '{CONFLICT_MESSAGE}'); END",
+        f"CREATE TRIGGER IF NOT EXISTS reservation_location_update "
+        f'AFTER UPDATE OF location_id, start_at, end_at ON "{RESERVATION_TABLE}" '
+        f"WHEN {location_update} BEGIN SELECT RAISE(ABORT, '{CONFLICT_MESSAGE}'); END",
+    ]
+
+
+def install(connection: Connection) -> None:
+    for ddl in triggers():
+        connection.exec_driver_sql(ddl)
+
+
+def has_conflicts(
+    session: Session,
+    location_id: int,
+    start_at: datetime,
+    end_at: datetime,
+    area_ids: Iterable[int] = (),
+    reservation_id: int | None = None,
+) -> bool:
+    """Returns whether the location, or the given areas of it, are taken during `[start_at, end_at)`.
+
+    Uses the `(location_id, start_at, end_at)` index of reservations.
+    """
+    if CLUB_OCCURRENCES.conflicts(location_id, start_at, end_at):
+        return True
+
+    overlapping = select(Reservation.id).where(
+        Reservation.location_id == location_id,
+        Reservation.start_at < end_at,
+        Reservation.end_at > start_at,
+    )
+    if reservation_id is not None:
+        overlapping = overlapping.where(Reservation.id != reservation_id)
+    has_areas = exists().where(AreaReservationLink.reservation_id == Reservation.id)
+
+    area_ids = list(area_ids)
+    if not area_ids:
+        # The whole location is reserved, so any overlapping reservation conflicts.
+        return session.exec(select(exists(overlapping))).one()
+
+    shares_area = exists().where(
+        AreaReservationLink.reservation_id == Reservation.id,
+        AreaReservationLink.area_id.in_(area_ids),
+    )
+    return session.exec(select(exists(overlapping.where(~has_areas | shares_area)))).one()
+
+
+def check(session: Session, reservation: Reservation) -> None:
+    """Raises `ReservationConflictError` if the reservation overlaps another one."""
+    area_ids = [area.id for area in reservation.areas]
+    if has_conflicts(
+        session, reservation.location_id, reservation.start_at, reservation.end_at, area_ids, reservation.id
+    ):
+        raise ReservationConflictError()
+
+
+@contextmanager
+def conflicts_as_errors() -> Iterator[None]:
+    """Turns the conflicts rejected by the triggers into `ReservationConflictError`."""
+    try:
+        yield
+    except IntegrityError as error:
+        if CONFLICT_MESSAGE in str(error.orig):
+            raise ReservationConflictError() from error
+        raise
@@ -0,0 +1,122 @@
+from typing import Final
+
+from sqlalchemy import Column, Connection, Integer, MetaData, String, Table, func, insert, inspect, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+from app.db import dashboard, maintenance, reservations
+from app.db.archive import ARCHIVE_METADATA, ARCHIVE_TABLES
+from app.db.models import BaseModel, DashboardCounter, SortKey
+from app.db.queries import SORT_KEY_FUNCTION, SORT_KEY_SUFFIX, sort_expression
+
+# The table where SQLite keeps the greatest id ever taken of each AUTOINCREMENT table
+SEQUENCE_TABLE: Final[Table] = Table("sqlite_sequence", MetaData(), Column("name", String), Column("seq", Integer))
+
+
+def _create(engine: Engine, metadata: MetaData) -> None:
+    inspector = inspect(engine)
+    existing = {
+        table: {column["name"] for column in inspector.get_columns(table.name, table.schema)}
+        for table in metadata.sorted_tables
+        if inspector.has_table(table.name, table.schema)
+    }
+    metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        for table, columns in existing.items():
+            name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+            for column in table.columns:
+                if column.name not in columns:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN {ddl}")
+
+    with engine.begin() as connection:
+        for table in existing:
+            if table.dialect_options["sqlite"]["autoincrement"]:
+                _add_autoincrement(connection, table)
+
+    with engine.begin() as connection:
+        # Indexes on the application's functions made the files unusable for other SQLite tools
+        for schema in {table.schema or "main" for table in metadata.sorted_tables}:
+            indexes = connection.exec_driver_sql(
+                f"SELECT name FROM {schema}.sqlite_master WHERE type = 'index' AND sql LIKE ?", (f"%{SORT_KEY_FUNCTION}(%",)
+            ).scalars().all()
+            for index in indexes:
+                connection.exec_driver_sql(f'DROP INDEX "{schema}"."{index}"')
+
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _add_autoincrement(connection: Connection, table: Table) -> None:
+    """Rebuilds `table` with an AUTOINCREMENT key unless it already has one.
+
+    SQLite cannot alter the key of a table, so the rows are copied into a new
+    table replacing the old one. The indexes are created again by `_create`
+    and the triggers by `migrate`.
+    """
+    (sql,) = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)).one()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+
+    rebuilt = f"{table.name}_rebuilt"
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE "{table.name}"', f'CREATE TABLE "{rebuilt}"', 1))
+    columns = ", ".join(f'"{column.name}"' for column in table.columns)
+    connection.exec_driver_sql(f'INSERT INTO "{rebuilt}" ({columns}) SELECT {columns} FROM "{table.name}"')
+    connection.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    # Triggers of other tables refer to the dropped table until the new one takes its name
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    connection.exec_driver_sql(f'ALTER TABLE "{rebuilt}" RENAME TO "{table.name}"')
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+
+
+def _start_sequences(connection: Connection) -> None:
+    """Starts the AUTOINCREMENT sequences of the archived tables above their archived ids.
+
+    Their rows are archived with their ids, so new rows must not take them,
+    e.g. after the key became AUTOINCREMENT or an older database was restored.
+    """
+    for table, copy in ARCHIVE_TABLES.items():
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        archived = connection.execute(select(func.coalesce(func.max(copy.c.id), 0))).scalar_one()
+        sequence = SEQUENCE_TABLE.c.name == table.name
+        updated = connection.execute(update(SEQUENCE_TABLE).where(sequence).values(seq=func.max(SEQUENCE_TABLE.c.seq, archived)))
+        if not updated.rowcount and archived:
+            connection.execute(insert(SEQUENCE_TABLE).values(name=table.name, seq=archived))
+
+
+def _fill_sort_keys(connection: Connection, metadata: MetaData) -> None:
+    """Writes the `SortKey` columns left empty, e.g. just added or written by other tools."""
+    for table in metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, SortKey):
+                source = table.c[column.name.removesuffix(SORT_KEY_SUFFIX)]
+                connection.execute(
+                    update(table).where(column == "", source.is_not(None)).values({column.name: sort_expression(source)})
+                )
+
+
+def migrate(engine: Engine) -> None:
+    """Creates missing tables, columns, indexes and triggers in the database and its archive.
+
+    `create_all` only creates columns and indexes together with their tables,
+    so those added to models of an existing database are created here. New
+    columns must be nullable or have a server default. Tables whose key
+    became AUTOINCREMENT are rebuilt, and files without auto-vacuum are
+    switched to incremental auto-vacuum.
+    """
+    has_counters = inspect(engine).has_table(DashboardCounter.__tablename__)
+    _create(engine, BaseModel.metadata)
+    _create(engine, ARCHIVE_METADATA)
+
+    with engine.begin() as connection:
+        _fill_sort_keys(connection, BaseModel.metadata)
+        _fill_sort_keys(connection, ARCHIVE_METADATA)
+        _start_sequences(connection)
+        dashboard.install(connection, rebuild=not has_counters)
+        reservations.install(connection)
+
+    maintenance.enable_incremental_vacuum(engine)
@@ -0,0 +1,91 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlmodel import Session, select
+
+from app.db.models import (
+    Area,
+    Assignment,
+    AssignmentType,
+    Club,
+    ClubType,
+    DaySchedule,
+    Event,
+    EventType,
+    Location,
+    Reservation,
+    Scope,
+    Teacher,
+    Weekday,
+)
+
+
+def seed(session: Session, events: int = 50, locations: int = 5, random_seed: int | None = None) -> None:
+    """Fills an empty database with demo data.
+
+    Every event gets a reservation and an assignment; reservations of a
+    location never overlap.
+
+    Raises:
+        ValueError: If the database already has locations.
+    """
+    if session.exec(select(Location.id)).first() is not None:
+        raise ValueError("База данных уже содержит данные")
+
+    rng = random.Random(random_seed)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    places = [Location(name=f"Помещение {i + 1}") for i in range(locations)]
+    session.add_all(places)
+    session.flush()
+
+    areas = {place.id: [Area(name=f"Зона {j + 1}", location_id=place.id) for j in range(i % 3)] for i, place in enumerate(places)}
+    event_types = [EventType(name=name) for name in ("Концерт", "Выставка", "Лекция")]
+    assignment_types = [AssignmentType(name=name) for name in ("Уборка", "Оформление", "Звук")]
+    teachers = [Teacher(name=name) for name in ("Иванова А. А.", "Петров Б. Б.", "Сидорова В. В.")]
+    club_types = [ClubType(name=name) for name in ("Танцы", "Рисование", "Шахматы")]
+    session.add_all([area for location_areas in areas.values() for area in location_areas])
+    session.add_all(event_types + assignment_types + teachers + club_types)
+    session.flush()
+
+    for i in range(events):
+        place = places[i % locations]
+        start_at = now + timedelta(days=i // locations, hours=rng.randint(1, 8))
+        event = Event(
+            title=f"Мероприятие {i + 1}",
+            description=f"Описание мероприятия {i + 1}",
+            start_at=start_at,
+            scope=rng.choice((Scope.ENTERTAINMENT, Scope.ENLIGHTENMENT)),
+            type_id=rng.choice(event_types).id,
+        )
+        session.add(event)
+        session.flush()
+
+        reservation = Reservation(
+            start_at=start_at,
+            end_at=start_at + timedelta(hours=2),
+            event_id=event.id,
+            location_id=place.id,
+        )
+        reservation.areas = areas[place.id][:1]
+        session.add(reservation)
+        session.add(
+            Assignment(
+                state=rng.choice(list(Assignment.State)),
+                deadline=start_at - timedelta(days=rng.randint(0, 14)),
+                type_id=rng.choice(assignment_types).id,
+                location_id=place.id,
+                event_id=event.id,
+            )
+        )
+
+    for i, weekday in enumerate(list(Weekday)[:5]):
+        club = Club(
+            title=f"Кружок {i + 1}",
+            start_at=date.today(),
+            type_id=club_types[i % len(club_types)].id,
+            teacher_id=teachers[i % len(teachers)].id,
+            location_id=places[-1].id,
+        )
+        club.days = [DaySchedule(weekday=weekday, start_at=time(18), end_at=time(20))]
+        session.add(club)
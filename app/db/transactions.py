@@ -0,0 +1,94 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Final, Iterator
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session
+
+from app.config import DATABASE_BUSY_RETRIES, DATABASE_WRITE_TIMEOUT
+from app.db import ENGINE
+
+logger = logging.getLogger(__name__)
+
+IMMEDIATE: Final[dict[str, str]] = {"sqlite_begin": "IMMEDIATE"}
+
+BUSY_MESSAGES: Final[tuple[str, ...]] = ("database is locked", "database is busy")
+RETRY_DELAY: Final[float] = 0.2
+
+
+class WriteConflictError(Exception):
+    """Raised when a change cannot be saved because of another user's changes."""
+
+
+class StaleObjectError(WriteConflictError):
+    """Raised when the row being saved was changed or deleted by someone else since it was read."""
+
+    def __init__(self, message: str = "Запись была изменена или удалена другим пользователем. Обновите таблицу и повторите!") -> None:
+        super().__init__(message)
+
+
+class DatabaseBusyError(WriteConflictError):
+    """Raised when the database stays locked by another writer after every retry."""
+
+    def __init__(self, message: str = "База данных занята другим пользователем. Повторите попытку позже!") -> None:
+        super().__init__(message)
+
+
+def is_busy(error: OperationalError) -> bool:
+    return any(message in str(error.orig) for message in BUSY_MESSAGES)
+
+
+def begin_immediate(session: Session, retries: int = DATABASE_BUSY_RETRIES, timeout: int = DATABASE_WRITE_TIMEOUT) -> None:
+    """Starts the session's transaction with `BEGIN IMMEDIATE`, taking the write lock at once.
+
+    The lock is requested up to `retries` more times with a growing delay,
+    each attempt waiting for its share of `timeout` milliseconds, so the
+    interface never waits longer than `timeout` in total. Must be called
+    before the session executes anything else.
+
+    Raises:
+        DatabaseBusyError: If the lock could not be taken.
+    """
+    deadline = time.monotonic() + timeout / 1000
+    share = timeout // (retries + 1)
+    for attempt in range(retries + 1):
+        remaining = int((deadline - time.monotonic()) * 1000)
+        if remaining <= 0:
+            break
+        try:
+            session.connection(execution_options={**IMMEDIATE, "sqlite_busy_timeout": min(share, remaining)})
+            return
+        except OperationalError as error:
+            session.rollback()
+            if not is_busy(error):
+                raise
+            logger.warning("Database is locked, attempt %d of %d", attempt + 1, retries + 1)
+            if attempt < retries:
+                time.sleep(max(0.0, min(RETRY_DELAY * 2**attempt, deadline - time.monotonic())))
+    raise DatabaseBusyError()
+
+
+@contextmanager
+def writing() -> Iterator[Session]:
+    """Opens a session holding the write lock and commits it on exit.
+
+    Updates and deletes only apply to rows whose `version` did not change
+    since they were read (see `BaseModel`); otherwise nothing is saved.
+
+    Raises:
+        StaleObjectError: If another user changed or deleted a saved row.
+        DatabaseBusyError: If the database stayed locked.
+    """
+    with Session(ENGINE) as session:
+        begin_immediate(session)
+        try:
+            yield session
+            session.commit()
+        except StaleDataError as error:
+            raise StaleObjectError() from error
+        except OperationalError as error:
+            if is_busy(error):
+                raise DatabaseBusyError() from error
+            raise
@@ -0,0 +1,66 @@
+import csv
+from typing import Final, TextIO
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+from app.columns import (
+    ASSIGNMENT_COLUMNS,
+    CLUB_COLUMNS,
+    EVENT_COLUMNS,
+    RESERVATION_COLUMNS,
+    WEEKDAY_NAMES,
+    Columns,
+    schedule_cell,
+)
+from app.db.archive import ARCHIVE_TABLES, with_archive
+from app.db.models import Assignment, BaseModel, Club, Event, Reservation
+
+# name: (model, columns, extra conditions), the same rows and columns as the tables of the main window
+TABLES: Final[dict[str, tuple[type[BaseModel], Columns, tuple]]] = {
+    "desktop": (Assignment, ASSIGNMENT_COLUMNS, (Assignment.state == Assignment.State.ACTIVE,)),
+    "assignments": (Assignment, ASSIGNMENT_COLUMNS, ()),
+    "events": (Event, EVENT_COLUMNS, ()),
+    "reservations": (Reservation, RESERVATION_COLUMNS, ()),
+    "clubs": (Club, CLUB_COLUMNS, ()),
+}
+
+
+def table_statement(name: str, include_archive: bool = False) -> Select:
+    """Returns the statement selecting only the displayed values of the table's rows.
+
+    The archived rows are only added for the tables that are archived.
+    """
+    model, columns, conditions = TABLES[name]
+    statement = select(model.id, *(column.expression for column in columns.values())).where(*conditions)
+    if not include_archive or model.__table__ not in ARCHIVE_TABLES:
+        return statement.order_by(model.id)
+    rows = with_archive(statement).subquery()
+    return select(*rows.c).order_by(rows.c.id)
+
+
+def export_table(session: Session, name: str, file: TextIO, include_archive: bool = False) -> int:
+    """Writes the rows of the table (and their archive if asked) as CSV and returns their number."""
+    _, columns, _ = TABLES[name]
+    writer = csv.writer(file)
+    writer.writerow(columns.keys())
+
+    count = 0
+    for _, *values in session.exec(table_statement(name, include_archive)):
+        writer.writerow(column.format(value) for column, value in zip(columns.values(), values))
+        count += 1
+    return count
+
+
+def export_schedule(session: Session, file: TextIO) -> int:
+    """Writes the weekly schedule of the clubs as CSV and returns the number of clubs."""
+    writer = csv.writer(file)
+    writer.writerow(["", *WEEKDAY_NAMES.values()])
+
+    clubs = session.exec(
+        select(Club).order_by(Club.id).options(selectinload(Club.days), selectinload(Club.location), selectinload(Club.teacher))
+    ).all()
+    for club in clubs:
+        writer.writerow([club.title, *(schedule_cell(club, weekday) for weekday in WEEKDAY_NAMES)])
+    return len(clubs)
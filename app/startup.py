@@ -1,11 +1,16 @@
 import sys
+import logging
 
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import QTranslator, QLocale, QLibraryInfo
 from PyQt6.QtWidgets import QApplication
 
+from app.config import DEBUG
 from app.db import ENGINE
-from app.db.models import BaseModel
+from app.db.backup import BACKUPS
+from app.db.schema import migrate
+from app.ui.maintenance import MaintenanceScheduler
+from app.ui.reminders import ReminderService
 from app.ui.widgets.windows import MainWindow
 
 
@@ -16,9 +21,12 @@ def run() -> int:
     Returns:
         int: The exit status code.
     """
-    BaseModel.metadata.create_all(ENGINE)
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
+    migrate(ENGINE)
 
     app: QApplication = QApplication(sys.argv)
+    app.setOrganizationName("CCMS")
+    app.setApplicationName("CCMS")
     app.setWindowIcon(QIcon("app/ui/resourses/favicon.ico"))
 
     translator = QTranslator(app)
@@ -33,4 +41,9 @@ def run() -> int:
     window: MainWindow = MainWindow()
     window.show()
 
+    BACKUPS.start()
+    app.aboutToQuit.connect(BACKUPS.stop)
+    MaintenanceScheduler(app).install(app)
+    ReminderService(app).install(app)
+
     return sys.exit(app.exec())
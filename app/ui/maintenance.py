@@ -0,0 +1,80 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Final
+
+from PyQt6.QtCore import QEvent, QObject, QSettings, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from app.config import MAINTENANCE_BUDGET, MAINTENANCE_IDLE_MINUTES, MAINTENANCE_INTERVAL_HOURS
+from app.db.maintenance import maintain
+
+logger = logging.getLogger(__name__)
+
+LAST_RUN_KEY: Final[str] = "maintenance/last_run"
+INPUT_EVENTS: Final[frozenset[QEvent.Type]] = frozenset(
+    {
+        QEvent.Type.KeyPress,
+        QEvent.Type.MouseButtonPress,
+        QEvent.Type.MouseMove,
+        QEvent.Type.Wheel,
+    }
+)
+
+
+class MaintenanceScheduler(QObject):
+    """Runs the database maintenance once the user is idle, or at shutdown if it is still due.
+
+    A run happens at most once per `MAINTENANCE_INTERVAL_HOURS`: when idle
+    in a background thread, at shutdown only what is cheap within
+    `MAINTENANCE_BUDGET` seconds.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.interval = timedelta(hours=MAINTENANCE_INTERVAL_HOURS)
+        self._thread: threading.Thread | None = None
+        self._idleTimer = QTimer(self)
+        self._idleTimer.setSingleShot(True)
+        self._idleTimer.setInterval(MAINTENANCE_IDLE_MINUTES * 60 * 1000)
+        self._idleTimer.timeout.connect(self.runIdle)
+
+    def install(self, app: QApplication) -> None:
+        app.installEventFilter(self)
+        app.aboutToQuit.connect(self.runAtShutdown)
+        self._idleTimer.start()
+
+    def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+        if event.type() in INPUT_EVENTS:
+            self._idleTimer.start()
+        return False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def due(self) -> bool:
+        last_run = QSettings().value(LAST_RUN_KEY)
+        return not isinstance(last_run, datetime) or datetime.now() - last_run >= self.interval
+
+    def runIdle(self) -> None:
+        if self.running or not self.due():
+            return
+        self._thread = threading.Thread(target=self._run, name="Maintenance", daemon=True)
+        self._thread.start()
+
+    def runAtShutdown(self) -> None:
+        if self.running:
+            # The idle run gets the budget to finish and makes this one unnecessary
+            self._thread.join(MAINTENANCE_BUDGET)
+            return
+        if self.due():
+            self._run()
+
+    def _run(self) -> None:
+        try:
+            maintain(budget=MAINTENANCE_BUDGET)
+        except Exception:
+            logger.exception("Database maintenance failed")
+            return
+        QSettings().setValue(LAST_RUN_KEY, datetime.now())
@@ -1,4 +1,5 @@
-from typing import Any, Callable, Dict, Set, TypeVar, Generic
+from collections import OrderedDict
+from typing import Any, Collection, Iterable, Sequence, TypeVar, Generic
 
 from PyQt6.QtCore import (
     QObject,
@@ -9,35 +10,49 @@ from PyQt6.QtCore import (
 )
 from PyQt6.QtGui import QColor
 from PyQt6.QtWidgets import QMessageBox
-from sqlmodel import Session
-
+from sqlalchemy import null
+from sqlmodel import Session, select
+
+from app.columns import (
+    ASSIGNMENT_COLUMNS,
+    CLUB_COLUMNS,
+    EVENT_COLUMNS,
+    PREVIEW_LENGTH,
+    RESERVATION_COLUMNS,
+    WEEKDAY_NAMES,
+    Columns,
+    schedule_cell,
+)
 from app.db import ENGINE
-from app.db.models import BaseModel, Club, Reservation, Scope, UniqueNamedModel, Event, Assignment, Weekday
-from app.ui.widgets.schedule import WEEKDAY_NAMES
+from app.db.profiling import PROFILER, ActionStats
+from app.ui.profiling import INSTRUMENTS
+from app.db.models import BaseModel, Club, Reservation, UniqueNamedModel, Event, Assignment
+from app.db.transactions import StaleObjectError
 
 TBaseNamedModel = TypeVar("TBaseNamedModel", bound=UniqueNamedModel)
 TModel = TypeVar("TModel", bound=BaseModel)
 
-DATE_FORMAT = "%d.%m.%Y %H:%M"
-
-SCOPES = {
-    Scope.ENTERTAINMENT: "Развлечение",
-    Scope.ENLIGHTENMENT: "Просвещение",
-}
 
-STATES = {
-    Assignment.State.DRAFT: "Черновик",
-    Assignment.State.ACTIVE: "Активно",
-    Assignment.State.COMPLETED: "Выполнено"
-}
+class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
+    """A list of named objects edited in memory.
 
+    The names are indexed for the uniqueness checks. Added, renamed and
+    removed objects are kept until `commit()` saves them all at once.
+    """
 
-class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
     def __init__(
-        self, data: Set[TBaseNamedModel], parent: QObject | None = None
+        self, data: Iterable[TBaseNamedModel], parent: QObject | None = None, **defaults
     ) -> None:
         super().__init__(parent)
-        self._data = data
+        self._data = list(data)
+        self._names: dict[str, TBaseNamedModel] = {item.name: item for item in self._data}
+        self._defaults = defaults
+        self._renamed: dict[int, TBaseNamedModel] = {}
+        self._removed: list[TBaseNamedModel] = []
+
+    @property
+    def hasChanges(self) -> bool:
+        return bool(self._renamed or self._removed or any(item.id is None for item in self._data))
 
     def rowCount(self, _: QModelIndex = ...) -> int:
         return len(self._data)
@@ -49,24 +64,23 @@ class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
     def insertRow(
         self, row: int, parent: QModelIndex = QModelIndex(), **kwargs
     ) -> bool:
-        self.beginInsertRows(parent, row, row)
-
-        name = self._generateUniqueName()
-
-        with Session(ENGINE) as session:
-            newObj: TBaseNamedModel = self._getGenericType()(name=name, **kwargs)
-            session.add(newObj)
-            session.commit()
-            session.refresh(newObj)
-
-        self._data.append(newObj)
-
+        return self.insertNames([self._generateUniqueName()], **kwargs) == 1
+
+    def insertNames(self, names: Iterable[str], **kwargs) -> int:
+        """Appends objects with the new unique names and returns their number."""
+        names = [name for name in dict.fromkeys(name.strip() for name in names) if name and name not in self._names]
+        if not names:
+            return 0
+
+        self.beginInsertRows(QModelIndex(), len(self._data), len(self._data) + len(names) - 1)
+        for name in names:
+            newObj: TBaseNamedModel = self._getGenericType()(name=name, **self._defaults, **kwargs)
+            self._data.append(newObj)
+            self._names[name] = newObj
         self.endInsertRows()
-        return True
+        return len(names)
 
     def removeRow(self, row: int, parent: QModelIndex = QModelIndex()) -> bool:
-        self.beginRemoveRows(parent, row, row)
-
         item = self._data[row]
 
         if (
@@ -75,12 +89,12 @@ class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
         ):
             return False
 
-        self._data.remove(item)
-
-        with Session(ENGINE) as session:
-            session.delete(item)
-            session.commit()
-
+        self.beginRemoveRows(parent, row, row)
+        del self._data[row]
+        del self._names[item.name]
+        if item.id is not None:
+            self._renamed.pop(item.id, None)
+            self._removed.append(item)
         self.endRemoveRows()
         return True
 
@@ -98,18 +112,37 @@ class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
             self._showUniqueNameConstraintWarning(value)
             return False
 
-        with Session(ENGINE) as session:
-            obj = session.get(self._getGenericType(), item.id)
-            obj.name = value
-            session.add(obj)
-            session.commit()
-            session.refresh(obj)
-
+        del self._names[item.name]
         item.name = value
+        self._names[value] = item
+        if item.id is not None:
+            self._renamed[item.id] = item
 
         self.dataChanged.emit(index, index)
         return True
 
+    def commit(self, session: Session) -> None:
+        """Saves the changes in the session's transaction.
+
+        Removals and renames are flushed first so their names can be reused.
+
+        Raises:
+            StaleObjectError: If a removed or renamed object was changed or deleted since it was loaded.
+        """
+        for item in self._removed:
+            session.delete(self._saved(session, item))
+        session.flush()
+        for item in self._renamed.values():
+            self._saved(session, item).name = item.name
+        session.flush()
+        session.add_all(item for item in self._data if item.id is None)
+
+    def _saved(self, session: Session, item: TBaseNamedModel) -> TBaseNamedModel:
+        saved = session.get(type(item), item.id)
+        if saved is None or saved.version != item.version:
+            raise StaleObjectError()
+        return saved
+
     def flags(self, _: QModelIndex) -> Qt.ItemFlag:
         return (
             Qt.ItemFlag.ItemIsEditable
@@ -118,7 +151,7 @@ class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
         )
 
     def isUniqueNameConstraintFailed(self, name: str) -> bool:
-        return any(item.name == name for item in self._data)
+        return name in self._names
 
     def _generateUniqueName(self):
         i = 0
@@ -147,13 +180,79 @@ class TypeListModel(Generic[TBaseNamedModel], QAbstractListModel):
 
 
 class BaseTableModel(Generic[TModel], QAbstractTableModel):
-    GENERATORS: Dict[str, Callable[[TModel], Any]] | None = None
-
-    def __init__(self, data: Set[TModel], parent: QObject | None = None) -> None:
+    """A table of compact rows `(id, version, *values)` holding only the displayed values.
+
+    The rows are selected with `expressions()`; the full `TModel` objects are
+    only loaded by id when they are needed, e.g. to open a dialog. Deferred
+    columns hold a preview; their full text is the `EditRole` and `ToolTipRole`
+    data, fetched on demand. The rows may be a list or fetched as they are
+    read (see `PagedRows`).
+    """
+
+    GENERATORS: Columns | None = None
+    KEY_COLUMNS = 2
+    BATCH_SIZE = 500
+    # The full texts read last are kept, e.g. for the tooltips or a batch being exported
+    TEXT_CACHE_SIZE = 4 * BATCH_SIZE
+    stats: ActionStats | None = None
+    view_name: str | None = None
+
+    def __init__(self, data: Sequence[tuple], parent: QObject | None = None) -> None:
         super().__init__(parent)
         self._data = data
-        self._headers = list(self.GENERATORS.keys())
-
+        self._headers = self.headers()
+        self._columns = list(self.GENERATORS.values())
+        self._texts: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    @classmethod
+    def headers(cls) -> list[str]:
+        return list(cls.GENERATORS.keys())
+
+    @classmethod
+    def expressions(cls, hidden: Collection[str] = ()) -> list:
+        """Returns the expressions selecting the values of the rows; hidden columns are not loaded."""
+        return [null() if header in hidden else column.projection for header, column in cls.GENERATORS.items()]
+
+    def id(self, row: int) -> int:
+        return self._data[row][0]
+
+    def version(self, row: int) -> int:
+        return self._data[row][1]
+
+    def value(self, row: int, header: str) -> Any:
+        """Returns the raw value of the column `header` in the row."""
+        return self._data[row][self.KEY_COLUMNS + self._headers.index(header)]
+
+    def truncated(self, row: int, column: int) -> bool:
+        value = self._data[row][self.KEY_COLUMNS + column]
+        return self._columns[column].deferred and value is not None and len(value) > PREVIEW_LENGTH
+
+    def fullText(self, row: int, column: int) -> str:
+        """Returns the full text of a truncated deferred value."""
+        key = (self.id(row), column)
+        if key in self._texts:
+            self._texts.move_to_end(key)
+        else:
+            self.prefetch([column], [row])
+        return self._texts.get(key, self._data[row][self.KEY_COLUMNS + column])
+
+    def prefetch(self, columns: Iterable[int], rows: Iterable[int] | None = None) -> None:
+        """Fetches the full texts of the truncated values in the columns in batches."""
+        rows = range(self.rowCount()) if rows is None else list(rows)
+        for column in columns:
+            if not self._columns[column].deferred:
+                continue
+            ids = [self.id(row) for row in rows if self.truncated(row, column) and (self.id(row), column) not in self._texts]
+            expression = self._columns[column].expression
+            model = expression.class_
+            with PROFILER.attach(self.stats), Session(ENGINE) as session:
+                for i in range(0, len(ids), self.BATCH_SIZE):
+                    texts = session.exec(select(model.id, expression).where(model.id.in_(ids[i : i + self.BATCH_SIZE])))
+                    self._texts.update(((id, column), text) for id, text in texts)
+        while len(self._texts) > self.TEXT_CACHE_SIZE:
+            self._texts.popitem(last=False)
+
+    @INSTRUMENTS.measure_header
     def headerData(
         self, section: int, orientation: Qt.Orientation, role: int = ...
     ) -> Any:
@@ -170,78 +269,68 @@ class BaseTableModel(Generic[TModel], QAbstractTableModel):
     def columnCount(self, _: QModelIndex = ...) -> int:
         return len(self._headers)
 
+    @INSTRUMENTS.measure_data
     def data(self, index: QModelIndex, role: int = ...) -> Any:
-        if role == Qt.ItemDataRole.DisplayRole:
-            item = self._data[index.row()]
-            with Session(ENGINE) as session:
-                session.add(item)
-                return list(self.GENERATORS.values())[index.column()](item)
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole, Qt.ItemDataRole.ToolTipRole):
+            return
+        row, column = index.row(), index.column()
+        value = self._data[row][self.KEY_COLUMNS + column]
+        if value is None:
+            return
+
+        if self.truncated(row, column):
+            if role == Qt.ItemDataRole.DisplayRole:
+                return value[:PREVIEW_LENGTH] + "…"
+            return self.fullText(row, column)
+        if role != Qt.ItemDataRole.ToolTipRole:
+            return self._columns[column].format(value)
 
     def removeRow(self, row: int, parent: QModelIndex = QModelIndex()) -> bool:
         self.beginRemoveRows(parent, row, row)
-        item = self._data[row]
-        self._data.remove(item)
+        del self._data[row]
         self.endRemoveRows()
         return True
 
 
 class ScheduleTableModel(QAbstractTableModel):
-    DATE_FMT = "%H:%M"
+    stats: ActionStats | None = None
+    view_name = "Schedule"
 
     def __init__(self, data: list[Club], parent: QObject | None = None) -> None:
-        self._data = data
+        # The clubs must be loaded with their days, location and teacher;
+        # only the titles and the rendered cells are kept.
+        self._titles = [club.title for club in data]
+        self._cells = [[schedule_cell(club, weekday) for weekday in WEEKDAY_NAMES] for club in data]
         super().__init__(parent)
         
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
-        return len(self._data)
+        return len(self._titles)
     
     def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
         return len(WEEKDAY_NAMES)
     
+    @INSTRUMENTS.measure_header
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = ...) -> Any:
         if role != Qt.ItemDataRole.DisplayRole:
             return super().headerData(section, orientation, role)
 
         if orientation == Qt.Orientation.Vertical:
-            return self._data[section].title
+            return self._titles[section]
         return list(WEEKDAY_NAMES.values())[section]
     
+    @INSTRUMENTS.measure_data
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         if role != Qt.ItemDataRole.DisplayRole:
             return
-        weekday = Weekday(index.column() + 1)
-        with Session(ENGINE) as session:
-            club: Club | None = session.get(Club, self._data[index.row()].id)
-            if club is None:
-                return
-            schedule_day = next((d for d in club.days if d.weekday == weekday), None)
-            if not schedule_day:
-                return
-            return f"{schedule_day.start_at.strftime(self.DATE_FMT)} - {schedule_day.end_at.strftime(self.DATE_FMT)} - {club.location.name if club.location else None} - {club.teacher.name if club.teacher else None}" 
+        return self._cells[index.row()][index.column()]
 
 
 class EventTableModel(BaseTableModel[Event]):
-    GENERATORS = {
-        "Заголовок": lambda e: e.title,
-        "Пространство": lambda e: SCOPES[e.scope],
-        "Разновидность": lambda e: e.type.name if e.type else None,
-        "Помещение": lambda e: str.join(", ", (r.location.name for r in e.reservations)) if any(e.reservations) else None,
-        "Дата начала": lambda e: e.start_at.strftime(DATE_FORMAT),
-        "Дата создания": lambda e: e.created_at.strftime(DATE_FORMAT),
-        "Описание": lambda e: e.description,
-    }
+    GENERATORS = EVENT_COLUMNS
 
 
 class AssignmentTableModel(BaseTableModel[Assignment]):
-    GENERATORS = {
-        "Помещение": lambda a: a.location.name if a.location else None,
-        "Разновидность": lambda a: a.type.name,
-        "Мероприятие": lambda a: a.event.title if a.event else None,
-        "Статус": lambda a: STATES[a.state],
-        "Дедлайн": lambda a: a.deadline.strftime(DATE_FORMAT),
-        "Дата создания": lambda a: a.created_at.strftime(DATE_FORMAT),
-        "Описание": lambda a: a.description,
-    }
+    GENERATORS = ASSIGNMENT_COLUMNS
 
     STATUS_COLORS = {
         Assignment.State.DRAFT: None,
@@ -249,36 +338,20 @@ class AssignmentTableModel(BaseTableModel[Assignment]):
         Assignment.State.COMPLETED: QColor("lightgray"),
     }
 
+    @INSTRUMENTS.measure_data
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         if role != Qt.ItemDataRole.BackgroundRole:
             return super().data(index, role)
 
-        assignment: Assignment = self._data[index.row()]
-        return self.STATUS_COLORS[assignment.state]
+        return self.STATUS_COLORS.get(self.value(index.row(), "Статус"))
 
 
 class ReservaionTableModel(BaseTableModel[Reservation]):
-    GENERATORS = {
-        "Помещение": lambda r: r.location.name if r.location else None,
-        "Зоны": lambda r: str.join(", ", (a.name for a in r.areas)) if any(r.areas) else None,
-        "Мероприятие": lambda r: r.event.title if r.event else None,
-        "Дата начала": lambda r: r.start_at.strftime(DATE_FORMAT),
-        "Дата конца": lambda r: r.end_at.strftime(DATE_FORMAT),
-        "Комментарий": lambda r: r.comment,
-        "Дата создания": lambda r: r.created_at.strftime(DATE_FORMAT),
-    }
+    GENERATORS = RESERVATION_COLUMNS
 
 
 class ClubTableModel(BaseTableModel[Club]):
-    GENERATORS = {
-        "Заголовок": lambda c: c.title,
-        "Помещение": lambda c: c.location.name if c.location else None,
-        "Преподаватель": lambda c: c.teacher.name if c.teacher else None,
-        "Вид": lambda c: c.type.name if c.type else None,
-        "Старт": lambda c: c.start_at.strftime(DATE_FORMAT),
-        "Расписание": lambda c: f"{len(c.days)} раз(а) в неделю",
-        "Дата создания": lambda c: c.created_at.strftime(DATE_FORMAT),
-    }
+    GENERATORS = CLUB_COLUMNS
 
 
 __all__ = [
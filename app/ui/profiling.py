@@ -0,0 +1,153 @@
+import enum
+import weakref
+from time import perf_counter
+from functools import wraps
+from dataclasses import dataclass, field
+from typing import Final
+
+from PyQt6.QtCore import Qt, QAbstractItemModel
+
+from app.config import INSTRUMENTATION
+
+
+@dataclass
+class CallStats:
+    """The number of calls and their total duration in seconds."""
+
+    calls: int = 0
+    time: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.calls += 1
+        self.time += elapsed
+
+
+@dataclass
+class ViewStats:
+    """Hot-path counters of one table view and its model.
+
+    Attributes:
+        name (str): The name of the view (e.g. `EventTable`).
+        data (dict[tuple[int, int], CallStats]): `data()` calls per role and column.
+        header (dict[int, CallStats]): `headerData()` calls per role.
+        paint (CallStats): The paint events of the view's viewport.
+        model (weakref.ref | None): The last model seen, used to resolve column names.
+    """
+
+    name: str
+    data: dict[tuple[int, int], CallStats] = field(default_factory=dict)
+    header: dict[int, CallStats] = field(default_factory=dict)
+    paint: CallStats = field(default_factory=CallStats)
+    model: weakref.ref | None = None
+
+    @property
+    def data_total(self) -> CallStats:
+        return CallStats(
+            sum(stats.calls for stats in self.data.values()),
+            sum(stats.time for stats in self.data.values()),
+        )
+
+    def column_name(self, column: int) -> str:
+        model: QAbstractItemModel | None = self.model() if self.model else None
+        if model is None or column >= model.columnCount():
+            return str(column)
+        # Unwrapped, so that reading the name is not counted in the stats it labels
+        header_data = type(model).headerData
+        header_data = getattr(header_data, "__wrapped__", header_data)
+        return str(header_data(model, column, Qt.Orientation.Horizontal, Qt.ItemDataRole.DisplayRole))
+
+    def slowest_column(self) -> tuple[int, CallStats] | None:
+        columns: dict[int, CallStats] = {}
+        for (_, column), stats in self.data.items():
+            total = columns.setdefault(column, CallStats())
+            total.calls += stats.calls
+            total.time += stats.time
+        return max(columns.items(), key=lambda item: item[1].time, default=None)
+
+
+def _role_value(role) -> int:
+    return role.value if isinstance(role, enum.Enum) else role
+
+
+def role_name(role: int) -> str:
+    try:
+        return Qt.ItemDataRole(role).name
+    except ValueError:
+        return str(role)
+
+
+class Instruments:
+    """Registry of per-view counters for `data()`, `headerData()` and paint events."""
+
+    def __init__(self) -> None:
+        self.views: dict[str, ViewStats] = {}
+        self._depth = 0
+
+    def view(self, name: str) -> ViewStats:
+        stats = self.views.get(name)
+        if stats is None:
+            stats = self.views[name] = ViewStats(name)
+        return stats
+
+    def clear(self) -> None:
+        self.views.clear()
+
+    def measure_data(self, method):
+        """Decorates a model's `data()`; nested `super().data()` calls are counted once."""
+        if not INSTRUMENTATION:
+            return method
+
+        @wraps(method)
+        def wrapper(model, index, role=Qt.ItemDataRole.DisplayRole):
+            if self._depth:
+                return method(model, index, role)
+
+            self._depth += 1
+            start = perf_counter()
+            try:
+                return method(model, index, role)
+            finally:
+                elapsed = perf_counter() - start
+                self._depth -= 1
+                stats = self._model_view(model)
+                key = (_role_value(role), index.column())
+                calls = stats.data.get(key)
+                if calls is None:
+                    calls = stats.data[key] = CallStats()
+                calls.add(elapsed)
+
+        return wrapper
+
+    def measure_header(self, method):
+        """Decorates a model's `headerData()`."""
+        if not INSTRUMENTATION:
+            return method
+
+        @wraps(method)
+        def wrapper(model, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+            if self._depth:
+                return method(model, section, orientation, role)
+
+            self._depth += 1
+            start = perf_counter()
+            try:
+                return method(model, section, orientation, role)
+            finally:
+                elapsed = perf_counter() - start
+                self._depth -= 1
+                stats = self._model_view(model)
+                calls = stats.header.get(_role_value(role))
+                if calls is None:
+                    calls = stats.header[_role_value(role)] = CallStats()
+                calls.add(elapsed)
+
+        return wrapper
+
+    def _model_view(self, model: QAbstractItemModel) -> ViewStats:
+        stats = self.view(getattr(model, "view_name", None) or type(model).__name__)
+        if stats.model is None or stats.model() is not model:
+            stats.model = weakref.ref(model)
+        return stats
+
+
+INSTRUMENTS: Final[Instruments] = Instruments()
@@ -0,0 +1,110 @@
+import logging
+from datetime import datetime
+from typing import Final
+
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QApplication, QSystemTrayIcon
+from sqlmodel import Session
+
+from app.columns import DATE_FORMAT
+from app.db import ENGINE
+from app.db.changes import CHANGES
+from app.db.models import Assignment
+from app.db.reminders import Reminder, ReminderQueue
+
+logger = logging.getLogger(__name__)
+
+# The timer is re-armed at least this often, so a changed clock or a wake from sleep is noticed
+MAX_WAIT_MS: Final[int] = 60 * 60 * 1000
+# More reminders at once are shown as one message
+MAX_MESSAGES: Final[int] = 3
+MESSAGE_MS: Final[int] = 10000
+
+
+class ReminderService(QObject):
+    """Reminds about the deadlines of the active assignments with desktop notifications.
+
+    A single timer is armed for the nearest deadline of a `ReminderQueue`;
+    the queue is read again only when assignments are changed. The
+    deadlines already passed at startup are reminded about once.
+    """
+
+    assignmentsChanged = pyqtSignal()
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.queue = ReminderQueue()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.remind)
+        # The change bus calls back while the transaction commits
+        self.assignmentsChanged.connect(self.reload, Qt.ConnectionType.QueuedConnection)
+        self._tray: QSystemTrayIcon | None = None
+
+    def install(self, app: QApplication) -> None:
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self._tray = QSystemTrayIcon(app.windowIcon(), self)
+            self._tray.setToolTip(app.applicationName())
+            self._tray.show()
+        CHANGES.subscribe(self.on_models_changed)
+        app.aboutToQuit.connect(self.stop)
+        self.reload()
+        self.remindOverdue()
+
+    def stop(self) -> None:
+        CHANGES.unsubscribe(self.on_models_changed)
+        self._timer.stop()
+
+    def on_models_changed(self, models: frozenset[type]) -> None:
+        if Assignment in models:
+            self.assignmentsChanged.emit()
+
+    @pyqtSlot()
+    def reload(self) -> None:
+        with Session(ENGINE) as session:
+            self.queue.load(session, datetime.now())
+        self.remind()
+
+    @pyqtSlot()
+    def remind(self) -> None:
+        with Session(ENGINE) as session:
+            reminders = self.queue.due(session, datetime.now())
+        if reminders:
+            self.notify(reminders)
+        self.arm()
+
+    def remindOverdue(self) -> None:
+        with Session(ENGINE) as session:
+            reminders = self.queue.overdue(session, datetime.now())
+        if reminders:
+            self.notify(reminders, overdue=True)
+
+    def arm(self) -> None:
+        next_at = self.queue.next_at()
+        if next_at is None:
+            self._timer.stop()
+            return
+        wait = (next_at - datetime.now()).total_seconds() * 1000
+        self._timer.start(min(max(int(wait), 0), MAX_WAIT_MS))
+
+    def notify(self, reminders: list[Reminder], overdue: bool = False) -> None:
+        if len(reminders) > MAX_MESSAGES:
+            # The deadline nearest to now: the latest passed or the earliest ahead
+            nearest = (max if overdue else min)(reminder.deadline for reminder in reminders)
+            title = "Просрочены дедлайны" if overdue else "Приближаются дедлайны"
+            messages = [(title, f"Заявок: {len(reminders)}, ближайший дедлайн {nearest.strftime(DATE_FORMAT)}")]
+        else:
+            title = "Просрочен дедлайн" if overdue else "Дедлайн"
+            messages = [(f"{title} {reminder.deadline.strftime(DATE_FORMAT)}", self._text(reminder)) for reminder in reminders]
+
+        for title, text in messages:
+            logger.info("%s: %s", title, text)
+            if self._tray is not None:
+                self._tray.showMessage(title, text, QSystemTrayIcon.MessageIcon.Information, MESSAGE_MS)
+
+    @staticmethod
+    def _text(reminder: Reminder) -> str:
+        parts = [reminder.description or "Заявка без описания"]
+        if reminder.location:
+            parts.append(reminder.location)
+        return str.join(" · ", parts)
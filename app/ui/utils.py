@@ -1,10 +1,27 @@
 import csv
 from os.path import expanduser
+from typing import Callable
 
 from PyQt6.QtCore import Qt, QAbstractTableModel
 from PyQt6.QtWidgets import QWidget, QMessageBox, QFileDialog
 
-def export(model: QAbstractTableModel, parent: QWidget, vert=False) -> None:
+from app.db.profiling import PROFILER
+
+EXPORT_BATCH_SIZE = 500
+
+def export(
+    model: QAbstractTableModel,
+    parent: QWidget,
+    vert=False,
+    columns: list[int] | None = None,
+    role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    prefetch: Callable[[range], None] | None = None,
+) -> None:
+    """Saves the model as CSV to a file the user chooses.
+
+    `prefetch`, if given, is called with every batch of rows before they are
+    written, e.g. to load their full texts in one query per batch.
+    """
     PATH, EXTENSION = QFileDialog.getSaveFileName(
         parent, "Укажите путь", expanduser("~"), "*.csv"
     )
@@ -16,18 +33,21 @@ def export(model: QAbstractTableModel, parent: QWidget, vert=False) -> None:
     else:
         headers: list[str] = []
 
-    for col in range(model.columnCount()):
+    if columns is None:
+        columns = list(range(model.columnCount()))
+
+    for col in columns:
         headers.append(model.headerData(col, Qt.Orientation.Horizontal, Qt.ItemDataRole.DisplayRole))
 
-    with open(PATH, "w", encoding="UTF-8", newline="") as file:
+    with PROFILER.action(f"{type(parent).__name__}.export"), open(PATH, "w", encoding="UTF-8", newline="") as file:
         writer = csv.writer(file)
         writer.writerow(headers)
         for rowNumber in range(model.rowCount()):
+            if prefetch is not None and rowNumber % EXPORT_BATCH_SIZE == 0:
+                prefetch(range(rowNumber, min(rowNumber + EXPORT_BATCH_SIZE, model.rowCount())))
             fields = [
-                model.data(
-                    model.index(rowNumber, columnNumber), Qt.ItemDataRole.DisplayRole
-                )
-                for columnNumber in range(model.columnCount())
+                model.data(model.index(rowNumber, columnNumber), role)
+                for columnNumber in columns
             ]
             if vert:
                 h = model.headerData(rowNumber, Qt.Orientation.Vertical, role=Qt.ItemDataRole.DisplayRole)
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from PyQt6 import QtWidgets
+from sqlmodel import Session
+
+from app.db import ENGINE, dashboard
+
+
+class DashboardPanel(QtWidgets.QGroupBox):
+    """Overview of overdue assignments, today's events and this week's reservations."""
+
+    def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
+        super().__init__("Сводка", parent)
+        self.setLayout(QtWidgets.QFormLayout())
+        self.setSizePolicy(QtWidgets.QSizePolicy.Policy.Maximum, QtWidgets.QSizePolicy.Policy.Preferred)
+
+        self.overdueLabel = QtWidgets.QLabel(self)
+        self.dueTodayLabel = QtWidgets.QLabel(self)
+        self.eventsTodayLabel = QtWidgets.QLabel(self)
+        self.reservationsLabel = QtWidgets.QLabel(self)
+
+        self.layout().addRow("Просроченные заявки:", self.overdueLabel)
+        self.layout().addRow("Заявки на сегодня:", self.dueTodayLabel)
+        self.layout().addRow("Мероприятия сегодня:", self.eventsTodayLabel)
+        self.layout().addRow(QtWidgets.QLabel("Бронирования на этой неделе:"))
+        self.layout().addRow(self.reservationsLabel)
+
+        self.overdue = self.events_today = self.reservations_this_week = 0
+
+    def refresh(self) -> None:
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+
+        with Session(ENGINE) as session:
+            self.overdue = dashboard.overdue_assignments(session, today)
+            due_today = dashboard.due_assignments(session, today)
+            self.events_today = dashboard.events_on(session, today)
+            reservations = dashboard.reservations_by_location(session, monday, monday + timedelta(days=6))
+
+        self.reservations_this_week = sum(count for _, count in reservations)
+
+        self.overdueLabel.setText(str(self.overdue))
+        self.dueTodayLabel.setText(str(due_today))
+        self.eventsTodayLabel.setText(str(self.events_today))
+        self.reservationsLabel.setText(
+            str.join("\n", (f"{name}: {count}" for name, count in reservations)) or "Нет"
+        )
@@ -4,12 +4,14 @@ from sqlmodel import Session, select
 from PyQt6 import QtWidgets, QtCore
 
 from app.db import ENGINE
+from app.db.transactions import WriteConflictError, writing
 from app.db.models import (
     Event,
     AssignmentType,
     Location,
     Assignment,
 )
+from app.ui.widgets.alerts import validationError
 from app.ui.widgets.dialogs.ext import DialogView
         
         
@@ -39,17 +41,20 @@ class AssignmentCreateDialog(DialogView):
         self.eventComboBox.addItems(eventTypeName for eventTypeName in eventNames)
 
     def accept(self) -> None:
-        with Session(ENGINE) as session:
-            assignment: Assignment = self.obj
-            assignment.state = next(scope for scope, radio in self.state_radios.items() if radio.isChecked())
-            assignment.deadline = self.dateDateTimeEdit.dateTime().toPyDateTime()
-            assignment.description = self.descriptionTextEdit.toPlainText()
-            assignment.event_id = session.exec(select(Event.id).where(Event.title == self.eventComboBox.currentText())).first()
-            assignment.location_id = session.exec(select(Location.id).where(Location.name == self.roomComboBox.currentText())).first()
-            assignment.type_id = session.exec(select(AssignmentType.id).where(AssignmentType.name == self.typeComboBox.currentText())).first()
+        try:
+            with writing() as session:
+                assignment: Assignment = self.obj
+                assignment.state = next(scope for scope, radio in self.state_radios.items() if radio.isChecked())
+                assignment.deadline = self.dateDateTimeEdit.dateTime().toPyDateTime()
+                assignment.description = self.descriptionTextEdit.toPlainText()
+                assignment.event_id = session.exec(select(Event.id).where(Event.title == self.eventComboBox.currentText())).first()
+                assignment.location_id = session.exec(select(Location.id).where(Location.name == self.roomComboBox.currentText())).first()
+                assignment.type_id = session.exec(select(AssignmentType.id).where(AssignmentType.name == self.typeComboBox.currentText())).first()
 
-            session.add(assignment)
-            session.commit()
+                session.add(assignment)
+        except WriteConflictError as error:
+            validationError(self, str(error))
+            return
 
         return super().accept()
 
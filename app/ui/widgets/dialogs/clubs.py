@@ -3,6 +3,7 @@ from sqlmodel import Session, select
 from PyQt6 import QtCore
 
 from app.db import ENGINE
+from app.db.transactions import WriteConflictError, writing
 from app.db.models import (
     Club,
     ClubType,
@@ -38,17 +39,20 @@ class ClubCreateDialog(DialogView):
             validationError(self, "Выберите хотя бы один день недели!")
             return
 
-        with Session(ENGINE) as session:
-            club: Club = self.obj
-            club.days = self.schedule_manager.days
-            club.title = self.titleLineEdit.text()
-            club.start_at = self.startDateEdit.date().toPyDate()
-            club.teacher_id = session.exec(select(Teacher.id).where(Teacher.name == self.teacherComboBox.currentText())).first()
-            club.location_id = session.exec(select(Location.id).where(Location.name == self.locationComboBox.currentText())).first()
-            club.type_id = session.exec(select(ClubType.id).where(ClubType.name == self.typeComboBox.currentText())).first()
+        try:
+            with writing() as session:
+                club: Club = self.obj
+                club.days = self.schedule_manager.days
+                club.title = self.titleLineEdit.text()
+                club.start_at = self.startDateEdit.date().toPyDate()
+                club.teacher_id = session.exec(select(Teacher.id).where(Teacher.name == self.teacherComboBox.currentText())).first()
+                club.location_id = session.exec(select(Location.id).where(Location.name == self.locationComboBox.currentText())).first()
+                club.type_id = session.exec(select(ClubType.id).where(ClubType.name == self.typeComboBox.currentText())).first()
 
-            session.add(club)
-            session.commit()
+                session.add(club)
+        except WriteConflictError as error:
+            validationError(self, str(error))
+            return
 
         return super().accept()
 
@@ -3,7 +3,7 @@ from sqlmodel import Session, select
 
 from PyQt6 import QtWidgets, QtCore
 
-from app.db import ENGINE
+from app.db import ENGINE, reservations
 from app.db.models import (
     EventType,
     Event,
@@ -11,6 +11,7 @@ from app.db.models import (
     Reservation,
     Scope,
 )
+from app.db.transactions import WriteConflictError, writing
 from app.ui.widgets.alerts import validationError
 from app.ui.widgets.wizards.reservation import ReservationWizard
 from app.ui.widgets.dialogs.ext import DialogView
@@ -38,7 +39,10 @@ class EventCreateDialog(DialogView):
         self.dateDateTimeEdit.setMinimumDateTime(QtCore.QDateTime.currentDateTime())
 
     def create(self, commit=True) -> Event:
-        with Session(ENGINE) as session:
+        reservation = getattr(self, "reservation", None) if commit else None
+
+        # Проверка и вставка брони выполняются в одной транзакции с блокировкой на запись
+        with reservations.conflicts_as_errors(), (writing() if commit else Session(ENGINE)) as session:
             event = self.obj
 
             event.title = self.titleLineEdit.text()
@@ -49,9 +53,9 @@ class EventCreateDialog(DialogView):
             
             session.add(event)
             if commit:
-                if hasattr(self, "reservation"):
-                    session.add(self.reservation)
-                session.commit()
+                if reservation is not None:
+                    reservations.check(session, reservation)
+                    session.add(reservation)
             else:
                 session.flush()
         return event
@@ -77,7 +81,11 @@ class EventCreateDialog(DialogView):
             validationError(self, "Название мероприятия должно быть заполнено!")
             return
 
-        self.create()
+        try:
+            self.create()
+        except WriteConflictError as error:
+            validationError(self, str(error))
+            return
         return super().accept()
 
 
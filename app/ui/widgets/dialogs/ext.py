@@ -1,8 +1,11 @@
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from PyQt6 import uic, QtWidgets
+from PyQt6 import uic, QtGui, QtWidgets
 
 from app.db import ENGINE
+from app.db.profiling import PROFILER
+from app.db.transactions import WriteConflictError, writing
 from app.db.models import (
     Area,
     BaseModel,
@@ -14,26 +17,56 @@ from app.ui.widgets.mixins import WidgetMixin
         
 
 class TypeManagerDialog(QtWidgets.QDialog):
+    """Edits the objects of a type in memory and saves the changes when accepted."""
+
     def __init__(self, _type, parent = None) -> None:
         super().__init__(parent)
         uic.loadUi("app/ui/assets/dialogs/type-manager.ui", self)
+        self._type = _type
+
+        self.addButton.clicked.connect(self.onAddButtonClicked)
+        self.delButton.clicked.connect(self.onDelButtonClicked)
+        QtGui.QShortcut(QtGui.QKeySequence.StandardKey.Paste, self.listView, self.onPaste)
 
+    @property
+    def models(self) -> list[TypeListModel]:
+        return [self.listViewModel]
+
+    def load(self) -> None:
         with Session(ENGINE) as session:
-            data = session.exec(select(_type)).all()
+            data = session.exec(select(self._type)).all()
+
+        self.setModel(TypeListModel[self._type](data, self))
 
-        self.listViewModel = TypeListModel[_type](data, self)
+    def setModel(self, model: TypeListModel) -> None:
+        self.listViewModel = model
         self.listView.setModel(self.listViewModel)
 
         self.delButton.setDisabled(True)
         self.listView.selectionModel().selectionChanged.connect(
-            lambda: self.delButton.setDisabled(False)
+            lambda: self.delButton.setDisabled(not(bool(self.listView.selectedIndexes())))
         )
 
-        self.addButton.clicked.connect(self.onAddButtonClicked)
-        self.delButton.clicked.connect(self.onDelButtonClicked)
+    def exec(self) -> int:
+        # Changes left by a cancelled run are discarded
+        self.load()
+        return super().exec()
+
+    def accept(self) -> None:
+        try:
+            with writing() as session:
+                for model in self.models:
+                    model.commit(session)
+        except WriteConflictError as error:
+            validationError(self, str(error))
+            return
+        except IntegrityError:
+            validationError(self, "Объект с таким названием уже был создан другим пользователем!")
+            return
+        super().accept()
 
-    def onAddButtonClicked(self, **kwargs) -> None:
-        self.listViewModel.insertRow(-1, **kwargs)
+    def onAddButtonClicked(self) -> None:
+        self.listViewModel.insertRow(-1)
         index = self.listViewModel.index(self.listViewModel.rowCount() - 1, 0)
         self.listView.edit(index)
         self.listView.setCurrentIndex(index)
@@ -42,39 +75,47 @@ class TypeManagerDialog(QtWidgets.QDialog):
         currentRowIndex = self.listView.currentIndex().row()
         self.listViewModel.removeRow(currentRowIndex)
 
+    def onPaste(self) -> None:
+        """Adds an object for every new name in the pasted lines."""
+        self.listViewModel.insertNames(QtWidgets.QApplication.clipboard().text().splitlines())
+
 
 class AreaManagerDialog(TypeManagerDialog):
     def __init__(self, parent = None) -> None:
         super().__init__(Area, parent)
+        self._models: dict[str, TypeListModel[Area]] = {}
         self.combobox = QtWidgets.QComboBox()
-        self.combobox.currentTextChanged.connect(self.updateModel)
 
         with Session(ENGINE) as session:
             self.names = session.exec(select(Location.name)).all()
 
         self.combobox.addItems(name for name in self.names)
+        self.combobox.currentTextChanged.connect(self.updateModel)
         self.verticalLayout_4.addWidget(self.combobox)
 
+    @property
+    def models(self) -> list[TypeListModel]:
+        return list(self._models.values())
+
     def exec(self) -> int:
         if self.names:
             return super().exec()
         validationError(self, "Вы должны создать хотя бы одно помещение!")
         return False
 
-    def updateModel(self, name: str):
-        with Session(ENGINE) as session:
-            self.location = session.exec(select(Location).where(Location.name == name)).first()
-            self.listViewModel = TypeListModel[Area](self.location.areas, self)
-
-        self.listView.setModel(self.listViewModel)
+    def load(self) -> None:
+        self._models.clear()
+        self.updateModel(self.combobox.currentText())
 
-        self.delButton.setDisabled(True)
-        self.listView.selectionModel().selectionChanged.connect(
-            lambda: self.delButton.setDisabled(not(bool(self.listView.selectedIndexes())))
-        )
+    def updateModel(self, name: str):
+        # The models of all locations are kept, so switching does not lose changes
+        model = self._models.get(name)
+        if model is None:
+            with Session(ENGINE) as session:
+                location = session.exec(select(Location).where(Location.name == name)).one()
+                model = self._models[name] = TypeListModel[Area](location.areas, self, location_id=location.id)
 
-    def onAddButtonClicked(self) -> None:
-        super().onAddButtonClicked(location_id=self.location.id)
+        self.setModel(model)
 
 
 class DialogView(QtWidgets.QDialog, WidgetMixin):
@@ -82,7 +123,8 @@ class DialogView(QtWidgets.QDialog, WidgetMixin):
 
     def __init__(self, obj=None, parent: QtWidgets.QWidget | None = None) -> None:
         self.obj = obj
-        super().__init__(parent)
+        with PROFILER.action(f"{type(self).__name__}.open"):
+            super().__init__(parent)
 
     @property
     def obj(self):
@@ -0,0 +1,118 @@
+from os.path import expanduser
+
+from PyQt6 import QtWidgets, QtCore
+
+from app.db.profiling import PROFILER, ActionStats
+from app.ui.profiling import INSTRUMENTS, role_name
+
+
+class ProfilerDialog(QtWidgets.QDialog):
+    """Developer panel with the statements per UI action and the per-view hot-path counters."""
+
+    HEADERS = ("Действие", "Начало", "Время, мс", "Запросов", "SQL, мс", "N+1", "Медленных")
+    VIEW_HEADERS = ("Представление", "Вызов", "Роль", "Столбец", "Вызовов", "Всего, мс", "В среднем, мкс")
+
+    def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Панель разработчика")
+        self.resize(900, 600)
+        self.setLayout(QtWidgets.QVBoxLayout())
+
+        self.tableWidget = QtWidgets.QTableWidget(0, len(self.HEADERS), self)
+        self.tableWidget.setHorizontalHeaderLabels(self.HEADERS)
+        self.tableWidget.setSelectionBehavior(QtWidgets.QTableWidget.SelectionBehavior.SelectRows)
+        self.tableWidget.setEditTriggers(QtWidgets.QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.tableWidget.verticalHeader().setVisible(False)
+        self.tableWidget.itemSelectionChanged.connect(self.showDetails)
+
+        self.detailsTextEdit = QtWidgets.QPlainTextEdit(self)
+        self.detailsTextEdit.setReadOnly(True)
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Vertical, self)
+        splitter.addWidget(self.tableWidget)
+        splitter.addWidget(self.detailsTextEdit)
+
+        self.viewsTableWidget = QtWidgets.QTableWidget(0, len(self.VIEW_HEADERS), self)
+        self.viewsTableWidget.setHorizontalHeaderLabels(self.VIEW_HEADERS)
+        self.viewsTableWidget.setEditTriggers(QtWidgets.QTableWidget.EditTrigger.NoEditTriggers)
+        self.viewsTableWidget.setSortingEnabled(True)
+        self.viewsTableWidget.verticalHeader().setVisible(False)
+
+        self.tabWidget = QtWidgets.QTabWidget(self)
+        self.tabWidget.addTab(splitter, "SQL")
+        self.tabWidget.addTab(self.viewsTableWidget, "Отрисовка")
+        self.layout().addWidget(self.tabWidget)
+
+        buttons = QtWidgets.QHBoxLayout()
+        for text, slot in (("Обновить", self.refresh), ("Очистить", self.clear), ("Сохранить…", self.dump)):
+            button = QtWidgets.QPushButton(text, self)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        self.layout().addLayout(buttons)
+
+        self._actions: list[ActionStats] = []
+        self.refresh()
+
+    def refresh(self) -> None:
+        self._actions = [*reversed(PROFILER.actions), PROFILER.unattributed]
+        self.tableWidget.setRowCount(len(self._actions))
+
+        for row, stats in enumerate(self._actions):
+            values = (
+                stats.name,
+                stats.started_at.strftime("%H:%M:%S"),
+                f"{stats.duration * 1000:.1f}",
+                str(stats.statements),
+                f"{stats.sql_time * 1000:.1f}",
+                str(len(stats.n_plus_one)),
+                str(len(stats.slow)),
+            )
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+
+        rows = []
+        for view in INSTRUMENTS.views.values():
+            rows += [
+                (view.name, "data", role_name(role), view.column_name(column), stats)
+                for (role, column), stats in view.data.items()
+            ]
+            rows += [(view.name, "headerData", role_name(role), "", stats) for role, stats in view.header.items()]
+            if view.paint.calls:
+                rows.append((view.name, "paint", "", "", view.paint))
+
+        self.viewsTableWidget.setSortingEnabled(False)
+        self.viewsTableWidget.setRowCount(len(rows))
+        for row, (*values, stats) in enumerate(rows):
+            for column, value in enumerate(values):
+                self.viewsTableWidget.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+            for column, value in enumerate((stats.calls, stats.time * 1000, stats.time / stats.calls * 1e6), len(values)):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.ItemDataRole.DisplayRole, round(value, 1))
+                self.viewsTableWidget.setItem(row, column, item)
+        self.viewsTableWidget.setSortingEnabled(True)
+
+    def showDetails(self) -> None:
+        rows = self.tableWidget.selectionModel().selectedRows()
+        if not rows:
+            self.detailsTextEdit.clear()
+            return
+
+        stats = self._actions[rows[0].row()]
+        lines = [f"N+1: {count} × {shape}" for shape, count in stats.n_plus_one]
+        lines += [f"Медленный ({elapsed * 1000:.1f} мс): {shape}" for shape, elapsed in stats.slow]
+        lines += [f"{count} × {shape}" for shape, count in stats.shapes.most_common()]
+        self.detailsTextEdit.setPlainText("\n\n".join(lines))
+
+    def clear(self) -> None:
+        PROFILER.clear()
+        INSTRUMENTS.clear()
+        self.refresh()
+
+    def dump(self) -> None:
+        path, extension = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Укажите путь", expanduser("~"), "*.json"
+        )
+        if extension:
+            PROFILER.dump(path)
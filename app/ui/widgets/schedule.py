@@ -2,19 +2,10 @@ from datetime import time
 
 from PyQt6 import QtWidgets, QtCore
 
+from app.columns import WEEKDAY_NAMES
 from app.db.models import Weekday, DaySchedule
 from app.ui.widgets.mixins import WidgetMixin
 
-WEEKDAY_NAMES = {
-    Weekday.MONDAY: "Понедельник",
-    Weekday.TUESDAY: "Вторник",
-    Weekday.WEDNESDAY: "Среда",
-    Weekday.THURSDAY: "Четверг",
-    Weekday.FRIDAY: "Пятница",
-    Weekday.SATURDAY: "Суббота",
-    Weekday.SUNDAY: "Воскресенье",
-}
-
 DEFAULT_START_AT_TIME = time(14)
 DEFAULT_END_AT_TIME = time(16)
 
@@ -1,24 +1,77 @@
 import csv
-from functools import reduce
+import logging
 
 from os.path import expanduser
+from typing import Any, Callable, TypeVar
 
 from sqlmodel import Session, select, delete
-from sqlmodel.sql.expression import SelectOfScalar
+from sqlmodel.sql.expression import Select, SelectOfScalar
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 
 from PyQt6 import QtWidgets, QtGui
 from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import Qt, pyqtSlot
-from PyQt6.QtWidgets import QWidget, QDialog, QMessageBox, QFileDialog, QPushButton
+from PyQt6.QtCore import QPoint, QSettings, Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QWidget, QDialog, QMenu, QMessageBox, QFileDialog, QPushButton
 from app.ui.utils import export
-from app.ui.widgets.alerts import confirm
+from app.ui.widgets.alerts import confirm, validationError
 
 from app.db import ENGINE
+from app.db.archive import with_archive
+from app.db.interrupts import INTERRUPTS, CancelToken, QueryCancelled
+from app.db.profiling import PROFILER
+from app.db.pages import SORT_KEY, PagedRows, Pager
+from app.db.queries import indexed, outerjoin, semijoin, sort_column
+from app.db.transactions import StaleObjectError, WriteConflictError, writing
 from app.ui.models import BaseTableModel
 from app.db.models import BaseModel
 from app.ui.widgets.mixins import WidgetMixin
+from app.ui.widgets.views import TableView
 from app.ui.widgets.tables.filters import Filter, FilterBox
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TableSearch(QThread):
+    """Counts the rows matching the filters of a table and reads their first page and summary.
+
+    The statements are built by the table beforehand; `cancel` interrupts
+    the query running, so a search made obsolete stops at once.
+    """
+
+    found = pyqtSignal(object, object)
+
+    def __init__(self, name: str, pager: Pager, parameters: dict[str, Any], statement: SelectOfScalar, summary) -> None:
+        super().__init__()
+        self.name = name
+        self.pager = pager
+        self.parameters = parameters
+        self.statement = statement
+        self.summary = summary
+        self.token = CancelToken()
+
+    def cancel(self) -> None:
+        self.requestInterruption()
+        self.token.cancel()
+
+    def run(self) -> None:
+        try:
+            with PROFILER.action(f"{self.name}.search"), INTERRUPTS.cancellable(self.token):
+                rows = PagedRows(self.pager, self.parameters)
+                if len(rows):
+                    rows.page(0)
+                with Session(ENGINE) as session:
+                    summary = self.summary(session, self.statement, self.parameters)
+        except QueryCancelled:
+            return
+        except Exception:
+            logger.exception("%s search failed", self.name)
+            return
+        if not self.isInterruptionRequested():
+            self.found.emit(rows, summary)
+
 
 class Table(QWidget, WidgetMixin):
     ui_path = "app/ui/assets/table.ui"
@@ -28,34 +81,132 @@ class Table(QWidget, WidgetMixin):
     create_dialog: QDialog | None = None
     update_dialog: QDialog | None = None
     delete_visible: bool = True
+    archive_visible: bool = False
     filters: tuple[Filter] = None
+    sort_keys: dict[str, InstrumentedAttribute] = {}
+    STATEMENT_CACHE_SIZE = 32
+    # Cancelled searches are kept here until their threads stop
+    _searches: set[TableSearch] = set()
     
     @property
     def selected_indexes(self):
         return sorted(i.row() for i in self.tableView.selectionModel().selectedRows())
 
     @property
-    def statement(self):
-        statement: SelectOfScalar = select(self.table)
-        if self._filter_box and self._filter_box.where is not None:
-            joins = (flt._statement.parent.class_ for flt in self.filters if not isinstance(flt._statement.parent.class_(), self.table))
-            statement = reduce(lambda s, j: s.join(j, isouter=True), joins, statement).where(self._filter_box.where)
+    def sort_key(self) -> InstrumentedAttribute | None:
+        if self._sort_section < 0:
+            return None
+        return self.sort_keys.get(self.table_model.headers()[self._sort_section])
+
+    def query(self, statement: Select, sort: bool = False) -> Select:
+        """Applies the filters of the table to `statement` selecting from `table`.
+
+        If `sort`, the sorted column is added as `sort_key` for `Pager` to
+        order the rows by; in the archive view it orders the whole union.
+        """
+        conditions = self._filter_box.conditions if self._filter_box else {}
+        for model, condition in conditions.items():
+            # Filters on related tables are semi-joins, only the sorting joins
+            statement = statement.where(condition if model is self.table else semijoin(self.table, model, condition))
+
+        sort_key = self.sort_key
+        if sort and sort_key is not None:
+            statement = outerjoin(statement, self.table, [sort_key.parent.class_]).add_columns(sort_column(sort_key).label(SORT_KEY))
+
+        if self.include_archive:
+            statement = select(*with_archive(statement).subquery().c)
         return statement
-        
+
+    def cached(self, name: str, build: Callable[[], T]) -> T:
+        """Returns the statement `name` for the current filters, sorting and columns, built by `build` once.
+
+        The values of the filters are not part of the statement but bound on
+        execution (see `parameters`), so changing them reuses the statement
+        and its compiled SQL.
+        """
+        shape = self._filter_box.shape if self._filter_box else frozenset()
+        key = (name, shape, self._sort_section, self._sort_order, self.include_archive, frozenset(self.hidden_columns))
+        statement = self._statements.get(key)
+        if statement is None:
+            if len(self._statements) >= self.STATEMENT_CACHE_SIZE:
+                self._statements.clear()
+            statement = self._statements[key] = build()
+        return statement
+
     @property
-    def data(self):
-        with Session(ENGINE) as session:
-            return session.exec(self.statement).all()
+    def parameters(self) -> dict[str, Any]:
+        """The values of the filters bound to the statements."""
+        return self._filter_box.parameters if self._filter_box else {}
+
+    @property
+    def statement(self) -> SelectOfScalar:
+        return self.cached("statement", lambda: self.query(select(self.table)))
+
+    @property
+    def rows_statement(self) -> Select:
+        """Selects the compact rows of `table_model`: the id, the version and the displayed values."""
+        def build() -> Select:
+            expressions = self.table_model.expressions(self.hidden_columns)
+            return self.query(select(self.table.id, self.table.version, *expressions), sort=True)
+
+        return self.cached("rows", build)
+
+    @property
+    def pager(self) -> Pager:
+        def build() -> Pager:
+            descending = self._sort_order == Qt.SortOrder.DescendingOrder
+            # The union of the archive view is always sorted as a whole
+            return Pager(self.rows_statement, descending, not self.include_archive and indexed(self.table, self.sort_key))
+
+        return self.cached("pager", build)
+
+    @property
+    def rows(self) -> PagedRows:
+        return PagedRows(self.pager, self.parameters)
+
+    def objects(self, session: Session, rows: list[int]) -> list[BaseModel]:
+        """Loads the full objects shown in the rows.
+
+        Raises:
+            StaleObjectError: If an object was changed or deleted since the table was refreshed.
+        """
+        versions = {self.model.id(row): self.model.version(row) for row in rows}
+        objects = session.exec(select(self.table).where(self.table.id.in_(versions))).all()
+        if len(objects) != len(versions) or any(obj.version != versions[obj.id] for obj in objects):
+            raise StaleObjectError()
+        return objects
+
+    def summary(self, session: Session, statement: SelectOfScalar, parameters: dict[str, Any]) -> str | None:
+        """Returns the aggregates of the rows matching `statement` with `parameters` shown under the table."""
+        return None
     
     def __init__(self, parent: QWidget | None = None) -> None:
         self._extra_buttons = []
+        self._sort_section = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self.include_archive = False
+        self._statements: dict[tuple, Select] = {}
+        self._search: TableSearch | None = None
+        self.hidden_columns: set[str] = set(QSettings().value(self.settings_key, [], list)) & set(self.table_model.headers())
         super().__init__(parent)
+
+    @property
+    def settings_key(self) -> str:
+        return f"tables/{type(self).__name__}/hidden_columns"
         
     def setup_ui(self) -> None:
-        self.tableView = QtWidgets.QTableView()
+        self.tableView = TableView()
         self.tableView.setSelectionBehavior(QtWidgets.QTableView.SelectionBehavior.SelectRows)
         self.tableView.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Stretch)
         self.tableView.verticalHeader().setVisible(False)
+
+        header = self.tableView.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(self._sort_section, self._sort_order)
+        header.sortIndicatorChanged.connect(self.sort)
+        header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.show_columns_menu)
         
         if self.create_dialog:
             self.createButton.clicked.connect(self.create)
@@ -82,6 +233,11 @@ class Table(QWidget, WidgetMixin):
         self.splitter.addWidget(self._filter_box)
         self.splitter.setStretchFactor(0, 5)
         self.verticalLayout.addWidget(self.splitter)
+
+        self.summaryLabel = QtWidgets.QLabel(self)
+        self.summaryLabel.setWordWrap(True)
+        self.summaryLabel.hide()
+        self.verticalLayout.addWidget(self.summaryLabel)
         
         self._filter_box.hide()
         hideFilterBtn = QtWidgets.QToolButton()
@@ -92,6 +248,12 @@ class Table(QWidget, WidgetMixin):
         hideFilterBtn.setShortcut(QtGui.QKeySequence(shortcut))
         hideFilterBtn.clicked.connect(lambda: self._filter_box.setHidden(not(self._filter_box.isHidden())))
 
+        if self.archive_visible:
+            self.archiveCheckBox = QtWidgets.QCheckBox("Архив", self)
+            self.archiveCheckBox.setToolTip("Показать также архивные записи (только для просмотра)")
+            self.archiveCheckBox.toggled.connect(self.set_include_archive)
+            self.toolbarLayout.addWidget(self.archiveCheckBox)
+
     def _add_button(self, layout, index, text: str, slot, icon=None) -> None:
         button = QPushButton(QIcon(icon), text, self)
         button.clicked.connect(slot)
@@ -106,56 +268,155 @@ class Table(QWidget, WidgetMixin):
 
     @pyqtSlot()
     def update(self):
-        self.update_dialog(self.model._data[self.selected_indexes[0]], self.parent()).exec()
+        with Session(ENGINE) as session:
+            # The dialog reads the relationships after the session is closed.
+            item = session.get(self.table, self.model.id(self.selected_indexes[0]), options=[selectinload("*")])
+        if item is None:
+            validationError(self.parent(), str(StaleObjectError()))
+            self.refresh(filter=False)
+            return
+
+        if self.update_dialog(item, self.parent()).exec():
+            self.refresh(filter=False)
 
     @pyqtSlot()
     def delete(self):
         if not confirm(self.parent(), "Вы действительно хотите удалить выбранные объекты?"):
             return
 
-        with Session(ENGINE) as session:
-            ids = []
-            for i, j in enumerate(self.selected_indexes):
-                index = j - i
-                ids.append(self.model._data[index].id)
-                session.delete(self.model._data[index])
-                self.model.removeRow(index)
-            # session.exec(delete(self.table).where(self.table.id.in_(ids)))
-            session.commit()
+        try:
+            with writing() as session:
+                for item in self.objects(session, self.selected_indexes):
+                    session.delete(item)
+        except WriteConflictError as error:
+            validationError(self.parent(), str(error))
+            self.refresh(filter=False)
+            return
 
+        for i, j in enumerate(self.selected_indexes):
+            self.model.removeRow(j - i)
         self.update_total_count()
 
+    @pyqtSlot(int, Qt.SortOrder)
+    def sort(self, section: int, order: Qt.SortOrder):
+        if section >= 0 and self.table_model.headers()[section] not in self.sort_keys:
+            header = self.tableView.horizontalHeader()
+            header.blockSignals(True)
+            header.setSortIndicator(self._sort_section, self._sort_order)
+            header.blockSignals(False)
+            return
+
+        self._sort_section, self._sort_order = section, order
+        self.refresh(filter=False)
+
+    @pyqtSlot(QPoint)
+    def show_columns_menu(self, position: QPoint) -> None:
+        menu = QMenu(self)
+        headers = self.table_model.headers()
+        for header in headers:
+            action = menu.addAction(header)
+            action.setCheckable(True)
+            action.setChecked(header not in self.hidden_columns)
+            # At least one column stays visible
+            action.setEnabled(header in self.hidden_columns or len(self.hidden_columns) < len(headers) - 1)
+            action.toggled.connect(lambda visible, header=header: self.set_column_visible(header, visible))
+        menu.exec(self.tableView.horizontalHeader().mapToGlobal(position))
+
+    def set_column_visible(self, header: str, visible: bool) -> None:
+        if visible:
+            self.hidden_columns.discard(header)
+        else:
+            self.hidden_columns.add(header)
+        QSettings().setValue(self.settings_key, sorted(self.hidden_columns))
+        self.refresh(filter=False)
+
     @pyqtSlot()
     def export(self):
-        export(self.model, self)
+        columns = [i for i, header in enumerate(self.model.headers()) if header not in self.hidden_columns]
+        # The full texts are read batch by batch as the rows are written
+        export(self.model, self, columns=columns, role=Qt.ItemDataRole.EditRole, prefetch=lambda rows: self.model.prefetch(columns, rows))
 
     @pyqtSlot()
     def refresh(self, filter=True):
-        self.model: BaseTableModel = self.table_model(self.data)
+        self.cancel_search()
+        with PROFILER.action(f"{type(self).__name__}.refresh"):
+            self.show_rows(self.rows)
+
+            if filter:
+                self._filter_box.refresh()
+
+            self.on_selection_changed()
+            self.update_total_count()
+
+    def show_rows(self, rows: PagedRows) -> None:
+        name = type(self).__name__
+        self.model: BaseTableModel = self.table_model(rows)
+        self.model.stats = rows.stats = PROFILER.track(f"{name}.data")
+        self.model.view_name = name
         self.tableView.setModel(self.model)
+        for i, header in enumerate(self.model.headers()):
+            self.tableView.setColumnHidden(i, header in self.hidden_columns)
         self.tableView.selectionModel().selectionChanged.connect(
             self.on_selection_changed
         )
-        
-        if filter:
-            self._filter_box.refresh()
 
+    def search(self) -> None:
+        """Shows the rows matching the filters once a `TableSearch` has read them.
+
+        Unlike `refresh`, the interface stays responsive meanwhile, and a
+        search started before is interrupted.
+        """
+        self.cancel_search()
+        self._search = search = TableSearch(
+            type(self).__name__, self.pager, dict(self.parameters), self.statement, self.summary
+        )
+        self._searches.add(search)
+        search.found.connect(self.show_search)
+        search.finished.connect(lambda: self._searches.discard(search))
+        search.start()
+
+    def cancel_search(self) -> None:
+        search, self._search = self._search, None
+        if search is None:
+            return
+        search.found.disconnect(self.show_search)
+        search.cancel()
+
+    @pyqtSlot(object, object)
+    def show_search(self, rows: PagedRows, summary: str | None) -> None:
+        self._search = None
+        self.show_rows(rows)
         self.on_selection_changed()
-        self.update_total_count()
+        self.totalRowsCountLabel.setText(str(self.model.rowCount()))
+        self.show_summary(summary)
 
     @pyqtSlot()
     def on_selection_changed(self):
         count = len(self.selected_indexes)
+        # Archived rows cannot be changed
+        editable = count and not self.include_archive
         self.selectedRowsCountLabel.setText(str(count))
-        self.deleteButton.setEnabled(count)
-        self.updateButton.setEnabled(count == 1)
+        self.deleteButton.setEnabled(editable)
+        self.updateButton.setEnabled(editable and count == 1)
         self.exportButton.setEnabled(self.model.rowCount())
 
         for button in self._extra_buttons:
-            button.setEnabled(count)
+            button.setEnabled(editable)
+
+    @pyqtSlot(bool)
+    def set_include_archive(self, include: bool) -> None:
+        self.include_archive = include
+        self.refresh(filter=False)
 
     def update_total_count(self):
         self.totalRowsCountLabel.setText(str(self.model.rowCount()))
+        with Session(ENGINE) as session:
+            summary = self.summary(session, self.statement, self.parameters)
+        self.show_summary(summary)
+
+    def show_summary(self, summary: str | None) -> None:
+        self.summaryLabel.setVisible(summary is not None)
+        self.summaryLabel.setText(summary or "")
 
     def add_top_button(self, text: str, slot, icon=None) -> None:
         self._add_button(self.horizontalLayout, 2, text, slot, icon)
@@ -1,74 +1,161 @@
 from abc import ABC, abstractmethod
-from sqlalchemy import BinaryExpression
+from typing import Any, Callable, Collection, Final
+
+from sqlalchemy import ColumnElement, bindparam
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlmodel import Session, select, and_
 
 from PyQt6 import QtWidgets, QtCore
 
+from app.config import FILTER_DEBOUNCE_MS
 from app.db import ENGINE
+from app.db.profiling import PROFILER
 from app.ui.widgets.dialogs.ext import TypeManagerDialog
 from app.ui.widgets.mixins import WidgetMixin
 
 __all__ = ["FilterBox", "ComboboxFilter", "DateTimeRangeFilter"]
 
+LIVE_KEY: Final[str] = "filters/live"
+
 
 class Filter(ABC):
+    """A filter of a table column.
+
+    The condition of a filter only depends on which of its parameters are
+    set, not on their values: the values are bound when the statement is
+    executed, so the table reuses the statement and its compiled SQL.
+    """
+
     def __init__(self, label_text, statement: InstrumentedAttribute) -> None:
         self._label_text = label_text
         self._statement = statement
+        self.name = f"{statement.class_.__tablename__}_{statement.key}"
+
+    @property
+    def model(self) -> type:
+        return self._statement.class_
 
     @abstractmethod
     def setup(self, form: QtWidgets.QFormLayout) -> None:
         ...
 
     @abstractmethod
-    def apply(self) -> None:
+    def apply(self) -> dict[str, Any]:
+        """Returns the values of the set parameters by their names."""
+        ...
+
+    @abstractmethod
+    def condition(self, names: Collection[str]) -> ColumnElement | None:
+        """Returns the condition comparing the column with the parameters among `names`."""
         ...
 
     @abstractmethod
     def reset(self) -> None:
         ...
+
+    @abstractmethod
+    def watch(self, slot: Callable[[], None]) -> None:
+        """Connects `slot` to the changes of the filter made by the user."""
+        ...
     
     def refresh(self) -> None:
         pass
 
 
 class FilterBox(QtWidgets.QGroupBox, WidgetMixin):
+    """The filters of a table.
+
+    The filters are applied with the button or, in the live mode, once their
+    input paused for `FILTER_DEBOUNCE_MS`; the table then searches in the
+    background and interrupts the search a newer input made obsolete.
+    """
+
     ui_path = "app/ui/assets/filter.ui"
     title = None
-    where: BinaryExpression | None = None
 
     def __init__(self, filters: tuple[Filter], table, parent) -> None:
         self._filters = filters
         self._table = table
+        self.parameters: dict[str, Any] = {}
         super().__init__(parent)
 
+    @property
+    def shape(self) -> frozenset[str]:
+        """The names of the set parameters, which determine the statement."""
+        return frozenset(self.parameters)
+
+    @property
+    def conditions(self) -> dict[type, ColumnElement]:
+        """The conditions of the set filters by the models of their columns."""
+        conditions = {}
+        for filter in self._filters:
+            condition = filter.condition(self.parameters)
+            if condition is not None:
+                conditions.setdefault(filter.model, []).append(condition)
+        return {model: and_(*conditions) for model, conditions in conditions.items()}
+
     def setup_ui(self) -> None:
         self.resetButton.clicked.connect(self.reset)
         self.applyButton.clicked.connect(self.apply)
 
+        self.liveCheckBox = QtWidgets.QCheckBox("Сразу", self)
+        self.liveCheckBox.setToolTip("Применять фильтры по мере ввода")
+        self.liveCheckBox.setChecked(QtCore.QSettings().value(LIVE_KEY, False, bool))
+        self.liveCheckBox.toggled.connect(self.set_live)
+        self.horizontalLayout.insertWidget(0, self.liveCheckBox)
+
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(FILTER_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.search)
+
         for filter in self._filters:
             filter.setup(self.formLayout)
+            filter.watch(self.changed)
+
+    @property
+    def live(self) -> bool:
+        return self.liveCheckBox.isChecked()
+
+    @QtCore.pyqtSlot(bool)
+    def set_live(self, live: bool) -> None:
+        QtCore.QSettings().setValue(LIVE_KEY, live)
+        if live:
+            self._debounce.start()
+
+    @QtCore.pyqtSlot()
+    def changed(self) -> None:
+        if self.live:
+            self._debounce.start()
+
+    def _read(self) -> None:
+        self._debounce.stop()
+        self.parameters = {}
+        for filter in self._filters:
+            self.parameters.update(filter.apply())
 
     def reset(self):
-        self.where = None
+        self.parameters = {}
         for filter in self._filters:
             filter.reset()
+        # Resetting the widgets is not an input to search for
+        self._debounce.stop()
         self._table.refresh(filter=False)
 
     def apply(self):
-        statements = []
-        for filter in self._filters:
-            statement = filter.apply()
-            if statement is not None:
-                statements.append(statement)
-        if len(statements) != 0:
-            self.where = and_(*statements)
-        self._table.refresh(filter=False)
+        with PROFILER.action(f"{type(self._table).__name__}.filter"):
+            self._read()
+            self._table.refresh(filter=False)
+
+    @QtCore.pyqtSlot()
+    def search(self) -> None:
+        self._read()
+        self._table.search()
         
     def refresh(self):
         for filter in self._filters:
             filter.refresh()
+        self._debounce.stop()
 
 
 class TextFilter(Filter):
@@ -79,11 +166,19 @@ class TextFilter(Filter):
         form.addRow(QtWidgets.QLabel(self._label_text), self.lineEdit)
         
     def apply(self):
-        return self._statement.contains(self.lineEdit.text())
+        text = self.lineEdit.text()
+        return {self.name: text} if text else {}
+
+    def condition(self, names):
+        if self.name in names:
+            return self._statement.contains(bindparam(self.name))
     
     def reset(self) -> None:
         self.lineEdit.clear()
 
+    def watch(self, slot):
+        self.lineEdit.textChanged.connect(slot)
+
 
 class ComboboxFilter(Filter):
     @property
@@ -128,11 +223,22 @@ class ComboboxFilter(Filter):
 
     def apply(self):
         text = self.combobox.currentText()
-        if text:
-            return self._statement == self.get_comparer(text)
+        return {self.name: self.get_comparer(text)} if text else {}
+
+    def condition(self, names):
+        if self.name in names:
+            return self._statement == bindparam(self.name)
 
     def reset(self) -> None:
         self.combobox.setCurrentIndex(-1)
+
+    def watch(self, slot):
+        def changed(text: str) -> None:
+            # A partly typed value would match nothing, so only a cleared or a complete one is searched
+            if not text or self.combobox.findText(text) >= 0:
+                slot()
+
+        self.combobox.currentTextChanged.connect(changed)
         
     def refresh(self) -> None:
         self.combobox.clear()
@@ -184,17 +290,34 @@ class DateTimeRangeFilter(Filter):
             self._add_shortcuts(form)
         self.reset()
 
+    @property
+    def names(self) -> tuple[str, str]:
+        return f"{self.name}_from", f"{self.name}_to"
+
     def apply(self):
         fr_dt = self.fr.dateTime().toPyDateTime()
         to_dt = self.to.dateTime().toPyDateTime()
+        fr_name, to_name = self.names
 
-        conditions = []
+        parameters = {}
 
         if fr_dt != self.fr.minimumDateTime().toPyDateTime():
-            conditions.append(self._statement > fr_dt)
+            parameters[fr_name] = fr_dt
 
         if to_dt != self.to.minimumDateTime().toPyDateTime():
-            conditions.append(self._statement < to_dt)
+            parameters[to_name] = to_dt
+
+        return parameters
+
+    def condition(self, names):
+        fr_name, to_name = self.names
+        conditions = []
+
+        if fr_name in names:
+            conditions.append(self._statement > bindparam(fr_name))
+
+        if to_name in names:
+            conditions.append(self._statement < bindparam(to_name))
 
         return and_(*conditions) if conditions else None
 
@@ -204,6 +327,10 @@ class DateTimeRangeFilter(Filter):
 
         self.fr.setSpecialValueText("Не выбрано")
         self.to.setSpecialValueText("Не выбрано")
+
+    def watch(self, slot):
+        self.fr.dateTimeChanged.connect(slot)
+        self.to.dateTimeChanged.connect(slot)
         
     def _add_shortcuts(self, form: QtWidgets.QFormLayout):
         self.shortcuts = {
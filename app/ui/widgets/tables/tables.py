@@ -1,10 +1,14 @@
-from sqlmodel import Session
+from sqlalchemy import func
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
 
+from app.columns import SCOPES, STATES
 from app.ui.models import *
-from app.ui.models.models import SCOPES, STATES
 from app.ui.widgets.dialogs import *
 
-from app.db import ENGINE
+from app.db.queries import group_count_statement
+from app.db.transactions import WriteConflictError, writing
+from app.ui.widgets.alerts import validationError
 from app.db.models import *
 from app.ui.widgets.tables.base import *
 from app.ui.widgets.tables.filters import *
@@ -13,9 +17,18 @@ from app.ui.widgets.tables.filters import TextFilter, EnumFilter
 
 class EventTable(Table):
     table = Event
+    archive_visible = True
     table_model = EventTableModel
     create_dialog = EventCreateDialog
     update_dialog = EventUpdateDialog
+    sort_keys = {
+        "Заголовок": Event.title,
+        "Пространство": Event.scope,
+        "Разновидность": EventType.name,
+        "Дата начала": Event.start_at,
+        "Дата создания": Event.created_at,
+        "Описание": Event.description,
+    }
     filters = (
         TextFilter("Заголовок:", Event.title),
         TextFilter("Описание:", Event.description),
@@ -25,12 +38,26 @@ class EventTable(Table):
         DateTimeRangeFilter("Дата создания:", Event.created_at, True),
     )
 
+    def summary(self, session: Session, statement: SelectOfScalar, parameters: dict) -> str | None:
+        counts = dict(session.exec(group_count_statement(statement, "scope"), params=parameters).all())
+        return str.join(" · ", (f"{name}: {counts.get(scope, 0)}" for scope, name in SCOPES.items()))
+
 
 class AssignmentTable(Table):
     table = Assignment
+    archive_visible = True
     table_model = AssignmentTableModel
     create_dialog = AssignmentCreateDialog
     update_dialog = AssignmentUpdateDialog
+    sort_keys = {
+        "Помещение": Location.name,
+        "Разновидность": AssignmentType.name,
+        "Мероприятие": Event.title,
+        "Статус": Assignment.state,
+        "Дедлайн": Assignment.deadline,
+        "Дата создания": Assignment.created_at,
+        "Описание": Assignment.description,
+    }
     filters = (
         ComboboxFilter("Вид:", AssignmentType.name, True),
         ComboboxFilter("Локация:", Location.name),
@@ -39,11 +66,17 @@ class AssignmentTable(Table):
         DateTimeRangeFilter("Дата создания:", Assignment.created_at, True),
     )
 
+    def summary(self, session: Session, statement: SelectOfScalar, parameters: dict) -> str | None:
+        counts = dict(session.exec(group_count_statement(statement, "state"), params=parameters).all())
+        return str.join(" · ", (f"{name}: {counts.get(state, 0)}" for state, name in STATES.items()))
+
 
 class DesktopTable(AssignmentTable):
     create_dialog = None
     update_dialog = None
     delete_visible = False
+    archive_visible = False
+    summary = Table.summary
     filters = (
         ComboboxFilter("Вид:", AssignmentType.name),
         ComboboxFilter("Локация:", Location.name),
@@ -51,32 +84,40 @@ class DesktopTable(AssignmentTable):
         DateTimeRangeFilter("Дата создания:", Assignment.created_at, True),
     )
     
-    @property
-    def statement(self):
-        return super().statement.where(Assignment.state == Assignment.State.ACTIVE)
+    def query(self, statement, sort=False):
+        return super().query(statement.where(Assignment.state == Assignment.State.ACTIVE), sort)
 
     def setup_ui(self) -> None:
         super().setup_ui()
         self.add_extra_button("Пометить как выполненное", self.mark_as_completed, "app/ui/resourses/check.png")
         
     def mark_as_completed(self) -> None:
-        with Session(ENGINE) as session:
-            assignments = []
-            for i, j in enumerate(self.selected_indexes):
-                index = j - i
-                assignment: Assignment = self.model._data[index]
-                assignment.state = Assignment.State.COMPLETED
-                assignments.append(assignment)
-                self.model.removeRow(index)
-            session.bulk_save_objects(assignments)
-            session.commit()
+        try:
+            with writing() as session:
+                for assignment in self.objects(session, self.selected_indexes):
+                    assignment.state = Assignment.State.COMPLETED
+        except WriteConflictError as error:
+            validationError(self.parent(), str(error))
+            self.refresh(filter=False)
+            return
 
+        for i, j in enumerate(self.selected_indexes):
+            self.model.removeRow(j - i)
         self.update_total_count()
   
   
 class ReservationTable(Table):
     table = Reservation
     table_model = ReservaionTableModel
+    archive_visible = True
+    sort_keys = {
+        "Помещение": Location.name,
+        "Мероприятие": Event.title,
+        "Дата начала": Reservation.start_at,
+        "Дата конца": Reservation.end_at,
+        "Комментарий": Reservation.comment,
+        "Дата создания": Reservation.created_at,
+    }
     filters = (
         TextFilter("Комментарий:", Reservation.comment),
         ComboboxFilter("Локация:", Location.name, True),
@@ -89,6 +130,18 @@ class ReservationTable(Table):
         super().setup_ui()
         self.add_top_button("Зоны", self.showAreasManager, "app/ui/resourses/categorize.png")
 
+    def summary(self, session: Session, statement: SelectOfScalar, parameters: dict) -> str | None:
+        rows = statement.order_by(None).subquery()
+        hours = (func.julianday(rows.c.end_at) - func.julianday(rows.c.start_at)) * 24
+        totals = session.exec(
+            select(Location.name, func.sum(hours))
+            .join(rows, rows.c.location_id == Location.id)
+            .group_by(Location.id)
+            .order_by(Location.name),
+            params=parameters,
+        ).all()
+        return str.join(" · ", (f"{name}: {total:.1f} ч" for name, total in totals)) or None
+
     def showAreasManager(self):
         AreaManagerDialog(self).exec()
         self.refresh()
@@ -99,6 +152,14 @@ class EducationTable(Table):
     table_model = ClubTableModel
     create_dialog = ClubCreateDialog
     update_dialog = ClubUpdateDialog
+    sort_keys = {
+        "Заголовок": Club.title,
+        "Помещение": Location.name,
+        "Преподаватель": Teacher.name,
+        "Вид": ClubType.name,
+        "Старт": Club.start_at,
+        "Дата создания": Club.created_at,
+    }
     filters = (
         ComboboxFilter("Вид:", ClubType.name, True),
         ComboboxFilter("Преподаватель:", Teacher.name, True),
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from time import perf_counter
+
+from PyQt6 import QtCore, QtWidgets, QtGui
+
+from app.config import INSTRUMENTATION
+from app.ui.profiling import INSTRUMENTS
+
+
+class TableView(QtWidgets.QTableView):
+    """A table view reporting its paint events to `INSTRUMENTS`."""
+
+    @property
+    def view_name(self) -> str:
+        model = self.model()
+        return getattr(model, "view_name", None) or type(model).__name__
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        if not INSTRUMENTATION or self.model() is None:
+            return super().paintEvent(event)
+
+        start = perf_counter()
+        super().paintEvent(event)
+        INSTRUMENTS.view(self.view_name).paint.add(perf_counter() - start)
+
+
+class CachedSizeDelegate(QtWidgets.QStyledItemDelegate):
+    """Caches the size hints of cells by their text and width.
+
+    A view resizing its rows to wrapped contents measures every cell on each
+    layout pass; only unseen texts and widths are measured again. The sizes
+    used last are kept.
+    """
+
+    CACHE_SIZE = 4096
+
+    def __init__(self, parent: QtCore.QObject | None = None) -> None:
+        super().__init__(parent)
+        self._sizes: OrderedDict[tuple[str | None, int], QtCore.QSize] = OrderedDict()
+
+    def watch(self, model: QtCore.QAbstractItemModel) -> None:
+        """Forgets the cached sizes whenever the data of `model` changes."""
+        self.clear()
+        model.modelReset.connect(self.clear)
+        model.layoutChanged.connect(self.clear)
+        model.dataChanged.connect(self.clear)
+
+    def clear(self, *_) -> None:
+        self._sizes.clear()
+
+    def sizeHint(self, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex) -> QtCore.QSize:
+        key = (index.data(QtCore.Qt.ItemDataRole.DisplayRole), option.rect.width())
+        size = self._sizes.get(key)
+        if size is not None:
+            self._sizes.move_to_end(key)
+            return size
+
+        size = self._sizes[key] = super().sizeHint(option, index)
+        if len(self._sizes) > self.CACHE_SIZE:
+            self._sizes.popitem(last=False)
+        return size
+
+
+class UniformRowsTableView(TableView):
+    """A table view wrapping its text in rows of one height, that of the tallest cell.
+
+    Rows resized to their contents are measured cell by cell on every layout
+    pass. Here the height is only measured again when the model or the
+    column widths change, and only once per distinct text of a column.
+    """
+
+    def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setWordWrap(True)
+        self.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+        # Resizing the stretched columns moves every section at once; measure once after that
+        self._measure = QtCore.QTimer(self)
+        self._measure.setSingleShot(True)
+        self._measure.timeout.connect(self.updateRowHeight)
+        self.horizontalHeader().sectionResized.connect(self._measure.start)
+
+    def setModel(self, model: QtCore.QAbstractItemModel | None) -> None:
+        super().setModel(model)
+        if model is not None:
+            model.modelReset.connect(self._measure.start)
+            model.dataChanged.connect(self._measure.start)
+            model.layoutChanged.connect(self._measure.start)
+        self._measure.start()
+
+    def updateRowHeight(self) -> None:
+        model = self.model()
+        if model is None:
+            return
+
+        delegate = self.itemDelegate()
+        option = QtWidgets.QStyleOptionViewItem()
+        self.initViewItemOption(option)
+        height = self.verticalHeader().minimumSectionSize()
+        for column in range(model.columnCount()):
+            if self.isColumnHidden(column):
+                continue
+            # Text wraps within a valid rectangle only
+            option.rect = QtCore.QRect(0, 0, self.columnWidth(column), 1)
+            texts = set()
+            for row in range(model.rowCount()):
+                index = model.index(row, column)
+                text = index.data(QtCore.Qt.ItemDataRole.DisplayRole)
+                if text not in texts:
+                    texts.add(text)
+                    height = max(height, delegate.sizeHint(option, index).height())
+        # As `sizeHintForRow`, which leaves room for the grid line
+        self.verticalHeader().setDefaultSectionSize(height + int(self.showGrid()))
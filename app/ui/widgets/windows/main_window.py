@@ -1,13 +1,22 @@
-from PyQt6.QtCore import pyqtSlot
-from PyQt6.QtWidgets import QMainWindow, QTableView, QHeaderView
+from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot, QTimer
+from PyQt6.QtGui import QShortcut, QKeySequence
+from PyQt6.QtWidgets import QMainWindow, QHeaderView, QLabel
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
+from app.config import PROFILING, INSTRUMENTATION
 from app.db import ENGINE
-from app.db.models import Club
+from app.db.changes import CHANGES
+from app.db.models import Assignment, Club, Event, Reservation
+from app.db.profiling import PROFILER
 from app.ui.models.models import ScheduleTableModel
+from app.ui.profiling import INSTRUMENTS
 from app.ui.utils import export
 
 from app.ui.widgets.tables.tables import AssignmentTable, EducationTable, EventTable, ReservationTable, DesktopTable
+from app.ui.widgets.dashboard import DashboardPanel
 from app.ui.widgets.mixins import WidgetMixin
+from app.ui.widgets.profiler import ProfilerDialog
+from app.ui.widgets.views import CachedSizeDelegate, UniformRowsTableView
 
 
 class MainWindow(QMainWindow, WidgetMixin):
@@ -17,6 +26,8 @@ class MainWindow(QMainWindow, WidgetMixin):
     
     ui_path = "app/ui/assets/windows/main-window.ui"
 
+    dashboardChanged = pyqtSignal()
+
     def setup_ui(self) -> None:
         self.events = EventTable(self)
         self.assignments = AssignmentTable(self)
@@ -32,30 +43,97 @@ class MainWindow(QMainWindow, WidgetMixin):
             self.reservations,
         ]
         
-        self.schedule = QTableView(self)
-        self.schedule.setWordWrap(True)
+        self.schedule = UniformRowsTableView(self)
+        self.schedule.setItemDelegate(CachedSizeDelegate(self.schedule))
         self.schedule.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.schedule.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         self.refresh_schedule()
         self.pushButton.clicked.connect(lambda: export(self.model, self, True))
 
+        self.dashboard = DashboardPanel(self)
+
         self.desktopLayout.addWidget(self.desktop)
+        self.desktopLayout.addWidget(self.dashboard)
         self.assignmentsLayout.addWidget(self.assignments)
         self.eventsLayout.addWidget(self.events)
         self.verticalLayout.addWidget(self.clubs)
         self.verticalLayout_2.addWidget(self.schedule)
         self.locationsLayout.addWidget(self.reservations)
 
+        self.tab_titles = [self.tabWidget.tabText(i) for i in range(self.tabWidget.count())]
+        self.dashboardChanged.connect(self.refresh_dashboard, Qt.ConnectionType.QueuedConnection)
+        CHANGES.subscribe(self.on_models_changed)
+        self.refresh_dashboard()
+
         self.tabWidget.currentChanged.connect(self.refresh_current_tab)
         self.tabWidget_2.currentChanged.connect(self.refresh_schedule)
         self.refresh_current_tab(self.tabWidget.currentIndex())
 
+        if PROFILING or INSTRUMENTATION:
+            QShortcut(QKeySequence("Ctrl+Shift+D"), self).activated.connect(self.show_profiler)
+
+        if INSTRUMENTATION:
+            self.instrumentsLabel = QLabel(self)
+            self.statusBar().addPermanentWidget(self.instrumentsLabel)
+            self.instrumentsTimer = QTimer(self)
+            self.instrumentsTimer.timeout.connect(self.update_instruments)
+            self.instrumentsTimer.start(1000)
+
     @pyqtSlot(int)
     def refresh_current_tab(self, index: int) -> None:
         self.views[index].refresh()
 
+    def on_models_changed(self, models: frozenset[type]) -> None:
+        if models & {Assignment, Event, Reservation}:
+            self.dashboardChanged.emit()
+
+    @pyqtSlot()
+    def refresh_dashboard(self) -> None:
+        self.dashboard.refresh()
+
+        badges = {
+            self.views.index(self.desktop): self.dashboard.overdue,
+            self.views.index(self.events): self.dashboard.events_today,
+            self.views.index(self.reservations): self.dashboard.reservations_this_week,
+        }
+        for index, count in badges.items():
+            title = self.tab_titles[index]
+            self.tabWidget.setTabText(index, f"{title} ({count})" if count else title)
+
     def refresh_schedule(self) -> None:
-        with Session(ENGINE) as session:
-            self.schedule.setModel(ScheduleTableModel(session.exec(select(Club)).all()))
+        with PROFILER.action("MainWindow.refresh_schedule"), Session(ENGINE) as session:
+            clubs = session.exec(
+                select(Club).options(selectinload(Club.days), selectinload(Club.location), selectinload(Club.teacher))
+            ).all()
+            self.model = ScheduleTableModel(clubs)
+            self.model.stats = PROFILER.track("ScheduleTableModel.data")
+            self.schedule.setModel(self.model)
+            self.schedule.itemDelegate().watch(self.model)
+
+    @pyqtSlot()
+    def show_profiler(self) -> None:
+        ProfilerDialog(self).exec()
+
+    @pyqtSlot()
+    def update_instruments(self) -> None:
+        view = self.views[self.tabWidget.currentIndex()]
+        if view is self.clubs and self.tabWidget_2.currentWidget().isAncestorOf(self.schedule):
+            view = self.schedule
+            name = self.schedule.view_name
+        else:
+            name = type(view).__name__
+
+        stats = INSTRUMENTS.views.get(name)
+        if stats is None:
+            self.instrumentsLabel.clear()
+            return
+
+        total = stats.data_total
+        text = f"{name}: data() {total.calls} / {total.time * 1000:.0f} мс"
+        slowest = stats.slowest_column()
+        if slowest:
+            column, column_stats = slowest
+            text += f", дольше всего «{stats.column_name(column)}» {column_stats.time * 1000:.0f} мс"
+        text += f" · paint {stats.paint.calls} / {stats.paint.time * 1000:.0f} мс"
+        self.instrumentsLabel.setText(text)
 
 __all__ = ["MainWindow"]
@@ -1,3 +1,4 @@
+from datetime import datetime
 from enum import StrEnum, auto
 from sqlmodel import Session, select, exists
 
@@ -5,6 +6,9 @@ from PyQt6 import QtWidgets, QtCore, uic
 
 from app.db import ENGINE
 from app.db.models import Area, Event, Location, Reservation
+from app.db.occupancy import OCCUPANCY, Candidate
+from app.db.queries import sort_expression
+from app.ui.widgets.wizards.slots import SlotFinderDialog
 
 
 class Fields(StrEnum):
@@ -21,6 +25,20 @@ class WelcomePage(QtWidgets.QWizardPage):
         uic.loadUi("app/ui/assets/wizards/welcome-page.ui", self)
         self.registerField(Fields.START_AT, self.startDateTimeEdit)
         self.registerField(Fields.END_AT, self.endDateTimeEdit)
+        self.findSlotsButton.clicked.connect(self.findSlots)
+
+    def findSlots(self) -> None:
+        start_at = self.startDateTimeEdit.dateTime().toPyDateTime()
+        duration = self.endDateTimeEdit.dateTime().toPyDateTime() - start_at
+        dialog = SlotFinderDialog(start_at, duration, self)
+        if not dialog.exec():
+            return
+
+        # Подставляем найденный вариант; помещение и зоны выберутся на следующих страницах
+        candidate = dialog.candidate
+        self.startDateTimeEdit.setDateTime(QtCore.QDateTime(candidate.start_at))
+        self.endDateTimeEdit.setDateTime(QtCore.QDateTime(candidate.end_at))
+        self.wizard().suggestion = candidate
 
     def initializePage(self) -> None:
         self.endDateTimeEdit.setMinimumDateTime(QtCore.QDateTime(self.wizard()._event.start_at))
@@ -36,7 +54,40 @@ class WelcomePage(QtWidgets.QWizardPage):
         return super().validatePage()
 
 
+class FreeLocationsSearch(QtCore.QThread):
+    """Looks for the locations free during a period and reports them in batches as they are read."""
+
+    BATCH_SIZE = 50
+
+    found = QtCore.pyqtSignal(list)
+
+    def __init__(self, start_at: datetime, end_at: datetime) -> None:
+        super().__init__()
+        self.start_at = start_at
+        self.end_at = end_at
+
+    def run(self) -> None:
+        free = OCCUPANCY.free_locations(self.start_at, self.end_at)
+        if self.isInterruptionRequested():
+            return
+
+        with Session(ENGINE) as session:
+            result = session.exec(
+                select(Location.id, Location.name)
+                .where(Location.id.in_(free))
+                .order_by(sort_expression(Location.name))
+                .execution_options(yield_per=self.BATCH_SIZE)
+            )
+            for batch in result.partitions():
+                if self.isInterruptionRequested():
+                    return
+                self.found.emit([tuple(row) for row in batch])
+
+
 class ResultsPage(QtWidgets.QWizardPage):
+    # Поиски, отменённые до завершения, держим здесь, пока их поток не остановится
+    _searches: set[FreeLocationsSearch] = set()
+
     def __init__(self, parent: QtWidgets.QWidget | None = None) -> None:
         super().__init__(parent)
         uic.loadUi("app/ui/assets/wizards/results-page.ui", self)
@@ -46,64 +97,49 @@ class ResultsPage(QtWidgets.QWizardPage):
         spin.setVisible(False)
         self.registerField(Fields.PLACE_ID, spin)
         self.listWidget.itemSelectionChanged.connect(lambda: self.completeChanged.emit())
+        self.progressBar.setVisible(False)
+        self.search: FreeLocationsSearch | None = None
 
     def initializePage(self) -> None:
+        self.cancelSearch()
         self.listWidget.clear()
 
         start_at = self.field(Fields.START_AT).toPyDateTime()
         end_at = self.field(Fields.END_AT).toPyDateTime()
-        
-        # Так писать нельзя, позже отрефакторю! Но оно работает :)
-        with Session(ENGINE) as session:
-            locations = session.exec(select(Location)).all()
-            free = []
-            for location in locations:
-
-                # Полностью пустое
-                if not(any(location.areas) or any(location.reservations)):
-                    free.append(location)
-                    continue
-
-                # Бронирование не пересекается
-                if (any(reservation.start_at < reservation.end_at < start_at < end_at for reservation in location.reservations)
-                    or any(start_at < end_at < reservation.start_at < reservation.end_at for reservation in location.reservations)):
-
-                    # Нет зон
-                    if not(any(location.areas)):
-                        free.append(location)
-                        continue
-                    
-                    for area in location.areas:
-                        
-                        # Полностью пустое
-                        if not any(area.reservations):
-                            free.append(location)
-                            break
-                        
-                        # Бронирование не пересекается
-                        if (any(reservation.start_at < reservation.end_at < start_at < end_at for reservation in area.reservations)
-                            or any(start_at < end_at < reservation.start_at < reservation.end_at for reservation in area.reservations)):
-                            free.append(location)
-                            break
-
-                    continue
-
-                for area in location.areas:
-                        
-                    # Полностью пустое
-                    if not any(area.reservations):
-                        free.append(location)
-                        break
-                    
-                    # Бронирование не пересекается
-                    if (any(reservation.start_at < reservation.end_at < start_at < end_at for reservation in area.reservations)
-                        or any(start_at < end_at < reservation.start_at < reservation.end_at for reservation in area.reservations)):
-                        free.append(location)
-                        break
-
-            names = list(location.name for location in free)
-
-        self.listWidget.addItems(names)
+        self.suggestion = self.wizard().suggestionFor(start_at, end_at)
+
+        self.search = search = FreeLocationsSearch(start_at, end_at)
+        self._searches.add(search)
+        search.found.connect(self.addLocations)
+        search.finished.connect(self.searchFinished)
+        search.finished.connect(lambda: self._searches.discard(search))
+        self.progressBar.setVisible(True)
+        search.start()
+
+    def cleanupPage(self) -> None:
+        self.cancelSearch()
+        super().cleanupPage()
+
+    def cancelSearch(self) -> None:
+        search, self.search = self.search, None
+        if search is None:
+            return
+        search.found.disconnect(self.addLocations)
+        search.finished.disconnect(self.searchFinished)
+        search.requestInterruption()
+        self.progressBar.setVisible(False)
+
+    def addLocations(self, locations: list[tuple[int, str]]) -> None:
+        for location_id, name in locations:
+            item = QtWidgets.QListWidgetItem(name)
+            item.setData(QtCore.Qt.ItemDataRole.UserRole, location_id)
+            self.listWidget.addItem(item)
+            if self.suggestion is not None and self.suggestion.location_id == location_id:
+                self.listWidget.setCurrentItem(item)
+
+    def searchFinished(self) -> None:
+        self.search = None
+        self.progressBar.setVisible(False)
 
         # print(start_at)
         # end_at = self.field("end_at").toPyDateTime().strftime("%d.%m.%Y %H:%M")
@@ -114,11 +150,7 @@ class ResultsPage(QtWidgets.QWizardPage):
         return bool(self.listWidget.selectedIndexes())
         
     def validatePage(self) -> bool:        
-        with Session(ENGINE) as session:
-            name = self.listWidget.currentItem().data(QtCore.Qt.ItemDataRole.DisplayRole)
-            location_id = session.exec(select(Location.id).where(Location.name == name)).first()
-            self.setField(Fields.PLACE_ID, location_id)
-
+        self.setField(Fields.PLACE_ID, self.listWidget.currentItem().data(QtCore.Qt.ItemDataRole.UserRole))
         return super().validatePage()
 
 
@@ -150,26 +182,19 @@ class AreasPage(QtWidgets.QWizardPage):
         end_at = self.field(Fields.END_AT).toPyDateTime()
         location_id: int = self.field(Fields.PLACE_ID)
 
+        free = OCCUPANCY.free_areas(location_id, start_at, end_at)
+        suggestion = self.wizard().suggestionFor(start_at, end_at)
+        suggested = suggestion.area_ids if suggestion is not None and suggestion.location_id == location_id else ()
+
         with Session(ENGINE) as session:
             self.location = session.get(Location, location_id)
             for area in self.location.areas:
                 item = QtWidgets.QListWidgetItem(area.name)
-                
-                is_busy = True
-                
-                # Полностью пустое
-                if not any(area.reservations):
-                    is_busy = False
-    
-                # Бронирование не пересекается
-                if (any(reservation.start_at < reservation.end_at < start_at < end_at for reservation in area.reservations)
-                    or any(start_at < end_at < reservation.start_at < reservation.end_at for reservation in area.reservations)):
-                    is_busy = False
-                
-                flags = QtCore.Qt.ItemFlag.NoItemFlags if is_busy else QtCore.Qt.ItemFlag.ItemIsEnabled
+                flags = QtCore.Qt.ItemFlag.ItemIsEnabled if area.id in free else QtCore.Qt.ItemFlag.NoItemFlags
 
                 item.setFlags(flags | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
-                item.setCheckState(QtCore.Qt.CheckState.Unchecked)
+                checked = area.id in free and area.id in suggested
+                item.setCheckState(QtCore.Qt.CheckState.Checked if checked else QtCore.Qt.CheckState.Unchecked)
                 self.listWidget.addItem(item)
         return super().initializePage()
     
@@ -203,6 +228,7 @@ class ReservationWizard(QtWidgets.QWizard):
     def __init__(self, event: Event, parent: QtWidgets.QWidget | None = None) -> None:
         super().__init__(parent)
         self._event = event
+        self.suggestion: Candidate | None = None
 
         self.setWindowTitle("Мастер бронирования помещений")
 
@@ -218,6 +244,13 @@ class ReservationWizard(QtWidgets.QWizard):
 
         self.button(QtWidgets.QWizard.WizardButton.FinishButton).clicked.connect(self.createReservation)
 
+    def suggestionFor(self, start_at: datetime, end_at: datetime) -> Candidate | None:
+        """Returns the variant picked by `SlotFinderDialog` unless the period was changed since."""
+        suggestion = self.suggestion
+        if suggestion is None or (suggestion.start_at, suggestion.end_at) != (start_at, end_at):
+            return None
+        return suggestion
+
     def nextId(self) -> int:
         if self.currentPage() != self.resultsPage:
             return super().nextId()
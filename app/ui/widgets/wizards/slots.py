@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+from PyQt6 import QtWidgets, QtCore
+from sqlmodel import Session, select
+
+from app.db import ENGINE
+from app.db.models import Area, Location
+from app.db.occupancy import OCCUPANCY, Candidate
+from app.db.queries import sort_expression
+
+
+class SlotFinderDialog(QtWidgets.QDialog):
+    """Finds free locations and times for an event of a given duration."""
+
+    COLUMNS = ("Помещение", "Начало", "Конец", "Зоны")
+
+    def __init__(self, start_at: datetime, duration: timedelta, parent: QtWidgets.QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Подбор времени и помещения")
+        self.resize(640, 480)
+        self.candidate: Candidate | None = None
+        self.candidates: list[Candidate] = []
+
+        self.durationEdit = QtWidgets.QSpinBox(self)
+        self.durationEdit.setRange(15, 24 * 60)
+        self.durationEdit.setSingleStep(15)
+        self.durationEdit.setSuffix(" мин")
+        self.durationEdit.setValue(max(15, duration // timedelta(minutes=1)))
+
+        self.fromDateTimeEdit = QtWidgets.QDateTimeEdit(QtCore.QDateTime(start_at), self)
+        self.fromDateTimeEdit.setCalendarPopup(True)
+        self.toDateTimeEdit = QtWidgets.QDateTimeEdit(QtCore.QDateTime(start_at + timedelta(days=7)), self)
+        self.toDateTimeEdit.setCalendarPopup(True)
+
+        self.areasEdit = QtWidgets.QSpinBox(self)
+        self.areasEdit.setRange(1, 99)
+
+        self.orderComboBox = QtWidgets.QComboBox(self)
+        self.orderComboBox.addItem("Как можно раньше", "earliest")
+        self.orderComboBox.addItem("Лучшее совпадение", "best")
+
+        self.locationsList = QtWidgets.QListWidget(self)
+        self.locationsList.setMaximumHeight(120)
+        self.onlyPreferredCheckBox = QtWidgets.QCheckBox("Только выбранные помещения", self)
+
+        self.searchButton = QtWidgets.QPushButton("Найти", self)
+        self.searchButton.clicked.connect(self.search)
+
+        self.resultsTable = QtWidgets.QTableWidget(0, len(self.COLUMNS), self)
+        self.resultsTable.setHorizontalHeaderLabels(self.COLUMNS)
+        self.resultsTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.resultsTable.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.resultsTable.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.resultsTable.horizontalHeader().setStretchLastSection(True)
+        self.resultsTable.verticalHeader().hide()
+        self.resultsTable.itemSelectionChanged.connect(self.updateButtons)
+        self.resultsTable.doubleClicked.connect(self.accept)
+
+        self.buttonBox = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok | QtWidgets.QDialogButtonBox.StandardButton.Cancel, self
+        )
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+
+        form = QtWidgets.QFormLayout()
+        form.addRow("Длительность:", self.durationEdit)
+        form.addRow("Искать с:", self.fromDateTimeEdit)
+        form.addRow("по:", self.toDateTimeEdit)
+        form.addRow("Количество зон:", self.areasEdit)
+        form.addRow("Порядок:", self.orderComboBox)
+        form.addRow("Предпочтительные помещения:", self.locationsList)
+        form.addRow(self.onlyPreferredCheckBox)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(self.searchButton)
+        layout.addWidget(self.resultsTable)
+        layout.addWidget(self.buttonBox)
+
+        with Session(ENGINE) as session:
+            self.locations = dict(session.exec(select(Location.id, Location.name).order_by(sort_expression(Location.name))).all())
+            self.area_names = dict(session.exec(select(Area.id, Area.name)).all())
+
+        for location_id, name in self.locations.items():
+            item = QtWidgets.QListWidgetItem(name)
+            item.setData(QtCore.Qt.ItemDataRole.UserRole, location_id)
+            item.setFlags(item.flags() | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(QtCore.Qt.CheckState.Unchecked)
+            self.locationsList.addItem(item)
+
+        self.updateButtons()
+
+    def preferred(self) -> list[int]:
+        return [
+            self.locationsList.item(i).data(QtCore.Qt.ItemDataRole.UserRole)
+            for i in range(self.locationsList.count())
+            if self.locationsList.item(i).checkState() == QtCore.Qt.CheckState.Checked
+        ]
+
+    def search(self) -> None:
+        start_at = self.fromDateTimeEdit.dateTime().toPyDateTime()
+        end_at = self.toDateTimeEdit.dateTime().toPyDateTime()
+        if start_at >= end_at:
+            QtWidgets.QMessageBox.critical(self, "Ошибка валидации!", "Начало периода поиска должно быть раньше конца!")
+            return
+
+        # Не раньше текущего момента: бронировать прошедшее время нельзя
+        start_at = max(start_at, datetime.now())
+        self.candidates = OCCUPANCY.find_slots(
+            timedelta(minutes=self.durationEdit.value()),
+            start_at,
+            end_at,
+            areas=self.areasEdit.value(),
+            preferred=self.preferred(),
+            only_preferred=self.onlyPreferredCheckBox.isChecked(),
+            order=self.orderComboBox.currentData(),
+            limit=50,
+        )
+
+        self.resultsTable.setRowCount(len(self.candidates))
+        for row, candidate in enumerate(self.candidates):
+            values = (
+                self.locations.get(candidate.location_id, ""),
+                candidate.start_at.strftime("%d.%m.%Y %H:%M"),
+                candidate.end_at.strftime("%d.%m.%Y %H:%M"),
+                ", ".join(self.area_names.get(area_id, "") for area_id in candidate.area_ids),
+            )
+            for column, value in enumerate(values):
+                self.resultsTable.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+        self.resultsTable.resizeColumnsToContents()
+
+        if not self.candidates:
+            QtWidgets.QMessageBox.information(self, "Подбор", "Свободных вариантов в указанный период не найдено.")
+        self.updateButtons()
+
+    def updateButtons(self) -> None:
+        ok = self.buttonBox.button(QtWidgets.QDialogButtonBox.StandardButton.Ok)
+        ok.setEnabled(bool(self.resultsTable.selectionModel().selectedRows()))
+
+    def accept(self) -> None:
+        rows = self.resultsTable.selectionModel().selectedRows()
+        if not rows:
+            return
+        self.candidate = self.candidates[rows[0].row()]
+        super().accept()
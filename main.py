@@ -1,6 +1,12 @@
-from app import startup
-
 if __name__ == "__main__":
     import sys
 
+    if len(sys.argv) > 1:
+        # Batch commands do not need Qt
+        from app import cli
+
+        sys.exit(cli.run())
+
+    from app import startup
+
     sys.exit(startup.run())
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# The application connects on import, so the database is chosen before anything imports it
+_directory = tempfile.mkdtemp(prefix="ccms-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/db.sqlite3"
+os.environ["ARCHIVE_PATH"] = f"{_directory}/archive.sqlite3"
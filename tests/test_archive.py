@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import delete, select
+
+from app.db import ENGINE
+from app.db.archive import archive, with_archive
+from app.db.models import Location, Reservation
+from app.db.schema import migrate
+from app.db.transactions import writing
+
+
+def _reserve(location: int, *days: int) -> list[int]:
+    now = datetime.now()
+    with writing() as session:
+        reservations = [
+            Reservation(location_id=location, start_at=now - timedelta(days=day, hours=2), end_at=now - timedelta(days=day))
+            for day in days
+        ]
+        session.add_all(reservations)
+        session.flush()
+        return [reservation.id for reservation in reservations]
+
+
+def test_ids_of_archived_rows_are_not_reused() -> None:
+    migrate(ENGINE)
+    with writing() as session:
+        location = Location(name=f"Архив {datetime.now().timestamp()}")
+        session.add(location)
+        session.flush()
+        location = location.id
+
+    *old, newest = _reserve(location, 40, 39, 38, 37, 1)
+    archive(before=datetime.now() - timedelta(days=30))
+    with writing() as session:
+        session.exec(delete(Reservation).where(Reservation.id == newest))
+
+    new = _reserve(location, 36, 35)
+    assert not set(new) & {*old, newest}
+    archive(before=datetime.now() - timedelta(days=30))
+
+    with ENGINE.connect() as connection:
+        ids = connection.execute(with_archive(select(Reservation.id).where(Reservation.location_id == location))).scalars().all()
+    assert sorted(ids) == sorted(old + new)
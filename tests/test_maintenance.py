@@ -0,0 +1,24 @@
+from app.db import ENGINE
+from app.db.maintenance import INCREMENTAL, NONE, SCHEMAS
+from app.db.schema import migrate
+
+
+def _auto_vacuum() -> dict[str, int]:
+    with ENGINE.connect() as connection:
+        return {schema: connection.exec_driver_sql(f"PRAGMA {schema}.auto_vacuum").scalar() for schema in SCHEMAS}
+
+
+def test_migrate_switches_existing_files_to_incremental_vacuum() -> None:
+    migrate(ENGINE)
+    connection = ENGINE.raw_connection()
+    try:
+        for schema in SCHEMAS:
+            connection.driver_connection.execute(f"PRAGMA {schema}.auto_vacuum = NONE")
+            connection.driver_connection.execute(f"VACUUM {schema}")
+    finally:
+        connection.close()
+    assert _auto_vacuum() == dict.fromkeys(SCHEMAS, NONE)
+
+    migrate(ENGINE)
+
+    assert _auto_vacuum() == dict.fromkeys(SCHEMAS, INCREMENTAL)
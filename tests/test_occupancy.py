@@ -0,0 +1,57 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.db import ENGINE
+from app.db.models import Location, Reservation
+from app.db.occupancy import OCCUPANCY
+from app.db.schema import migrate
+from app.db.transactions import writing
+
+
+@pytest.fixture
+def location() -> int:
+    migrate(ENGINE)
+    with writing() as session:
+        location = Location(name=f"Зал {datetime.now().timestamp()}")
+        session.add(location)
+        session.flush()
+        return location.id
+
+
+@pytest.fixture
+def builds(monkeypatch) -> list[datetime]:
+    calls = []
+    build = OCCUPANCY._build
+    monkeypatch.setattr(OCCUPANCY, "_build", lambda origin, until: (calls.append(origin), build(origin, until)))
+    return calls
+
+
+def _window() -> tuple[datetime, datetime]:
+    start = datetime.combine(datetime.now().date() + timedelta(days=1), time(10))
+    return start, start + timedelta(hours=2)
+
+
+def test_orm_commit_is_applied_without_rebuild(location, builds) -> None:
+    start, end = _window()
+    assert location in OCCUPANCY.free_locations(start, end)
+    builds.clear()
+
+    with writing() as session:
+        session.add(Reservation(location_id=location, start_at=start, end_at=end, areas=[]))
+
+    assert location not in OCCUPANCY.free_locations(start, end)
+    assert builds == []
+
+
+def test_core_insert_rebuilds(location, builds) -> None:
+    start, end = _window()
+    assert location in OCCUPANCY.free_locations(start, end)
+    builds.clear()
+
+    with writing() as session:
+        session.connection().execute(insert(Reservation).values(location_id=location, start_at=start, end_at=end))
+
+    assert location not in OCCUPANCY.free_locations(start, end)
+    assert len(builds) == 1
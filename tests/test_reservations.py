@@ -0,0 +1,77 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db import ENGINE
+from app.db.models import Area, AreaReservationLink, Location, Reservation
+from app.db.reservations import CONFLICT_MESSAGE
+from app.db.schema import migrate
+from app.db.transactions import writing
+
+START = datetime.combine(datetime.now().date() + timedelta(days=2), time(10))
+END = START + timedelta(hours=2)
+
+
+def _location(areas: int = 0) -> tuple[int, list[int]]:
+    with writing() as session:
+        location = Location(name=f"Зал {datetime.now().timestamp()}")
+        session.add(location)
+        session.flush()
+        area_ids = []
+        for i in range(areas):
+            area = Area(name=f"Зона {i}", location_id=location.id)
+            session.add(area)
+            session.flush()
+            area_ids.append(area.id)
+        return location.id, area_ids
+
+
+def _reserve(location_id: int, area_ids=(), start: datetime = START, end: datetime = END) -> int:
+    with writing() as session:
+        connection = session.connection()
+        reservation_id = connection.execute(
+            insert(Reservation).values(location_id=location_id, start_at=start, end_at=end)
+        ).inserted_primary_key[0]
+        for area_id in area_ids:
+            connection.execute(insert(AreaReservationLink).values(area_id=area_id, reservation_id=reservation_id))
+        return reservation_id
+
+
+@pytest.fixture(autouse=True)
+def schema() -> None:
+    migrate(ENGINE)
+
+
+def test_whole_location_rejects_overlap() -> None:
+    location_id, _ = _location()
+    _reserve(location_id)
+    with pytest.raises(IntegrityError, match=CONFLICT_MESSAGE):
+        _reserve(location_id, start=START + timedelta(hours=1), end=END + timedelta(hours=1))
+    _reserve(location_id, start=END, end=END + timedelta(hours=1))
+
+
+def test_area_reservation_rejected_by_whole_location() -> None:
+    location_id, area_ids = _location(2)
+    _reserve(location_id)
+    with pytest.raises(IntegrityError, match=CONFLICT_MESSAGE):
+        _reserve(location_id, area_ids[:1])
+
+
+def test_different_areas_do_not_conflict() -> None:
+    location_id, area_ids = _location(2)
+    _reserve(location_id, area_ids[:1])
+    _reserve(location_id, area_ids[1:])
+
+
+@pytest.mark.parametrize("column", ["location_id", "start_at"])
+def test_update_into_overlap_is_rejected(column: str) -> None:
+    location_id, _ = _location()
+    other_id, area_ids = _location(1)
+    _reserve(location_id)
+    moved = _reserve(other_id, area_ids) if column == "location_id" else _reserve(location_id, start=END, end=END + timedelta(hours=2))
+    value = location_id if column == "location_id" else START + timedelta(hours=1)
+    with pytest.raises(IntegrityError, match=CONFLICT_MESSAGE):
+        with writing() as session:
+            session.connection().execute(update(Reservation).where(Reservation.id == moved).values({column: value}))